@@ -0,0 +1,96 @@
+"""
+Single-flight request coalescing
+Concurrent callers asking for the same key share one in-flight call instead of each hitting the upstream.
+"""
+
+import copy
+import threading
+
+
+class _Call:
+    """One in-flight call that any number of callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.snapshot = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    do(key, fn, ...) runs fn once per key at a time; callers that arrive while it is running
+    wait for it and get a deep copy of the same result (or the same exception).
+
+    The leader gets fn's own return value, so it may keep mutating it (ranking, tagging, ...)
+    - followers copy from a snapshot taken before the leader returns.
+
+    remember=True also keeps successful results after the call finishes. Use it for a
+    per-request group, e.g. when Gemini suggests the main product name again.
+    """
+
+    def __init__(self, remember=False):
+        self.remember = remember
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}
+        self._leaders = 0
+        self._shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            if key in self._results:
+                self._shared += 1
+                snapshot = self._results[key]
+                call = None
+            else:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._leaders += 1
+                else:
+                    call.waiters += 1
+                    self._shared += 1
+        if call is None:
+            return copy.deepcopy(snapshot)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.snapshot)
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            raise
+
+        if self.remember:
+            # Always snapshot; the call stays joinable until the remembered result replaces it
+            call.snapshot = copy.deepcopy(result)
+            with self._lock:
+                self._results[key] = call.snapshot
+                del self._calls[key]
+        else:
+            # No new followers can join once the call is removed, so waiters is final here
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            if waiters:
+                call.snapshot = copy.deepcopy(result)
+        call.done.set()
+        return result
+
+    def stats(self):
+        """leaders: calls that actually ran fn; shared: calls served from another caller's result."""
+        with self._lock:
+            return {
+                "leaders": self._leaders,
+                "shared": self._shared,
+                "in_flight": len(self._calls)
+            }
@@ -1,27 +1,27 @@
-import requests
 import json
 import base64
 import time
-import configparser
-import os 
+import re
 
-# 1. Load configuration from unified config file
-CONFIG_FILE = 'config.ini'
-config = configparser.ConfigParser()
+from EbayAPI.token_manager import TokenManager
+from EbayAPI.token_store import FileTokenStore
+from settings import get_bool_setting, get_int_setting, get_setting
+from Monitoring.metrics import observe_vendor
+from Transport.http_session import get_session, get_timeout
+from Transport.rate_limit import PRIORITY_MAIN
+from Transport.resilience import call_with_retries
 
-if not os.path.exists(CONFIG_FILE):
-    print(f"ERROR: Configuration file '{CONFIG_FILE}' not found.")
-    exit(1)
+# 1. Credentials come from the [ebay] section of config.ini, read on first use (not at import)
+MARKETPLACE_ID = 'EBAY_US'
 
-config.read(CONFIG_FILE)
-
-try:
-    CLIENT_ID = config.get('ebay', 'CLIENT_ID')
-    CLIENT_SECRET = config.get('ebay', 'CLIENT_SECRET')
-    MARKETPLACE_ID = 'EBAY_US'
-except (configparser.NoSectionError, configparser.NoOptionError) as e:
-    print(f"ERROR: {e}")
-    exit(1)
+def get_credentials():
+    """(CLIENT_ID, CLIENT_SECRET) from the [ebay] section of config.ini, or None if either is missing."""
+    client_id = (get_setting('ebay', 'CLIENT_ID') or '').strip()
+    client_secret = (get_setting('ebay', 'CLIENT_SECRET') or '').strip()
+    if not (client_id and client_secret):
+        print("ERROR: CLIENT_ID and CLIENT_SECRET missing from the [ebay] section of config.ini")
+        return None
+    return client_id, client_secret
 
 # API Endpoints
 TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
@@ -30,13 +30,26 @@ EBAY_API_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
 EBAY_ACCESS_TOKEN = None 
 TOKEN_EXPIRY_TIME = 0 
 
-# 2. Token generation
-def get_access_token():
-    global EBAY_ACCESS_TOKEN, TOKEN_EXPIRY_TIME
-    if EBAY_ACCESS_TOKEN and time.time() < TOKEN_EXPIRY_TIME - 300:
-        return True
+# Refresh in the background once the token has less than this many seconds left
+# (capped at half the token lifetime, see TokenManager.margin_for)
+TOKEN_REFRESH_MARGIN = get_int_setting('ebay', 'TOKEN_REFRESH_MARGIN', 600)
+# Lifetime of the tokens TOKEN_URL hands out, updated from each response
+TOKEN_LIFETIME = 7200
+# A token this close to expiry is not used at all
+TOKEN_EXPIRY_SAFETY = 60
 
-    credentials = f"{CLIENT_ID}:{CLIENT_SECRET}"
+# Optional token file shared by all worker processes (empty = each process keeps its own)
+TOKEN_STORE_PATH = get_setting('ebay', 'TOKEN_STORE_PATH', '')
+TOKEN_STORE = FileTokenStore(TOKEN_STORE_PATH) if TOKEN_STORE_PATH else None
+
+# 2. Token generation
+def _request_token():
+    """Request a new application token from TOKEN_URL. Returns (token, expires_in) or None on failure."""
+    global TOKEN_LIFETIME
+    client = get_credentials()
+    if client is None:
+        return None
+    credentials = f"{client[0]}:{client[1]}"
     base64_credentials = base64.b64encode(credentials.encode()).decode()
 
     token_headers = {
@@ -48,15 +61,75 @@ def get_access_token():
         "scope": "https://api.ebay.com/oauth/api_scope"
     }
 
-    response = requests.post(TOKEN_URL, headers=token_headers, data=token_payload)
+    response = get_session('ebay').post(TOKEN_URL, headers=token_headers, data=token_payload,
+                                        timeout=get_timeout('ebay'))
     if response.status_code != 200:
         print(f"Token request failed: {response.text}")
-        return False
+        return None
 
     token_data = response.json()
-    EBAY_ACCESS_TOKEN = token_data.get("access_token")
-    TOKEN_EXPIRY_TIME = time.time() + token_data.get("expires_in", 7200)
-    return True
+    TOKEN_LIFETIME = token_data.get("expires_in", 7200)
+    return token_data.get("access_token"), TOKEN_LIFETIME
+
+def _fetch_token():
+    """
+    Get a fresh token, from the shared store when another process already refreshed it.
+    Only the process holding the store lock calls TOKEN_URL; the others wait, then re-read.
+    """
+    if TOKEN_STORE is None:
+        return _request_token()
+
+    def fresh_from_store():
+        stored = TOKEN_STORE.read()
+        if stored and stored[1] - time.time() > TOKEN_MANAGER.margin_for(TOKEN_LIFETIME):
+            return stored[0], stored[1] - time.time()
+        return None
+
+    shared = fresh_from_store()
+    if shared:
+        return shared
+
+    with TOKEN_STORE.lock():
+        shared = fresh_from_store()
+        if shared:
+            return shared
+        result = _request_token()
+        if result:
+            token, expires_in = result
+            TOKEN_STORE.write(token, time.time() + expires_in)
+        return result
+
+def _publish_token(token, expires_at):
+    global EBAY_ACCESS_TOKEN, TOKEN_EXPIRY_TIME
+    EBAY_ACCESS_TOKEN = token
+    TOKEN_EXPIRY_TIME = expires_at
+
+TOKEN_MANAGER = TokenManager(
+    _fetch_token,
+    _publish_token,
+    refresh_margin=TOKEN_REFRESH_MARGIN,
+    background=get_bool_setting('ebay', 'TOKEN_BACKGROUND_REFRESH', True)
+)
+
+def get_access_token():
+    """
+    Make sure EBAY_ACCESS_TOKEN holds a usable token.
+    Near expiry the refresh happens in the background while the current token keeps
+    being used; callers only wait (on one shared refresh) when there is no usable token.
+    """
+    now = time.time()
+    if EBAY_ACCESS_TOKEN and now < TOKEN_EXPIRY_TIME - TOKEN_MANAGER.margin_for(TOKEN_LIFETIME):
+        return True
+
+    if EBAY_ACCESS_TOKEN and now < TOKEN_EXPIRY_TIME - TOKEN_EXPIRY_SAFETY:
+        TOKEN_MANAGER.refresh_async()
+        return True
+
+    return TOKEN_MANAGER.refresh_now()
+
+def warm_up_token():
+    """Fetch the first token in the background so the first search doesn't wait for it."""
+    TOKEN_MANAGER.refresh_async()
 
 # Condition name to ID mapping
 CONDITION_MAP = {
@@ -80,7 +153,8 @@ CONDITION_MAP = {
 def search_ebay(query, price_range=None, condition_filter=None, 
                 delivery_country=None, delivery_postal_code=None,
                 guaranteed_delivery_days=None, max_delivery_cost=None,
-                sort_by="price"):
+                sort_by="price", deadline=None, priority=PRIORITY_MAIN, limit=5,
+                fieldgroups="EXTENDED"):
     """
     Search eBay with various filters.
     
@@ -93,6 +167,10 @@ def search_ebay(query, price_range=None, condition_filter=None,
         guaranteed_delivery_days (int): Filter by guaranteed delivery within N days
         max_delivery_cost (float): Maximum shipping cost (use 0 for free shipping)
         sort_by (str): Sort option - "price", "-price" (desc), "distance", "newlyListed"
+        deadline (float): time.monotonic() by which the request must be answered; caps the HTTP timeouts
+        priority (str): Rate limiter priority - PRIORITY_MAIN, or PRIORITY_LOW for calls that may be shed first
+        limit (int): Maximum number of items to return (eBay allows up to 200)
+        fieldgroups (str): Response detail - "EXTENDED" adds shortDescription, "MATCHING_ITEMS" is the lean default
     
     Returns:
         dict: eBay API response JSON
@@ -155,16 +233,58 @@ def search_ebay(query, price_range=None, condition_filter=None,
 
     params = {
         "q": query,
-        "fieldgroups": "EXTENDED",  # Use EXTENDED to get shortDescription
+        "fieldgroups": fieldgroups,  # EXTENDED adds shortDescription
         "filter": ",".join(filter_list),
         "sort": sort_by,
-        "limit": 5
+        "limit": limit
     }
 
-    response = requests.get(EBAY_API_URL, headers=headers, params=params)
-    response.raise_for_status()
+    with observe_vendor('ebay'):
+        response = call_with_retries(
+            'ebay',
+            lambda timeout: get_session('ebay').get(EBAY_API_URL, headers=headers, params=params, timeout=timeout),
+            deadline,
+            priority
+        )
+        response.raise_for_status()
     return response.json()
 
+def build_or_query(terms):
+    """
+    One eBay keyword query matching any of terms: "(lego set, toy robot)".
+    Commas and parentheses inside a term would change the query's meaning, so they are dropped.
+    """
+    cleaned = [" ".join(re.sub(r"[(),]", " ", term).split()) for term in terms]
+    return "(" + ", ".join(t for t in cleaned if t) + ")"
+
+
+def _title_tokens(text):
+    """Lowercase words of text, with a trailing plural "s" folded so "games" matches "game"."""
+    words = re.findall(r"[a-z0-9]+", str(text or "").lower())
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words}
+
+
+def partition_items(items, terms):
+    """
+    Split the itemSummaries of an OR query back to the terms that found them.
+
+    An item goes to a term only if its title has every word of that term, so "Train set" is not
+    a "lego set". When several terms qualify the one with the most words wins, then the earlier
+    term; items no term fully covers are dropped. Returns {term: [items]} keeping the order eBay
+    returned them in, with an entry for every term.
+    """
+    term_tokens = [(term, _title_tokens(term)) for term in terms]
+    partitioned = {term: [] for term in terms}
+    for item in items or []:
+        title = _title_tokens(item.get('title'))
+        best, best_size = None, 0
+        for term, tokens in term_tokens:
+            if tokens and tokens <= title and len(tokens) > best_size:
+                best, best_size = term, len(tokens)
+        if best is not None:
+            partitioned[best].append(item)
+    return partitioned
+
 # 4. Output Function
 def display_results(data):
     if not data or 'itemSummaries' not in data:
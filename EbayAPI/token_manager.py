@@ -0,0 +1,110 @@
+"""
+Background refresh of an OAuth application token
+Refreshes before expiry on a timer, and collapses concurrent refreshes into one request.
+"""
+
+import threading
+import time
+import traceback
+
+
+class _Refresh:
+    """One in-flight refresh that any number of callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class TokenManager:
+    """
+    Keeps a token fresh without putting the token request on the user's request path.
+
+    fetch_token() must return (token, expires_in_seconds), or None on failure.
+    on_token(token, expires_at) publishes a new token (expires_at is a time.time() value).
+
+    - refresh_now() blocks until a refresh finishes; concurrent callers share the same one.
+    - refresh_async() starts a refresh in a background thread unless one is already running.
+    - After every successful refresh a timer schedules the next one margin_for(expires_in)
+      seconds before expiry, so callers normally never see an expiring token. The timer
+      never fires sooner than min_refresh_delay seconds after the refresh.
+    """
+
+    def __init__(self, fetch_token, on_token, refresh_margin=600, retry_interval=30, background=True,
+                 min_refresh_delay=30):
+        self.fetch_token = fetch_token
+        self.on_token = on_token
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.background = background
+        self.min_refresh_delay = min_refresh_delay
+
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._timer = None
+
+    def refresh_now(self, timeout=None):
+        """Refresh (or join the refresh already in flight) and wait for it. Returns True on success."""
+        with self._lock:
+            refresh = self._inflight
+            leader = refresh is None
+            if leader:
+                refresh = self._inflight = _Refresh()
+
+        if leader:
+            self._run(refresh)
+        else:
+            refresh.done.wait(timeout)
+        return refresh.ok
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if self._inflight is not None:
+                return
+            refresh = self._inflight = _Refresh()
+        threading.Thread(target=self._run, args=(refresh,), name="token-refresh", daemon=True).start()
+
+    def margin_for(self, expires_in):
+        """
+        refresh_margin, capped at half the token's lifetime: a margin at or above the lifetime
+        would make every new token due for refresh the moment it arrives.
+        """
+        return min(self.refresh_margin, expires_in / 2)
+
+    def stop(self):
+        """Cancel the scheduled refresh."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _run(self, refresh):
+        try:
+            result = self.fetch_token()
+            if result:
+                token, expires_in = result
+                expires_at = time.time() + expires_in
+                self.on_token(token, expires_at)
+                refresh.ok = True
+                self._schedule(max(expires_in - self.margin_for(expires_in), self.min_refresh_delay))
+            else:
+                self._schedule(self.retry_interval)
+        except Exception as e:
+            print(f"Token refresh failed: {e}")
+            traceback.print_exc()
+            self._schedule(self.retry_interval)
+        finally:
+            with self._lock:
+                self._inflight = None
+            refresh.done.set()
+
+    def _schedule(self, delay):
+        if not self.background:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(max(delay, 0), self.refresh_async)
+            self._timer.daemon = True
+            self._timer.start()
@@ -0,0 +1,92 @@
+"""
+Token cache shared by every worker process on the machine
+A small JSON file plus a lock file: one process refreshes, the others just read.
+"""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows - fall back to msvcrt byte-range locks
+    fcntl = None
+    import msvcrt
+
+
+class FileTokenStore:
+    """
+    Stores {"access_token": ..., "expires_at": ...} in a JSON file.
+
+    Writes are atomic (temp file + rename) so readers never see a partial token.
+    lock() is an exclusive cross-process lock on a separate .lock file, held while a
+    process refreshes so the others wait and then re-read instead of refreshing too.
+    """
+
+    def __init__(self, path, lock_timeout=15):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.lock_timeout = lock_timeout
+
+    def read(self):
+        """Return (token, expires_at) or None if there is no readable token."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["access_token"], float(data["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, token, expires_at):
+        """Atomically replace the stored token. The file is only readable by this user."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"access_token": token, "expires_at": expires_at}, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def lock(self):
+        """Exclusive cross-process lock. Raises TimeoutError after lock_timeout seconds."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            deadline = time.monotonic() + self.lock_timeout
+            while True:
+                try:
+                    self._try_lock(lock_file)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Could not lock {self.lock_path}")
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                self._unlock(lock_file)
+
+    @staticmethod
+    def _try_lock(lock_file):
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+
+    @staticmethod
+    def _unlock(lock_file):
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,50 +1,200 @@
-import re 
-import google.generativeai as genai
-from configparser import ConfigParser, ExtendedInterpolation
-import os 
+import re
+import random
+import os
+import threading
+import time
 
-def get_similar_gift_ideas(gift_name: str, num_ideas: int = 2):
+from Caching.result_cache import TTLCache
+from Gemini.idea_store import GiftIdeaStore
+from Monitoring.metrics import observe_vendor, register_cache
+from settings import get_bool_setting, get_int_setting, get_setting
+from Transport.resilience import call_with_retries
+
+# Get the directory where this script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Memoization: in-memory LRU in front of an SQLite store, both with the same TTL
+IDEA_CACHE_ENABLED = get_bool_setting('cache', 'gemini_cache_enabled', True)
+IDEA_TTL_SECONDS = get_int_setting('cache', 'gemini_ttl_seconds', 7 * 24 * 3600)
+# Ideas generated per LLM call; repeat requests get a random sample of num_ideas from this pool
+IDEA_POOL_SIZE = get_int_setting('cache', 'gemini_pool_size', 6)
+
+IDEA_CACHE = TTLCache(
+    max_entries=get_int_setting('cache', 'gemini_memory_entries', 512),
+    ttl_seconds=IDEA_TTL_SECONDS
+)
+register_cache('gemini_ideas', IDEA_CACHE)
+IDEA_STORE = GiftIdeaStore(
+    db_path=get_setting('cache', 'gemini_db_path', os.path.join(script_dir, 'gift_ideas.sqlite3')),
+    ttl_seconds=IDEA_TTL_SECONDS
+)
+
+
+# google.generativeai pulls in grpc and protobuf, so it is imported on first use (or by warm_up())
+genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """The google.generativeai module, imported on first use."""
+    global genai
+    if genai is None:
+        with _genai_lock:
+            if genai is None:
+                import google.generativeai as module
+                genai = module
+    return genai
+
+
+def normalize_gift_name(gift_name):
+    """Case, whitespace and punctuation folded gift name used as the memo key."""
+    cleaned = re.sub(r"[^\w\s]", " ", str(gift_name).lower())
+    return " ".join(cleaned.split())
+
+
+def get_similar_gift_ideas(gift_name: str, num_ideas: int = 2, use_cache: bool = True, deadline: float = None):
     """
     Returns short, thematically similar gift ideas.
+    Memoized per (normalized gift name, num_ideas): memory first, then the SQLite store,
+    and only then the LLM. deadline (a time.monotonic() value) caps the LLM request timeout.
+    """
+    if not (use_cache and IDEA_CACHE_ENABLED):
+        return _generate_ideas(gift_name, num_ideas, deadline)
+
+    key = f"{normalize_gift_name(gift_name)}|{num_ideas}"
+
+    pool = IDEA_CACHE.get(key)
+    if pool is None:
+        stored = IDEA_STORE.get(key)
+        if stored is not None:
+            pool, created_at = stored
+            # Expire the memory copy with the row, not a full TTL after it was read
+            # (a ttl of 0 means "never expires" to TTLCache, so a row with nothing left isn't copied)
+            ttl = IDEA_STORE.ttl_seconds
+            remaining = ttl - (time.time() - created_at) if ttl else None
+            if remaining is None or remaining > 0:
+                IDEA_CACHE.set(key, pool, ttl_seconds=remaining)
+
+    if pool is None:
+        pool = _generate_ideas(gift_name, max(num_ideas, IDEA_POOL_SIZE), deadline)
+        if pool == ["(no ideas found)"]:
+            return pool
+        IDEA_CACHE.set(key, pool)
+        IDEA_STORE.set(key, pool)
+
+    if len(pool) <= num_ideas:
+        return list(pool)
+    # Different slice of the pool each time so repeat users still see variety
+    return random.sample(pool, num_ideas)
+
+
+class GeminiClient:
     """
-    
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+    Long-lived Gemini model shared by every request in the process.
 
-    # Go up one level to SantasHelpr folder
-    config_path = os.path.join(script_dir, '..', 'config.ini')
+    Setup (API key lookup, genai.configure, GenerativeModel construction) happens once,
+    lazily on first use or eagerly through warm_up().
 
+    Thread-safety: setup is guarded by a lock so concurrent first requests configure the
+    SDK exactly once. After that the model is only read - generate_content keeps no
+    per-call state on the model object - so generate() may be called from any number of
+    threads at the same time. genai.configure is process-global, so don't configure the
+    SDK with a different key elsewhere in the same process.
+    """
+
+    def __init__(self, api_key=None, model_name='gemini-2.0-flash'):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._generation_configs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    api_key = self.api_key or (get_setting('gemini', 'GEMINI_API_KEY') or '').strip()
+                    if not api_key:
+                        raise KeyError("GEMINI_API_KEY missing from the [gemini] section of config.ini")
+                    get_genai().configure(api_key=api_key)
+                    self._model = get_genai().GenerativeModel(self.model_name)
+        return self._model
+
+    def generation_config(self, max_output_tokens):
+        """GenerationConfig objects are immutable, so one per token limit is reused."""
+        config = self._generation_configs.get(max_output_tokens)
+        if config is None:
+            with self._lock:
+                config = self._generation_configs.get(max_output_tokens)
+                if config is None:
+                    config = get_genai().GenerationConfig(
+                        temperature=0.8,
+                        top_p=0.9,
+                        max_output_tokens=max_output_tokens,
+                    )
+                    self._generation_configs[max_output_tokens] = config
+        return config
+
+    def generate(self, prompt, max_output_tokens=60, timeout=None):
+        """Run one prompt and return the response text. timeout is in seconds."""
+        kwargs = {"request_options": {"timeout": timeout}} if timeout is not None else {}
+        response = self.model.generate_content(
+            prompt,
+            generation_config=self.generation_config(max_output_tokens),
+            **kwargs
+        )
+        return response.text
+
+    def warm_up(self):
+        """Do the one-time setup now instead of on the first request."""
+        return self.model is not None
+
+
+_client = None
+_client_lock = threading.Lock()
 
-    config = ConfigParser(interpolation=ExtendedInterpolation())
-    config.read(config_path)
 
-    GEMINI = config['gemini']['GEMINI_API_KEY'].strip()
+def get_client():
+    """Return the process-wide GeminiClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
 
-    genai.configure(api_key=GEMINI)
-    
-    # Initialize the model
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
+
+def warm_up():
+    """Initialize the shared Gemini client at startup. Returns False if it can't be set up."""
+    try:
+        return get_client().warm_up()
+    except Exception as e:
+        print(f"Gemini warm-up failed: {e}")
+        return False
+
+
+def _generate_ideas(gift_name: str, num_ideas: int, deadline: float = None):
+    """
+    Ask Gemini for num_ideas similar gifts.
+    """
     prompt = f"List {num_ideas} toys or gifts similar to '{gift_name}', separated by commas. Only return names."
-    
-    # Generate response
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.GenerationConfig(
-            temperature=0.8,
-            top_p=0.9,
-            max_output_tokens=60,
+    max_output_tokens = 60 if num_ideas <= 2 else 30 * num_ideas
+
+    # Generate response (read timeout from [http], capped by the deadline)
+    with observe_vendor('gemini'):
+        text = call_with_retries(
+            'gemini',
+            lambda timeout: get_client().generate(prompt, max_output_tokens=max_output_tokens, timeout=timeout[1]),
+            deadline
         )
-    )
-    
-    text = response.text
-    
+
     # Remove unwanted labels or formatting artifacts
     text = re.sub(r"(?i)\b(solution|answer|response|output)\s*[:\-–]*", "", text)
     text = text.replace("**", "").strip()
-    
+
     # Extract clean list
     ideas = re.split(r"[,;\n]+", text)
     ideas = [i.strip(" -*") for i in ideas if i.strip()]
-    
-    return ideas[:num_ideas] if ideas else ["(no ideas found)"]
\ No newline at end of file
+
+    return ideas[:num_ideas] if ideas else ["(no ideas found)"]
@@ -0,0 +1,88 @@
+"""
+On-disk store for generated gift ideas (SQLite)
+Survives restarts and is shared by every worker process on the machine.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class GiftIdeaStore:
+    """
+    Maps a cache key to a list of gift ideas with a creation timestamp.
+    A new connection is opened per operation, so one instance is safe to share across threads.
+    """
+
+    def __init__(self, db_path, ttl_seconds):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS gift_ideas ("
+                        " cache_key TEXT PRIMARY KEY,"
+                        " ideas TEXT NOT NULL,"
+                        " created_at REAL NOT NULL)"
+                    )
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def get(self, key):
+        """Return (ideas, created_at) for key, or None if missing or older than the TTL."""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT ideas, created_at FROM gift_ideas WHERE cache_key = ?", (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Gift idea store read failed: {e}")
+            return None
+
+        if row is None:
+            return None
+        ideas, created_at = row
+        if self.ttl_seconds and time.time() - created_at >= self.ttl_seconds:
+            return None
+        return json.loads(ideas), created_at
+
+    def set(self, key, ideas):
+        """Store ideas for key, replacing any older entry."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO gift_ideas (cache_key, ideas, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(ideas), time.time())
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Gift idea store write failed: {e}")
+
+    def purge_expired(self):
+        """Delete rows older than the TTL. Returns the number removed."""
+        if not self.ttl_seconds or not os.path.exists(self.db_path):
+            return 0
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "DELETE FROM gift_ideas WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
@@ -0,0 +1,248 @@
+"""
+Minimal Prometheus-style metrics (counters, gauges, histograms) with a text exposition endpoint
+No external collector or client library needed - /metrics renders everything in-process.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, tuned for upstream APIs that answer in 50ms - 10s
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(label_names, labels):
+    missing = set(label_names) - set(labels)
+    if missing:
+        raise ValueError(f"Missing labels: {sorted(missing)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _format_labels(label_names, key, extra=None):
+    pairs = list(zip(label_names, key)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = [
+        '%s="%s"' % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """For collectors mirroring a running total kept elsewhere (e.g. a cache's hit count)."""
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(_label_key(self.label_names, labels))
+            return state["count"] if state else 0
+
+    def _render_sample(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            le = [("le", _format_value(bound) if bound == float("inf") else repr(bound))]
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Holds metrics plus collector callbacks that refresh gauges right before each scrape."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def add_collector(self, fn):
+        """fn() is called before every render; use it to copy live stats into gauges."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP routes
+HTTP_REQUESTS = REGISTRY.counter(
+    "santas_http_requests_total", "HTTP requests handled, by route and status code", ("route", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "santas_http_request_duration_seconds", "Time to produce the HTTP response, by route", ("route",))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "santas_http_requests_in_flight", "Requests currently being handled, by route", ("route",))
+
+# Upstream vendors (ebay, amazon, gemini)
+VENDOR_LATENCY = REGISTRY.histogram(
+    "santas_vendor_request_duration_seconds", "Latency of upstream calls, by vendor", ("vendor",))
+VENDOR_ERRORS = REGISTRY.counter(
+    "santas_vendor_errors_total", "Failed upstream calls, by vendor and kind (error, timeout)", ("vendor", "kind"))
+
+# Chat-mode NLP process pool (NLP/nlp_pool.py)
+NLP_POOL_REQUESTS = REGISTRY.counter(
+    "santas_nlp_pool_requests_total",
+    "Chat extractions by outcome (pool, cached, or regex fallback: saturated, timeout, error)", ("outcome",))
+
+# Caches (filled in by register_cache collectors)
+CACHE_HITS = REGISTRY.counter("santas_cache_hits_total", "Cache hits since start, by cache", ("cache",))
+CACHE_MISSES = REGISTRY.counter("santas_cache_misses_total", "Cache misses since start, by cache", ("cache",))
+CACHE_HIT_RATIO = REGISTRY.gauge("santas_cache_hit_ratio", "Hits / lookups since start, by cache", ("cache",))
+CACHE_ENTRIES = REGISTRY.gauge("santas_cache_entries", "Entries currently cached, by cache", ("cache",))
+CACHE_BYTES = REGISTRY.gauge("santas_cache_bytes", "Estimated bytes currently cached, by cache", ("cache",))
+
+
+def error_kind(exc):
+    """'timeout' for timeouts (builtin or requests' ReadTimeout/ConnectTimeout), else 'error'."""
+    if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "error"
+
+
+@contextmanager
+def observe_vendor(vendor):
+    """Record latency of an upstream call and count it as an error/timeout if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        VENDOR_ERRORS.inc(vendor=vendor, kind=error_kind(e))
+        raise
+    finally:
+        VENDOR_LATENCY.observe(time.perf_counter() - start, vendor=vendor)
+
+
+def register_cache(name, cache):
+    """Export a cache's stats() (hits, misses, hit_ratio, entries, bytes) on every scrape."""
+    def collect():
+        stats = cache.stats()
+        CACHE_HITS.set_total(stats["hits"], cache=name)
+        CACHE_MISSES.set_total(stats["misses"], cache=name)
+        CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=name)
+        CACHE_ENTRIES.set(stats["entries"], cache=name)
+        CACHE_BYTES.set(stats.get("bytes", 0), cache=name)
+    REGISTRY.add_collector(collect)
@@ -0,0 +1,65 @@
+"""
+Per-request timing spans (NLP, Gemini, each vendor call, compare, ...)
+Exposed to clients as a Server-Timing header and an optional "timings" JSON block.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class RequestTimer:
+    """
+    Collects named spans for one request.
+    Thread-safe: vendor calls record their spans from the fan-out pool threads.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """Time the body of a with-block as span name (recorded even if it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, start)
+
+    def record(self, name, duration_ms, started_at=None):
+        """Add a span measured elsewhere. started_at is a time.perf_counter() value."""
+        offset_ms = ((started_at or time.perf_counter()) - self._start) * 1000
+        with self._lock:
+            self._spans.append({
+                "name": name,
+                "start_ms": round(offset_ms, 2),
+                "duration_ms": round(duration_ms, 2)
+            })
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def as_list(self):
+        """Spans ordered by start time, plus the total so far."""
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        return spans + [{"name": "total", "start_ms": 0.0, "duration_ms": round(self.elapsed_ms(), 2)}]
+
+    def server_timing_header(self):
+        """Server-Timing header value, e.g. 'gemini;dur=812.4, ebay_main;dur=301.2, total;dur=845.0'."""
+        return ", ".join(
+            f"{_metric_name(s['name'])};dur={s['duration_ms']}" for s in self.as_list()
+        )
+
+
+def span(timer, name):
+    """timer.span(name), or a no-op when there is no timer."""
+    return timer.span(name) if timer is not None else nullcontext()
+
+
+def _metric_name(name):
+    # Server-Timing metric names must be HTTP tokens
+    return re.sub(r"[^A-Za-z0-9_.\-]", "_", name)
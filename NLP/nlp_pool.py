@@ -0,0 +1,143 @@
+"""
+Process pool for chat-mode NLP extraction
+spaCy inference is CPU-bound and holds the GIL, so one process tops out at about one core.
+Each worker process loads its own model; when every worker is busy (or a parse takes too
+long) the request gets the regex-only extraction instead of waiting.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+from Monitoring.metrics import NLP_POOL_REQUESTS
+from NLP.simple_nlp import SimpleNLPExtractor, warm_up as warm_up_nlp
+from settings import get_int_setting, get_setting
+
+# The extractor inside each worker process, created by _init_worker
+_worker_extractor = None
+
+
+def _init_worker():
+    """Runs once in each worker process: load the model before taking any queries."""
+    global _worker_extractor
+    # The parent process caches results, so workers don't keep a cache of their own
+    _worker_extractor = SimpleNLPExtractor(cache_size=0)
+    warm_up_nlp()
+
+
+def _extract_in_worker(query):
+    return _worker_extractor.extract(query)
+
+
+def _ping():
+    return True
+
+
+class NLPPool:
+    """
+    extract(query) runs SimpleNLPExtractor.extract in one of `processes` worker processes.
+
+    At most max_pending queries are queued or running at once (default 2 per process).
+    Past that, or when a worker takes longer than timeout seconds, or if the pool is
+    broken, extract() returns the regex-only extraction (no spaCy) instead.
+    Results are cached in extractor, the in-process SimpleNLPExtractor, so repeats
+    don't leave the process at all. Regex fallbacks are not cached.
+    """
+
+    def __init__(self, processes: int, timeout: float = 2.0, max_pending: Optional[int] = None,
+                 extractor: Optional[SimpleNLPExtractor] = None, start_method: str = 'spawn', executor=None):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_pending = max_pending if max_pending else 2 * processes
+        self.extractor = extractor if extractor is not None else SimpleNLPExtractor()
+
+        self._regex_extractor = SimpleNLPExtractor(cache_size=0)
+        self._regex_extractor.use_spacy = False
+
+        # spawn, not fork: forking a threaded Flask process can copy held locks into the child
+        self._executor = executor if executor is not None else ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+        self._lock = threading.Lock()
+        self.counts = {'pool': 0, 'cached': 0, 'saturated': 0, 'timeout': 0, 'error': 0}
+
+    def extract(self, query: str) -> Dict[str, Any]:
+        """Same dict as SimpleNLPExtractor.extract(query), or its regex-only version on fallback."""
+        cached = self.extractor.cached_result(query)
+        if cached is not None:
+            self._count('cached')
+            return cached
+
+        if not self._slots.acquire(blocking=False):
+            return self._fallback(query, 'saturated')
+        try:
+            future = self._executor.submit(_extract_in_worker, query)
+        except Exception as e:
+            # BrokenProcessPool (a worker died) or RuntimeError after shutdown
+            self._slots.release()
+            print(f"NLP pool unavailable: {type(e).__name__}: {e}")
+            return self._fallback(query, 'error')
+        # The slot is held until the worker is done, even if this caller stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # only stops it if no worker has picked it up yet
+            return self._fallback(query, 'timeout')
+        except Exception as e:
+            print(f"NLP pool extraction failed: {type(e).__name__}: {e}")
+            return self._fallback(query, 'error')
+
+        self._count('pool')
+        self.extractor.cache_result(query, result)
+        return result
+
+    def warm_up(self, timeout: Optional[float] = None) -> bool:
+        """Start every worker and wait for their models to load. Returns False on timeout or error."""
+        futures = [self._executor.submit(_ping) for _ in range(self.processes)]
+        try:
+            for future in futures:
+                future.result(timeout=timeout)
+        except Exception as e:
+            print(f"NLP pool warm-up failed: {type(e).__name__}: {e}")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """How each extract() was answered: pool, cached, or a regex fallback (saturated, timeout, error)."""
+        with self._lock:
+            return dict(self.counts)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _fallback(self, query, reason):
+        self._count(reason)
+        return self._regex_extractor.extract(query)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+        NLP_POOL_REQUESTS.inc(outcome=outcome)
+
+
+def pool_from_config(extractor: Optional[SimpleNLPExtractor] = None) -> Optional[NLPPool]:
+    """
+    An NLPPool per the [nlp] POOL_* settings, or None when POOL_PROCESSES is 0 (the default).
+    Always None inside a multiprocessing child: a spawned worker re-imports the main module,
+    and must not start a pool of its own.
+    """
+    processes = get_int_setting('nlp', 'pool_processes', 0)
+    if processes <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    return NLPPool(
+        processes,
+        timeout=get_int_setting('nlp', 'pool_timeout_ms', 2000) / 1000,
+        max_pending=get_int_setting('nlp', 'pool_max_pending', 0),
+        extractor=extractor,
+        start_method=get_setting('nlp', 'pool_start_method', 'spawn'),
+    )
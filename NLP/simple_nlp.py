@@ -3,22 +3,117 @@ Enhanced NLP extractor for chat mode - uses spaCy + regex for best extraction
 Combines entity recognition, POS tagging, noun chunks, and pattern matching
 """
 
+import copy
 import re
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Iterable, Iterator, Optional, List
 
-# Try to load spaCy
-try:
+from Caching.result_cache import TTLCache
+from settings import get_bool_setting, get_int_setting, get_setting
+
+# Components extract() reads: entities (ner), POS (tok2vec, tagger, attribute_ruler), lemmas
+# (lemmatizer) and noun chunks (parser). Any other component of the model is disabled;
+# [nlp] PIPES can trim this further, e.g. drop parser to skip noun chunks.
+DEFAULT_PIPES = "tok2vec, tagger, attribute_ruler, lemmatizer, parser, ner"
+
+# spaCy and en_core_web_sm take seconds to load, so they are loaded on first use (or by warm_up())
+nlp = None
+SPACY_AVAILABLE = None  # None until the first load attempt
+_nlp_lock = threading.Lock()
+
+# Regex tables, compiled once. Within each list the first pattern that matches anywhere wins.
+MAX_PRICE_PATTERNS = [re.compile(p) for p in (
+    r'under\s*\$?(\d+(?:\.\d{2})?)',
+    r'less\s*than\s*\$?(\d+(?:\.\d{2})?)',
+    r'up\s*to\s*\$?(\d+(?:\.\d{2})?)',
+    r'no\s*more\s*than\s*\$?(\d+(?:\.\d{2})?)',
+    r'max(?:imum)?\s*\$?(\d+(?:\.\d{2})?)',
+    r'\$?(\d+(?:\.\d{2})?)\s*(?:or\s*less|max|budget)',
+    r'budget\s*(?:of\s*)?\$?(\d+(?:\.\d{2})?)',
+    r'around\s*\$?(\d+(?:\.\d{2})?)',
+    r'about\s*\$?(\d+(?:\.\d{2})?)',
+    r'roughly\s*\$?(\d+(?:\.\d{2})?)',
+)]
+MIN_PRICE_PATTERNS = [re.compile(p) for p in (
+    r'at\s*least\s*\$?(\d+(?:\.\d{2})?)',
+    r'minimum\s*(?:of\s*)?\$?(\d+(?:\.\d{2})?)',
+    r'over\s*\$?(\d+(?:\.\d{2})?)',
+    r'more\s*than\s*\$?(\d+(?:\.\d{2})?)',
+    r'above\s*\$?(\d+(?:\.\d{2})?)',
+)]
+PRICE_RANGE_PATTERN = re.compile(r'\$?(\d+(?:\.\d{2})?)\s*(?:-|to)\s*\$?(\d+(?:\.\d{2})?)')
+
+AGE_CONTEXT_PATTERN = re.compile(r'\d+\s*(?:year|yr|yo)')
+AGE_PATTERNS = [re.compile(p) for p in (
+    r'(\d{1,2})\s*year\s*old',
+    r'(\d{1,2})\s*-?\s*year\s*-?\s*old',
+    r'(\d{1,2})\s*yo\b',
+    r'(\d{1,2})\s*y\.?o\.?\b',
+    r'age\s*(\d{1,2})\b',
+    r'(\d{1,2})\s*years?\s*old',
+    r'aged?\s*(\d{1,2})\b',
+)]
+
+# Price and age mentions stripped, in this order, before the regex fallback picks keywords
+TOPIC_CLEANUP_PATTERNS = [re.compile(p) for p in (
+    r'\$\d+(?:\.\d{2})?',
+    r'under\s*\d+',
+    r'less\s*than\s*\d+',
+    r'up\s*to\s*\d+',
+    r'budget\s*(?:of\s*)?\d+',
+    r'around\s*\d+',
+    r'about\s*\d+',
+    r'\d+\s*dollars?',
+    r'\d+\s*-?\s*year\s*-?\s*old',
+    r'\d+\s*yo\b',
+    r'age\s*\d+',
+)]
+
+# A keyword table entry made of one word matches \bkeyword\b exactly when it equals one of these tokens
+WORD_PATTERN = re.compile(r'\w+')
+LETTERS_PATTERN = re.compile(r'\b[a-z]+\b')
+
+# Punctuation dropped from cache keys: everything but $ . - (prices, ranges, "y.o."), and sentence-ending dots
+KEY_PUNCTUATION_PATTERN = re.compile(r'[^\w\s$.\-]|\.(?=\s|$)')
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for query: lowercased, punctuation stripped, whitespace collapsed."""
+    return ' '.join(KEY_PUNCTUATION_PATTERN.sub(' ', query.lower()).split())
+
+
+def _load_pipeline():
+    """Load [nlp] MODEL with only the [nlp] PIPES components enabled."""
     import spacy
-    try:
-        nlp = spacy.load('en_core_web_sm')
-        SPACY_AVAILABLE = True
-        print("✓ spaCy loaded successfully for enhanced NLP")
-    except OSError:
-        SPACY_AVAILABLE = False
-        print("⚠ spaCy model not found. Run: python -m spacy download en_core_web_sm")
-except ImportError:
-    SPACY_AVAILABLE = False
-    print("⚠ spaCy not installed. Run: pip install spacy")
+    model = get_setting('nlp', 'model', 'en_core_web_sm')
+    pipeline = spacy.load(model)
+    keep = {p.strip() for p in get_setting('nlp', 'pipes', DEFAULT_PIPES).split(',') if p.strip()}
+    disabled = [p for p in pipeline.pipe_names if p not in keep]
+    if disabled:
+        pipeline.select_pipes(disable=disabled)
+    print(f"✓ spaCy loaded successfully for enhanced NLP ({model}: {', '.join(pipeline.pipe_names)})")
+    return pipeline
+
+
+def get_nlp():
+    """The shared spaCy pipeline, loaded on first use; None when spaCy or its model is missing."""
+    global nlp, SPACY_AVAILABLE
+    if SPACY_AVAILABLE is None:
+        with _nlp_lock:
+            if SPACY_AVAILABLE is None:
+                try:
+                    nlp = _load_pipeline()
+                except ImportError:
+                    print("⚠ spaCy not installed. Run: pip install spacy")
+                except OSError:
+                    print("⚠ spaCy model not found. Run: python -m spacy download en_core_web_sm")
+                SPACY_AVAILABLE = nlp is not None
+    return nlp
+
+
+def warm_up():
+    """Load spaCy now instead of on the first chat request. Returns False if it isn't available."""
+    return get_nlp() is not None
 
 
 class SimpleNLPExtractor:
@@ -27,8 +122,18 @@ class SimpleNLPExtractor:
     Uses spaCy NLP + regex patterns for comprehensive extraction.
     """
 
-    def __init__(self):
-        self.use_spacy = SPACY_AVAILABLE
+    def __init__(self, cache_size: Optional[int] = None):
+        """
+        cache_size: how many extract() results to keep, by normalize_query(query).
+        Defaults to [cache] NLP_MAX_ENTRIES (0 or NLP_CACHE_ENABLED = false turns caching off).
+        """
+        self._use_spacy = None  # decided on first use, so constructing an extractor doesn't load spaCy
+        
+        if cache_size is None:
+            cache_size = (get_int_setting('cache', 'nlp_max_entries', 2048)
+                          if get_bool_setting('cache', 'nlp_cache_enabled', True) else 0)
+        # LRU of extract() results; entries never expire since the tables they come from don't change
+        self.cache = TTLCache(max_entries=cache_size, ttl_seconds=0) if cache_size > 0 else None
         
         # Common words to filter out
         self.stop_words = {
@@ -89,25 +194,127 @@ class SimpleNLPExtractor:
             'art': ['art', 'craft', 'drawing', 'painting', 'creative', 'supplies'],
             'music': ['music', 'guitar', 'piano', 'instrument', 'vinyl', 'record'],
         }
+        self._compile_tables()
+
+    def _compile_tables(self):
+        """
+        Index relationships and category_keywords so a query is matched in one pass over its words.
+        Call again after editing either table (and clear self.cache, if any).
+        """
+        # word (and its plural) -> positions of the categories it belongs to; keywords that
+        # aren't a single word ('action figure') keep their own \bkeyword s?\b pattern
+        self._category_names = list(self.category_keywords)
+        self._category_words = {}
+        self._category_phrases = []
+        for index, keywords in enumerate(self.category_keywords.values()):
+            for keyword in keywords:
+                if WORD_PATTERN.fullmatch(keyword):
+                    for form in (keyword, keyword + 's'):
+                        self._category_words.setdefault(form, set()).add(index)
+                else:
+                    self._category_phrases.append((index, re.compile(rf'\b{keyword}s?\b')))
+
+        # The first relationship in table order wins, so remember each one's position
+        self._relationship_names = list(self.relationships)
+        self._relationship_words = {}
+        self._relationship_phrases = []
+        for index, rel in enumerate(self._relationship_names):
+            if WORD_PATTERN.fullmatch(rel):
+                self._relationship_words[rel] = index
+            else:
+                self._relationship_phrases.append((index, re.compile(rf'\b{rel}\b')))
+        self._relationship_pattern = re.compile(
+            r'\b(?:' + '|'.join(self._relationship_names) + r')\b') if self._relationship_names else None
+
+    @property
+    def use_spacy(self) -> bool:
+        if self._use_spacy is None:
+            self._use_spacy = get_nlp() is not None
+        return self._use_spacy
+
+    @use_spacy.setter
+    def use_spacy(self, value: bool):
+        self._use_spacy = value
 
     def extract(self, query: str) -> Dict[str, Any]:
         """
         Extract main topic and filters from a natural language query.
         Uses spaCy for NLP when available, with regex fallback.
         
+        Queries that only differ in case, whitespace or punctuation share one cached
+        result, so a repeat skips spaCy and the regex stages. Every call gets its own copy.
+        
         Returns:
             Dict with 'query', 'min_price', 'max_price', 'metadata'
         """
+        cached = self.cached_result(query)
+        if cached is not None:
+            return cached
+        
+        # Parse once; the entities, POS tags and noun chunks all come from this Doc
+        doc = get_nlp()(query) if self.use_spacy else None
+        result = self._build_result(query, doc, self._regex_fields(query))
+        self.cache_result(query, result)
+        return result
+
+    def cached_result(self, query: str) -> Optional[Dict[str, Any]]:
+        """A copy of the cached extract() result for query (or a rephrasing of it), else None."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(normalize_query(query))
+        if cached is None:
+            return None
+        result = copy.deepcopy(cached)
+        result['metadata']['original_query'] = query
+        return result
+
+    def cache_result(self, query: str, result: Dict[str, Any]):
+        """Cache a copy of query's extract() result (e.g. one computed in another process)."""
+        if self.cache is not None:
+            self.cache.set(normalize_query(query), copy.deepcopy(result))
+
+    def extract_many(self, queries: Iterable[str], batch_size: int = 64, n_process: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Extract every query, yielding the same dicts as extract() in the same order.
+        Bulk runs bypass the extract() cache.
+        
+        Queries are streamed through spaCy's nlp.pipe in batches of batch_size, parsed by
+        n_process worker processes (-1 = one per CPU). The regex stages run in this process
+        as spaCy pulls each query in, so they overlap with the parsing.
+        """
+        if not self.use_spacy:
+            for query in queries:
+                yield self._build_result(query, None, self._regex_fields(query))
+            return
+
+        with_fields = ((query, (query, self._regex_fields(query))) for query in queries)
+        for doc, (query, fields) in get_nlp().pipe(with_fields, as_tuples=True,
+                                                   batch_size=batch_size, n_process=n_process):
+            yield self._build_result(query, doc, fields)
+
+    def _regex_fields(self, query: str) -> tuple:
+        """The parts of extract() that don't need spaCy: (query_lower, min_price, max_price, relationship, categories)."""
         query_lower = query.lower()
+        words = set(WORD_PATTERN.findall(query_lower))
         
         # Extract price constraints (regex is reliable for this)
         min_price, max_price = self._extract_price(query_lower)
         
+        # Extract relationship (gender/demographic context is inferred from it below)
+        relationship = self._extract_relationship(query_lower, words)
+        
+        # Extract categories mentioned
+        categories = self._identify_categories(query_lower, words)
+        return query_lower, min_price, max_price, relationship, categories
+
+    def _build_result(self, query: str, doc, fields: tuple) -> Dict[str, Any]:
+        """The extract() dict for query from its parsed doc (None without spaCy) and _regex_fields."""
+        query_lower, min_price, max_price, relationship, categories = fields
+        
         # Extract age (regex + spaCy entity recognition)
-        age = self._extract_age(query, query_lower)
+        age = self._extract_age(query, query_lower, doc)
         
-        # Extract relationship and infer gender/demographic context
-        relationship = self._extract_relationship(query_lower)
+        # Infer gender/demographic context from the relationship
         rel_info = self.relationships.get(relationship, {}) if relationship else {}
         gender_context = rel_info.get('gender')
         demographic = rel_info.get('demographic')
@@ -116,12 +323,9 @@ class SimpleNLPExtractor:
         if age:
             demographic = self._get_demographic_from_age(age)
         
-        # Extract categories mentioned
-        categories = self._identify_categories(query_lower)
-        
         # Extract the main topic/product using spaCy or regex
-        if self.use_spacy:
-            main_topic, keywords = self._extract_main_topic_spacy(query, age, gender_context, demographic, categories)
+        if doc is not None:
+            main_topic, keywords = self._extract_main_topic_spacy(query, age, gender_context, demographic, categories, doc)
         else:
             main_topic, keywords = self._extract_main_topic_regex(query_lower, age, gender_context, demographic, categories)
         
@@ -146,60 +350,38 @@ class SimpleNLPExtractor:
         max_price = None
         
         # Max price patterns (order matters - more specific first)
-        max_patterns = [
-            r'under\s*\$?(\d+(?:\.\d{2})?)',
-            r'less\s*than\s*\$?(\d+(?:\.\d{2})?)',
-            r'up\s*to\s*\$?(\d+(?:\.\d{2})?)',
-            r'no\s*more\s*than\s*\$?(\d+(?:\.\d{2})?)',
-            r'max(?:imum)?\s*\$?(\d+(?:\.\d{2})?)',
-            r'\$?(\d+(?:\.\d{2})?)\s*(?:or\s*less|max|budget)',
-            r'budget\s*(?:of\s*)?\$?(\d+(?:\.\d{2})?)',
-            r'around\s*\$?(\d+(?:\.\d{2})?)',
-            r'about\s*\$?(\d+(?:\.\d{2})?)',
-            r'roughly\s*\$?(\d+(?:\.\d{2})?)',
-        ]
-        
-        for pattern in max_patterns:
-            match = re.search(pattern, query)
+        for pattern in MAX_PRICE_PATTERNS:
+            match = pattern.search(query)
             if match:
                 max_price = int(float(match.group(1)))
                 break
         
         # Min price patterns
-        min_patterns = [
-            r'at\s*least\s*\$?(\d+(?:\.\d{2})?)',
-            r'minimum\s*(?:of\s*)?\$?(\d+(?:\.\d{2})?)',
-            r'over\s*\$?(\d+(?:\.\d{2})?)',
-            r'more\s*than\s*\$?(\d+(?:\.\d{2})?)',
-            r'above\s*\$?(\d+(?:\.\d{2})?)',
-        ]
-        
-        for pattern in min_patterns:
-            match = re.search(pattern, query)
+        for pattern in MIN_PRICE_PATTERNS:
+            match = pattern.search(query)
             if match:
                 min_price = int(float(match.group(1)))
                 break
         
         # Price range pattern: $20-$50 or $20 to $50
-        range_match = re.search(r'\$?(\d+(?:\.\d{2})?)\s*(?:-|to)\s*\$?(\d+(?:\.\d{2})?)', query)
+        range_match = PRICE_RANGE_PATTERN.search(query)
         if range_match:
             min_price = int(float(range_match.group(1)))
             max_price = int(float(range_match.group(2)))
         
         return min_price, max_price
 
-    def _extract_age(self, query: str, query_lower: str) -> Optional[int]:
-        """Extract age from query using spaCy entities + regex patterns."""
+    def _extract_age(self, query: str, query_lower: str, doc=None) -> Optional[int]:
+        """Extract age from query using spaCy entities (from doc, the parsed query) + regex patterns."""
         age = None
         
         # First try spaCy for entity recognition
-        if self.use_spacy:
-            doc = nlp(query)
+        if doc is not None:
             for ent in doc.ents:
                 if ent.label_ == 'CARDINAL':
                     # Check if this cardinal is near "year old" or similar
                     context = query_lower[max(0, ent.start_char-5):min(len(query_lower), ent.end_char+15)]
-                    if re.search(r'\d+\s*(?:year|yr|yo)', context):
+                    if AGE_CONTEXT_PATTERN.search(context):
                         try:
                             age = int(ent.text)
                             if 0 <= age <= 100:
@@ -208,18 +390,8 @@ class SimpleNLPExtractor:
                             pass
         
         # Regex fallback/supplement
-        patterns = [
-            r'(\d{1,2})\s*year\s*old',
-            r'(\d{1,2})\s*-?\s*year\s*-?\s*old',
-            r'(\d{1,2})\s*yo\b',
-            r'(\d{1,2})\s*y\.?o\.?\b',
-            r'age\s*(\d{1,2})\b',
-            r'(\d{1,2})\s*years?\s*old',
-            r'aged?\s*(\d{1,2})\b',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, query_lower)
+        for pattern in AGE_PATTERNS:
+            match = pattern.search(query_lower)
             if match:
                 try:
                     age = int(match.group(1))
@@ -230,12 +402,13 @@ class SimpleNLPExtractor:
         
         return age
 
-    def _extract_relationship(self, query: str) -> Optional[str]:
-        """Extract relationship from query."""
-        for rel in self.relationships.keys():
-            if re.search(rf'\b{rel}\b', query):
-                return rel
-        return None
+    def _extract_relationship(self, query: str, words: Optional[set] = None) -> Optional[str]:
+        """Extract relationship from query (words: its \\w+ tokens, if already split)."""
+        if words is None:
+            words = set(WORD_PATTERN.findall(query))
+        found = [self._relationship_words[w] for w in words if w in self._relationship_words]
+        found += [index for index, pattern in self._relationship_phrases if pattern.search(query)]
+        return self._relationship_names[min(found)] if found else None
 
     def _get_demographic_from_age(self, age: int) -> str:
         """Map age to demographic category."""
@@ -254,30 +427,32 @@ class SimpleNLPExtractor:
         else:
             return 'senior'
 
-    def _identify_categories(self, query: str) -> List[str]:
-        """Identify product categories from the query."""
-        found_categories = []
-        for category, keywords in self.category_keywords.items():
-            for keyword in keywords:
-                if re.search(rf'\b{keyword}s?\b', query):
-                    if category not in found_categories:
-                        found_categories.append(category)
-                    break
-        return found_categories
+    def _identify_categories(self, query: str, words: Optional[set] = None) -> List[str]:
+        """Identify product categories from the query (words: its \\w+ tokens, if already split)."""
+        if words is None:
+            words = set(WORD_PATTERN.findall(query))
+        found = set()
+        for word in words:
+            found.update(self._category_words.get(word, ()))
+        for index, pattern in self._category_phrases:
+            if index not in found and pattern.search(query):
+                found.add(index)
+        return [self._category_names[index] for index in sorted(found)]
 
     def _extract_main_topic_spacy(self, query: str, age: Optional[int], 
                                    gender_context: Optional[str],
                                    demographic: Optional[str],
-                                   categories: List[str]) -> tuple:
+                                   categories: List[str], doc=None) -> tuple:
         """
-        Extract the main topic using spaCy NLP.
+        Extract the main topic using spaCy NLP (doc is the already parsed query, if any).
         Returns (search_query, keywords_list)
         """
-        doc = nlp(query)
+        if doc is None:
+            doc = get_nlp()(query)
         
-        # Extract noun chunks (multi-word phrases like "lego star wars")
+        # Extract noun chunks (multi-word phrases like "lego star wars"); they need the parser
         noun_chunks = []
-        for chunk in doc.noun_chunks:
+        for chunk in (doc.noun_chunks if doc.has_annotation("DEP") else []):
             chunk_text = chunk.text.lower()
             # Filter out chunks that are just stop words or relationships
             chunk_words = chunk_text.split()
@@ -347,27 +522,17 @@ class SimpleNLPExtractor:
         Fallback: Extract the main topic using regex (when spaCy unavailable).
         Returns (search_query, keywords_list)
         """
-        # Remove price mentions
-        cleaned = re.sub(r'\$\d+(?:\.\d{2})?', '', query)
-        cleaned = re.sub(r'under\s*\d+', '', cleaned)
-        cleaned = re.sub(r'less\s*than\s*\d+', '', cleaned)
-        cleaned = re.sub(r'up\s*to\s*\d+', '', cleaned)
-        cleaned = re.sub(r'budget\s*(?:of\s*)?\d+', '', cleaned)
-        cleaned = re.sub(r'around\s*\d+', '', cleaned)
-        cleaned = re.sub(r'about\s*\d+', '', cleaned)
-        cleaned = re.sub(r'\d+\s*dollars?', '', cleaned)
-        
-        # Remove age mentions
-        cleaned = re.sub(r'\d+\s*-?\s*year\s*-?\s*old', '', cleaned)
-        cleaned = re.sub(r'\d+\s*yo\b', '', cleaned)
-        cleaned = re.sub(r'age\s*\d+', '', cleaned)
-        
-        # Remove relationship words
-        for rel in self.relationships.keys():
-            cleaned = re.sub(rf'\b{rel}\b', '', cleaned)
+        # Remove price and age mentions
+        cleaned = query
+        for pattern in TOPIC_CLEANUP_PATTERNS:
+            cleaned = pattern.sub('', cleaned)
+        
+        # Remove relationship words (all of them in one pass)
+        if self._relationship_pattern is not None:
+            cleaned = self._relationship_pattern.sub('', cleaned)
         
         # Tokenize and filter
-        words = re.findall(r'\b[a-z]+\b', cleaned)
+        words = LETTERS_PATTERN.findall(cleaned)
         keywords = [w for w in words if w not in self.stop_words and len(w) > 2]
         
         # Build the search query
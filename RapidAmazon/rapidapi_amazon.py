@@ -1,24 +1,152 @@
 import json 
-from configparser import ConfigParser, ExtendedInterpolation
-import dateparser
+from datetime import date, timedelta
+import codecs
 import re 
-import requests
-import os 
+import threading
+import time
 
-# SETUP API KEYS AND HOSTS 
-script_dir = os.path.dirname(os.path.abspath(__file__))
-# Go up one level to SantasHelpr folder
-config_path = os.path.join(script_dir, '..', 'config.ini')
+from Monitoring.metrics import observe_vendor
+from settings import get_setting
+from Transport.http_session import get_session
+from Transport.rate_limit import PRIORITY_MAIN
+from Transport.resilience import call_with_retries
 
-config = ConfigParser(interpolation=ExtendedInterpolation())
-config.read(config_path)
+# dateparser takes most of a second to import, so it is only loaded for the first fragment the
+# fast path can't parse (or by warm_up())
+dateparser = None
+_dateparser_lock = threading.Lock()
 
-x_rapidapi_key = config['amazon']['rapid_api_key']
-x_rapidapi_host = config['amazon']['rapid_api_host']
+
+def get_dateparser():
+    """The dateparser module, imported on first use."""
+    global dateparser
+    if dateparser is None:
+        with _dateparser_lock:
+            if dateparser is None:
+                import dateparser as module
+                dateparser = module
+    return dateparser
+
+
+def warm_up():
+    """Import dateparser now instead of on the first unusual delivery date."""
+    get_dateparser()
+
+
+def get_api_credentials():
+    """(key, host) for RapidAPI from the [amazon] section of config.ini, read on use rather than at import."""
+    return get_setting('amazon', 'rapid_api_key'), get_setting('amazon', 'rapid_api_host')
 
 url = "https://amazon-online-data-api.p.rapidapi.com/search"
 
-def search_amazon(query, min_price, max_price, sort_by):
+# Bytes read per step when streaming a results page
+STREAM_CHUNK_SIZE = 16 * 1024
+# After stopping early the rest of the page is read and thrown away so the keep-alive connection
+# goes back to the pool (closing an unread response drops the socket, and the next call pays a
+# new TCP + TLS handshake). Past this many bytes it's cheaper to drop the connection instead.
+STREAM_DRAIN_MAX_BYTES = 1024 * 1024
+PRODUCTS_ARRAY_PATTERN = re.compile(r'"products"\s*:\s*\[')
+JSON_DECODER = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """Text buffer over a stream of bytes/str chunks, decoded as UTF-8 and read on demand."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ""
+        self.found = False  # set once the products array has been located
+
+    def more(self):
+        """Append the next chunk to buffer; False once the stream is exhausted."""
+        for chunk in self._chunks:
+            if chunk:
+                self.buffer += self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+                return True
+        return False
+
+    def read_all(self):
+        while self.more():
+            pass
+        return self.buffer
+
+
+def iter_products(reader, fields=None):
+    """
+    Yield the products of a search response one at a time as the chunks arrive, each passed
+    through filter_product (invalid prices skipped, only fields kept). Nothing past the last
+    product asked for is read.
+    """
+    match = PRODUCTS_ARRAY_PATTERN.search(reader.buffer)
+    while match is None:
+        if not reader.more():
+            return  # no products array: an error payload, left for the caller to read
+        match = PRODUCTS_ARRAY_PATTERN.search(reader.buffer)
+    reader.found = True
+    reader.buffer = reader.buffer[match.end():]
+
+    pos = 0
+    while True:
+        buffer = reader.buffer
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("Unterminated products array", buffer, pos)
+            product, end = JSON_DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The product is cut off at the end of the chunk: read on, unless the stream has ended
+            if not reader.more():
+                raise
+            continue
+        reader.buffer, pos = buffer[end:], 0
+
+        if not isinstance(product, dict):
+            continue
+        product = filter_product(product, fields)
+        if product is not None:
+            yield product
+
+
+def stream_products(chunks, max_products, fields=None):
+    """
+    Decode a search response from chunks until max_products valid products are collected.
+    Returns {"amazon_products": [...]}, the same as filter_product_data on the whole page,
+    or the whole decoded document when it has no products array (e.g. an error payload).
+    """
+    reader = _ChunkReader(chunks)
+    products = []
+    if max_products > 0:
+        for product in iter_products(reader, fields):
+            products.append(product)
+            if len(products) >= max_products:
+                break
+    if not reader.found:
+        return json.loads(reader.read_all())
+    return {"amazon_products": products}
+
+
+def _read_until(chunks, deadline):
+    """Yield chunks, raising TimeoutError instead of reading on once deadline (a time.monotonic() value) passes."""
+    for chunk in chunks:
+        yield chunk
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError("amazon: deadline passed while reading the response")
+
+
+def search_amazon(query, min_price, max_price, sort_by, deadline=None, priority=PRIORITY_MAIN,
+                  max_products=None, fields=None):
+    """
+    Search Amazon through RapidAPI.
+
+    With max_products the response is decoded as it streams in, and reading stops once that many
+    valid-priced products have arrived; the result is then {"amazon_products": [...]}, already
+    filtered as filter_product_data(page, max_products, fields) would. Reading the body also stops
+    (with TimeoutError) at deadline. Without max_products the whole page is returned as-is.
+    """
 
     querystring = {
         "query": query,
@@ -37,26 +165,58 @@ def search_amazon(query, min_price, max_price, sort_by):
     if max_price is not None:
         querystring["max_price"] = str(max_price)
     
+    x_rapidapi_key, x_rapidapi_host = get_api_credentials()
     headers = {
         "x-rapidapi-key": x_rapidapi_key,
 	    "x-rapidapi-host": x_rapidapi_host
     }
 
-    response = requests.get(url, headers=headers, params=querystring)
+    stream = max_products is not None
+    with observe_vendor('amazon'):
+        response = call_with_retries(
+            'amazon',
+            lambda timeout: get_session('amazon').get(url, headers=headers, params=querystring, timeout=timeout,
+                                                      **({"stream": True} if stream else {})),
+            deadline,
+            priority
+        )
 
-    # === Add these lines! ===
-    print(f"--- API Status Code: {response.status_code} ---")
-    
-    # This will print the raw error message if status is 4xx or 5xx
-    if response.status_code >= 400:
-        print(f"Raw Response Text: {response.text}")
-        response.raise_for_status() 
-    # ==========================
+        # === Add these lines! ===
+        print(f"--- API Status Code: {response.status_code} ---")
+        
+        # This will print the raw error message if status is 4xx or 5xx
+        if response.status_code >= 400:
+            print(f"Raw Response Text: {response.text}")
+            response.raise_for_status() 
+        # ==========================
+
+        if stream:
+            chunks = _read_until(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), deadline)
+            try:
+                return stream_products(chunks, max_products, fields)
+            finally:
+                _release(response, chunks)
 
     response_json = response.json()
 
     return response_json
 
+def _release(response, chunks):
+    """
+    Finish a streamed response: drain what's left of chunks (up to STREAM_DRAIN_MAX_BYTES, and
+    only until the deadline _read_until enforces) and close it.
+    """
+    drained = 0
+    try:
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > STREAM_DRAIN_MAX_BYTES:
+                break
+    except Exception:
+        pass  # the connection is dropped below either way
+    response.close()  # back to the pool if fully read, otherwise the socket is closed
+
+
 def is_valid_price(price):
     """
     Check if a price is valid (not None, not 'N/A', not 0.0, not empty string).
@@ -107,39 +267,49 @@ def filter_product_data(json_input, max_products, fields):
     filtered_products = []
     
     for product in products:
-        # Skip products with invalid prices
-        if 'product_price' in product and not is_valid_price(product.get('product_price')):
-            continue
-        
         # Stop if we've reached the desired number of products
         if len(filtered_products) >= max_products:
             break
         
-        if fields is None:
-            # If no fields specified, include all fields
-            filtered_products.append(product)
-        else:
-            # Only include specified fields
-            filtered_product = {}
-            for field in fields:
-                if field in product:
-                    # Special handling for product_title - extract from URL
-                    if field == 'product_title' and 'product_url' in product:
-                        extracted_title = extract_title_from_url(product['product_url'])
-                        if extracted_title:
-                            filtered_product[field] = extracted_title
-                        else:
-                            # Fallback to original title if extraction fails
-                            filtered_product[field] = product[field]
-                    elif field == 'product_delivery_info':
-                        # function for delivery info simplification 
-                        filtered_product[field] = extract_delivery_date(product[field], "", "")
-                    else:
-                        filtered_product[field] = product[field]
+        filtered_product = filter_product(product, fields)
+        if filtered_product is not None:
             filtered_products.append(filtered_product)
     
     return {"amazon_products": filtered_products}
 
+def filter_product(product, fields):
+    """
+    One product with only the specified fields (all of them if fields is None), or None if
+    its price is invalid. The title comes from the product URL and the delivery info is
+    simplified to min/max dates.
+    """
+    # Skip products with invalid prices
+    if 'product_price' in product and not is_valid_price(product.get('product_price')):
+        return None
+    
+    if fields is None:
+        # If no fields specified, include all fields
+        return product
+    
+    # Only include specified fields
+    filtered_product = {}
+    for field in fields:
+        if field in product:
+            # Special handling for product_title - extract from URL
+            if field == 'product_title' and 'product_url' in product:
+                extracted_title = extract_title_from_url(product['product_url'])
+                if extracted_title:
+                    filtered_product[field] = extracted_title
+                else:
+                    # Fallback to original title if extraction fails
+                    filtered_product[field] = product[field]
+            elif field == 'product_delivery_info':
+                # function for delivery info simplification 
+                filtered_product[field] = extract_delivery_date(product[field], "", "")
+            else:
+                filtered_product[field] = product[field]
+    return filtered_product
+
 def extract_title_from_url(url):
     """
     Extract and format product title from Amazon URL.
@@ -165,6 +335,75 @@ def extract_title_from_url(url):
     except:
         return None
     
+# Delivery fragments Amazon sends over and over: "Sat, Nov 22", "Tomorrow, Nov 18", "Dec 1", "Tomorrow"
+FREE_DELIVERY_PATTERN = re.compile(r'FREE delivery(.*?)on')
+FASTEST_DELIVERY_PATTERN = re.compile(r'fastest delivery(.+?)(?=$|Or |FREE )')
+TOMORROW_PREFIX_PATTERN = re.compile(r'^Tomorrow,\s*')
+RANGE_START_PATTERN = re.compile(r'([A-Za-z]+)\s+(\d{1,2})')
+MONTH_DAY_PATTERN = re.compile(
+    r'^(?:(?:mon|tue|wed|thu|fri|sat|sun|today|tomorrow)[a-z]*\.?,?\s+)?([a-z]+)\.?\s+(\d{1,2})$', re.IGNORECASE)
+RELATIVE_DAYS = {"today": 0, "tomorrow": 1}
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",),
+        ("jun", "june"), ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"),
+        ("oct", "october"), ("nov", "november"), ("dec", "december")
+    ], 1)
+    for name in names
+}
+
+# Parsed fragments for the current day; relative dates change at midnight, so the cache does too
+DELIVERY_DATE_CACHE_SIZE = 4096
+_delivery_dates = {}
+_delivery_dates_day = None
+_delivery_dates_lock = threading.Lock()
+
+
+def _parse_delivery_fragment(date_str, anchor):
+    """ISO date for one fragment, resolved against anchor (today); None if it isn't a date."""
+    text = date_str.strip()
+    days = RELATIVE_DAYS.get(text.lower())
+    if days is not None:
+        return (anchor + timedelta(days=days)).isoformat()
+
+    match = MONTH_DAY_PATTERN.match(text)
+    if match:
+        month = MONTHS.get(match.group(1).lower())
+        if month:
+            try:
+                # No year in the text: the anchor's year, as dateparser does
+                return date(anchor.year, month, int(match.group(2))).isoformat()
+            except ValueError:
+                return None
+
+    # Anything else ("Overnight 7 AM - 11 AM", other languages) goes to the slow, general parser
+    parsed = get_dateparser().parse(text)
+    return parsed.strftime("%Y-%m-%d") if parsed else None
+
+
+def parse_delivery_date(date_str):
+    """
+    ISO date (YYYY-MM-DD) for one delivery fragment such as "Sat, Nov 22", "Nov 18" or "Tomorrow",
+    or None. Common shapes are parsed directly and dateparser is only used for the rest; results are
+    memoized per string for the current day.
+    """
+    global _delivery_dates_day
+    today = date.today()
+    with _delivery_dates_lock:
+        if _delivery_dates_day != today or len(_delivery_dates) >= DELIVERY_DATE_CACHE_SIZE:
+            _delivery_dates.clear()
+            _delivery_dates_day = today
+        if date_str in _delivery_dates:
+            return _delivery_dates[date_str]
+
+    parsed = _parse_delivery_fragment(date_str, today)
+    with _delivery_dates_lock:
+        if _delivery_dates_day == today:
+            _delivery_dates[date_str] = parsed
+    return parsed
+
+
 def extract_delivery_date(delivery_info, info, sort_by):
     """
     Extract estimated delivery date from delivery info string.
@@ -179,12 +418,10 @@ def extract_delivery_date(delivery_info, info, sort_by):
         return []
     
     # Extract text between "FREE delivery" and "on"
-    free_delivery_pattern = r'FREE delivery(.*?)on'
-    free_delivery_matches = re.findall(free_delivery_pattern, delivery_info)
+    free_delivery_matches = FREE_DELIVERY_PATTERN.findall(delivery_info)
     
     # Extract everything after "fastest delivery"
-    fastest_delivery_pattern = r'fastest delivery(.+?)(?=$|Or |FREE )'
-    fastest_delivery_matches = re.findall(fastest_delivery_pattern, delivery_info)
+    fastest_delivery_matches = FASTEST_DELIVERY_PATTERN.findall(delivery_info)
     
     # Combine all matches
     all_dates = free_delivery_matches + fastest_delivery_matches
@@ -195,7 +432,7 @@ def extract_delivery_date(delivery_info, info, sort_by):
         match = match.strip()
         
         # Remove "Tomorrow, " if present
-        match = re.sub(r'^Tomorrow,\s*', '', match)
+        match = TOMORROW_PREFIX_PATTERN.sub('', match)
         
         # Check if it's a date range (e.g., "Dec 1 - 10")
         if ' - ' in match:
@@ -203,7 +440,7 @@ def extract_delivery_date(delivery_info, info, sort_by):
             parts = match.split(' - ')
             if len(parts) == 2:
                 # Extract month from the first part
-                month_match = re.match(r'([A-Za-z]+)\s+(\d{1,2})', parts[0].strip())
+                month_match = RANGE_START_PATTERN.match(parts[0].strip())
                 if month_match:
                     month = month_match.group(1)
                     start_day = month_match.group(2)
@@ -224,9 +461,9 @@ def extract_delivery_date(delivery_info, info, sort_by):
         return {"minDelivery": None, "maxDelivery": None}
     parsed_dates = []
     for date_str in cleaned_dates:
-        new_date = dateparser.parse(date_str)
+        new_date = parse_delivery_date(date_str)
         if new_date:
-            parsed_dates.append(new_date.strftime("%Y-%m-%d"))
+            parsed_dates.append(new_date)
 
     if not parsed_dates:
         return {"minDelivery": None, "maxDelivery": None}
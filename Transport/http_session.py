@@ -0,0 +1,92 @@
+"""
+Shared HTTP transport for the vendor APIs (eBay, RapidAPI Amazon)
+One pooled requests.Session per vendor keeps TCP+TLS connections alive between calls.
+"""
+
+import threading
+import time
+
+import requests
+
+from settings import get_float_setting, get_int_setting
+
+# Per-vendor defaults, overridable in the [http] section of config.ini
+# e.g. EBAY_POOL_MAXSIZE = 32, AMAZON_READ_TIMEOUT = 8
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 15.0
+# Smallest timeout handed to requests when a deadline is (almost) used up
+MIN_TIMEOUT = 0.01
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _vendor_setting(getter, vendor, option, fallback):
+    """[http] <vendor>_<option>, falling back to [http] <option>, then to the default."""
+    default = getter('http', option, fallback)
+    return getter('http', f"{vendor}_{option}", default)
+
+
+def pool_maxsize(vendor):
+    """Idle connections kept per host for a vendor: [http] <vendor>_pool_maxsize or pool_maxsize."""
+    return _vendor_setting(get_int_setting, vendor, 'pool_maxsize', DEFAULT_POOL_MAXSIZE)
+
+
+def get_timeout(vendor, deadline=None):
+    """
+    (connect, read) timeout tuple for a vendor, in seconds.
+    deadline (a time.monotonic() value) caps both so a call never outlives the request's budget.
+    """
+    connect = _vendor_setting(get_float_setting, vendor, 'connect_timeout', DEFAULT_CONNECT_TIMEOUT)
+    read = _vendor_setting(get_float_setting, vendor, 'read_timeout', DEFAULT_READ_TIMEOUT)
+    if deadline is not None:
+        remaining = max(deadline - time.monotonic(), MIN_TIMEOUT)
+        connect, read = min(connect, remaining), min(read, remaining)
+    return connect, read
+
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """
+    Build a Session whose HTTPS/HTTP adapters keep up to pool_maxsize idle connections per host.
+    Retries are left to the caller so a slow vendor is not silently retried.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=False
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(vendor):
+    """
+    Return the process-wide pooled Session for a vendor ('ebay', 'amazon', ...).
+
+    Sessions are shared by all request threads. Callers must pass headers per request
+    and must not change session-level state (headers, auth, cookies).
+    """
+    session = _sessions.get(vendor)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(vendor)
+            if session is None:
+                session = create_session(
+                    pool_connections=_vendor_setting(get_int_setting, vendor, 'pool_connections', DEFAULT_POOL_CONNECTIONS),
+                    pool_maxsize=pool_maxsize(vendor)
+                )
+                _sessions[vendor] = session
+    return session
+
+
+def close_sessions():
+    """Close every pooled Session (e.g. at shutdown or in tests)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
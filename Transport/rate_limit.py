@@ -0,0 +1,204 @@
+"""
+Client-side rate limiting for the upstream APIs
+A token bucket per vendor keeps bursts under the plan's per-second limit (so we don't pay a round-trip
+for a 429), and a per-day/month call counter keeps us inside the plan's quota.
+"""
+
+import threading
+import time
+
+from Monitoring.metrics import REGISTRY
+from settings import get_float_setting, get_int_setting, get_setting
+
+# Call priorities: low-priority calls (similar-gift searches) are shed first so the main search
+# keeps the full quota
+PRIORITY_MAIN = "main"
+PRIORITY_LOW = "low"
+
+# Defaults for the [ratelimit] section; a vendor's <VENDOR>_RATE = 0 (the default) means unlimited
+DEFAULT_MAX_WAIT_MS = 500
+DEFAULT_LOW_PRIORITY_MAX_WAIT_MS = 0
+DEFAULT_LOW_PRIORITY_RESERVE = 0.5
+
+
+class RateLimitedError(Exception):
+    """Raised instead of calling a vendor when the call would exceed its rate or quota."""
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to burst. take() may queue a caller for up to max_wait seconds;
+    waiting callers go into debt so later callers queue behind them instead of jumping ahead.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def take(self, max_wait=0.0, reserve=0.0):
+        """
+        Take one token, keeping reserve tokens untouched. Returns False (taking nothing) when
+        that would mean waiting longer than max_wait seconds, otherwise waits as needed and returns True.
+        """
+        with self._lock:
+            self._refill()
+            wait = max(1 + reserve - self._tokens, 0) / self.rate
+            if wait > max_wait:
+                return False
+            self._tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def refund(self):
+        """Give back a token that was taken for a call that was not made."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens + 1, self.burst)
+
+
+class QuotaCounter:
+    """Calls made in the current UTC day or month, against a fixed quota (0 = no quota)."""
+
+    def __init__(self, quota, period="month"):
+        self.quota = quota
+        self.period = period
+        self._window = None
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _current_window(self):
+        return time.strftime("%Y-%m-%d" if self.period == "day" else "%Y-%m", time.gmtime())
+
+    def remaining(self):
+        if not self.quota:
+            return None
+        with self._lock:
+            if self._window != self._current_window():
+                return self.quota
+            return max(self.quota - self._used, 0)
+
+    def use(self, reserve=0):
+        """Count one call unless fewer than reserve + 1 calls are left; returns False if refused."""
+        if not self.quota:
+            return True
+        with self._lock:
+            window = self._current_window()
+            if window != self._window:
+                self._window, self._used = window, 0
+            if self.quota - self._used < 1 + reserve:
+                return False
+            self._used += 1
+            return True
+
+
+class RateLimiter:
+    """
+    Token bucket + quota for one vendor.
+
+    Main-priority calls may queue up to max_wait seconds for a token. Low-priority calls may only
+    use tokens (and quota) above low_priority_reserve of the burst (and quota), and queue up to
+    low_priority_max_wait, so they are the first to be shed when the vendor is busy.
+
+    Counts are per process; with several workers give each a share of the plan's limits.
+    """
+
+    def __init__(self, name, rate=0.0, burst=None, quota=0, quota_period="month", max_wait=0.5,
+                 low_priority_max_wait=0.0, low_priority_reserve=DEFAULT_LOW_PRIORITY_RESERVE):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst or max(rate, 1)) if rate > 0 else None
+        self.quota = QuotaCounter(quota, quota_period)
+        self.max_wait = max_wait
+        self.low_priority_max_wait = low_priority_max_wait
+        self.low_priority_reserve = low_priority_reserve
+
+    def acquire(self, priority=PRIORITY_MAIN, deadline=None):
+        """Wait for permission to make one call, or raise RateLimitedError if it must be shed."""
+        low = priority == PRIORITY_LOW
+        if self.bucket is not None:
+            max_wait = self.low_priority_max_wait if low else self.max_wait
+            if deadline is not None:
+                max_wait = min(max_wait, max(deadline - time.monotonic(), 0))
+            # Never reserve the whole bucket, or low-priority calls could never run
+            reserve = min(self.low_priority_reserve * self.bucket.burst, self.bucket.burst - 1) if low else 0
+            if not self.bucket.take(max_wait, reserve):
+                SHED.inc(vendor=self.name, priority=priority, reason="rate")
+                raise RateLimitedError(f"{self.name} rate limit reached, {priority} call shed")
+
+        quota_reserve = int(self.low_priority_reserve * self.quota.quota) if low else 0
+        if not self.quota.use(quota_reserve):
+            if self.bucket is not None:
+                self.bucket.refund()
+            SHED.inc(vendor=self.name, priority=priority, reason="quota")
+            raise RateLimitedError(f"{self.name} {self.quota.period} quota exhausted, {priority} call shed")
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limit_setting(getter, vendor, option, fallback):
+    """[ratelimit] <vendor>_<option>, falling back to [ratelimit] <option>, then to the default."""
+    default = getter('ratelimit', option, fallback)
+    return getter('ratelimit', f"{vendor}_{option}", default)
+
+
+def get_limiter(vendor):
+    """Process-wide RateLimiter for a vendor ('ebay', 'amazon', 'gemini'), configured from [ratelimit]."""
+    limiter = _limiters.get(vendor)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(vendor)
+            if limiter is None:
+                limiter = _limiters[vendor] = RateLimiter(
+                    vendor,
+                    rate=get_float_setting('ratelimit', f"{vendor}_rate", 0.0),
+                    burst=get_float_setting('ratelimit', f"{vendor}_burst", 0.0) or None,
+                    quota=get_int_setting('ratelimit', f"{vendor}_quota", 0),
+                    quota_period=get_setting('ratelimit', f"{vendor}_quota_period", 'month').strip().lower(),
+                    max_wait=_limit_setting(get_int_setting, vendor, 'max_wait_ms', DEFAULT_MAX_WAIT_MS) / 1000,
+                    low_priority_max_wait=_limit_setting(
+                        get_int_setting, vendor, 'low_priority_max_wait_ms', DEFAULT_LOW_PRIORITY_MAX_WAIT_MS) / 1000,
+                    low_priority_reserve=_limit_setting(
+                        get_float_setting, vendor, 'low_priority_reserve', DEFAULT_LOW_PRIORITY_RESERVE)
+                )
+    return limiter
+
+
+def reset():
+    """Forget every limiter (tests, or after changing settings)."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+SHED = REGISTRY.counter(
+    "santas_ratelimit_shed_total", "Calls refused by the client-side rate limiter", ("vendor", "priority", "reason"))
+TOKENS = REGISTRY.gauge(
+    "santas_ratelimit_tokens", "Calls that can be made right now without waiting, by vendor", ("vendor",))
+QUOTA_REMAINING = REGISTRY.gauge(
+    "santas_quota_remaining", "Calls left in the current quota period, by vendor", ("vendor",))
+
+
+def _collect_limits():
+    for vendor, limiter in list(_limiters.items()):
+        if limiter.bucket is not None:
+            TOKENS.set(round(limiter.bucket.available(), 2), vendor=vendor)
+        remaining = limiter.quota.remaining()
+        if remaining is not None:
+            QUOTA_REMAINING.set(remaining, vendor=vendor)
+
+
+REGISTRY.add_collector(_collect_limits)
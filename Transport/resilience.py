@@ -0,0 +1,305 @@
+"""
+Per-vendor circuit breakers and bounded retries for the upstream APIs
+A vendor that keeps failing is cut off for a while instead of every request waiting on it,
+and transient failures (timeouts, 429, 5xx) are retried with jittered backoff.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from Monitoring.metrics import REGISTRY
+from settings import get_float_setting, get_int_setting
+from Transport.http_session import _vendor_setting, get_timeout
+from Transport.rate_limit import PRIORITY_MAIN, RateLimitedError, get_limiter
+
+# Defaults, overridable per vendor in the [http] section of config.ini (e.g. AMAZON_MAX_RETRIES = 1)
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 0.2
+DEFAULT_RETRY_BACKOFF_MAX = 2.0
+DEFAULT_RETRY_BUDGET_RATIO = 0.2
+DEFAULT_MAX_RETRY_AFTER = 5.0
+
+# Responses worth retrying; any other status is returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Exceptions worth retrying, by class name so vendor SDKs need not be imported here
+# (requests' Timeout/ConnectionError family, google.api_core's 429/503/504 errors)
+RETRY_EXCEPTIONS = {
+    "ConnectionError", "ChunkedEncodingError", "ResourceExhausted", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "TooManyRequests"
+}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a vendor whose circuit is open."""
+
+    def __init__(self, vendor, retry_in):
+        super().__init__(f"{vendor} is unavailable (circuit open, retrying in {retry_in:.0f}s)")
+        self.vendor = vendor
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed:    calls go through; failure_threshold consecutive failures open the circuit.
+    open:      calls fail fast with CircuitOpenError for reset_seconds.
+    half_open: one probe call goes through; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=DEFAULT_BREAKER_FAILURES, reset_seconds=DEFAULT_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            retry_in = self._opened_at + self.reset_seconds - time.monotonic()
+            if self._state == OPEN and retry_in <= 0:
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(retry_in, 0))
+
+    def release(self):
+        """Give up a half-open probe without a verdict (the call failed for an unrelated reason)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"{self.name}: circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"{self.name}: circuit open for {self.reset_seconds:.0f}s after {self._failures} failure(s)")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class RetryBudget:
+    """
+    Caps retries at a fraction of traffic so retries never multiply load on a struggling vendor.
+    Every call earns ratio tokens (up to max_tokens); every retry spends one.
+    """
+
+    def __init__(self, ratio=DEFAULT_RETRY_BUDGET_RATIO, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+_breakers = {}
+_budgets = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(vendor):
+    """Process-wide CircuitBreaker for a vendor, configured from [http]."""
+    breaker = _breakers.get(vendor)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(vendor)
+            if breaker is None:
+                breaker = _breakers[vendor] = CircuitBreaker(
+                    vendor,
+                    failure_threshold=_vendor_setting(get_int_setting, vendor, 'breaker_failures', DEFAULT_BREAKER_FAILURES),
+                    reset_seconds=_vendor_setting(get_float_setting, vendor, 'breaker_reset_seconds', DEFAULT_BREAKER_RESET_SECONDS)
+                )
+    return breaker
+
+
+def get_retry_budget(vendor):
+    """Process-wide RetryBudget for a vendor, configured from [http]."""
+    budget = _budgets.get(vendor)
+    if budget is None:
+        with _registry_lock:
+            budget = _budgets.get(vendor)
+            if budget is None:
+                budget = _budgets[vendor] = RetryBudget(
+                    ratio=_vendor_setting(get_float_setting, vendor, 'retry_budget_ratio', DEFAULT_RETRY_BUDGET_RATIO)
+                )
+    return budget
+
+
+def reset():
+    """Forget every breaker and budget (tests, or after changing settings)."""
+    with _registry_lock:
+        _breakers.clear()
+        _budgets.clear()
+
+
+def is_timeout_error(exc):
+    return (isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__
+            or type(exc).__name__ == "DeadlineExceeded")
+
+
+def is_retryable_error(exc):
+    return is_timeout_error(exc) or type(exc).__name__ in RETRY_EXCEPTIONS
+
+
+def is_upstream_error(exc):
+    """Expected vendor failures that are logged in one line rather than with a traceback."""
+    return (isinstance(exc, (CircuitOpenError, RateLimitedError)) or is_retryable_error(exc)
+            or type(exc).__name__ == "HTTPError")
+
+
+def retry_after_seconds(response):
+    """The Retry-After header of a response in seconds (delta-seconds or HTTP-date), or None."""
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=DEFAULT_RETRY_BACKOFF, cap=DEFAULT_RETRY_BACKOFF_MAX):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _status_code(response):
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def call_with_retries(vendor, send, deadline=None, priority=PRIORITY_MAIN):
+    """
+    Call send(timeout) for a vendor behind its circuit breaker and rate limiter, retrying transient failures.
+
+    timeout is the vendor's (connect, read) tuple, capped by deadline (a time.monotonic() value).
+    send returns a requests-style response (retried on 429/5xx; a 429's Retry-After is honoured)
+    or raises (retried on timeouts and connection errors). When retries run out the last response
+    is returned, or the last exception re-raised, so the caller's error handling is unchanged.
+    Retries stop early when the vendor's retry budget is spent or the next attempt would miss deadline.
+
+    Every attempt first takes a token from the vendor's rate limiter; a first attempt that would be
+    over the limit raises RateLimitedError (low priority calls are shed before main ones).
+
+    A timeout on an attempt whose timeout was cut short by deadline is the caller's budget running
+    out, not the vendor being slow, so it gives up without counting against the circuit breaker.
+    """
+    breaker = get_breaker(vendor)
+    breaker.before_call()
+    limiter = get_limiter(vendor)
+    try:
+        limiter.acquire(priority, deadline)
+    except RateLimitedError:
+        breaker.release()
+        raise
+    budget = get_retry_budget(vendor)
+    budget.deposit()
+
+    max_retries = _vendor_setting(get_int_setting, vendor, 'max_retries', DEFAULT_MAX_RETRIES)
+    base = _vendor_setting(get_float_setting, vendor, 'retry_backoff', DEFAULT_RETRY_BACKOFF)
+    cap = _vendor_setting(get_float_setting, vendor, 'retry_backoff_max', DEFAULT_RETRY_BACKOFF_MAX)
+    max_retry_after = _vendor_setting(get_float_setting, vendor, 'max_retry_after', DEFAULT_MAX_RETRY_AFTER)
+
+    attempt = 0
+    while True:
+        error = None
+        timeout = get_timeout(vendor, deadline)
+        cut_short = deadline is not None and timeout != get_timeout(vendor)
+        try:
+            response = send(timeout)
+        except Exception as e:
+            if not is_retryable_error(e):
+                breaker.release()
+                raise  # a bug or a client error, not the vendor's health
+            error, response, delay = e, None, backoff_delay(attempt, base, cap)
+        else:
+            status = _status_code(response)
+            if status not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            delay = None
+            if status == 429:
+                delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt, base, cap)
+
+        can_retry = (
+            attempt < max_retries
+            and delay <= max_retry_after
+            and (deadline is None or time.monotonic() + delay < deadline)
+            and budget.withdraw()
+        )
+        if can_retry:
+            attempt += 1
+            reason = type(error).__name__ if error is not None else f"HTTP {_status_code(response)}"
+            print(f"{vendor}: {reason}, retry {attempt}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+            try:
+                limiter.acquire(priority, deadline)
+            except RateLimitedError:
+                can_retry = False
+        if not can_retry:
+            if error is not None and cut_short and is_timeout_error(error):
+                breaker.release()
+            else:
+                breaker.record_failure()
+            if error is not None:
+                raise error
+            return response
+
+
+# 0 = closed, 1 = half open, 2 = open
+CIRCUIT_STATE = REGISTRY.gauge(
+    "santas_circuit_state", "Circuit breaker state by vendor (0 closed, 1 half open, 2 open)", ("vendor",))
+
+
+def _collect_circuit_states():
+    for vendor, breaker in list(_breakers.items()):
+        CIRCUIT_STATE.set({CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[breaker.state], vendor=vendor)
+
+
+REGISTRY.add_collector(_collect_circuit_states)
@@ -1,10 +1,446 @@
-from EbayAPI.ebay_call import search_ebay, display_results as ebay_display_results
+from EbayAPI.ebay_call import search_ebay, build_or_query, partition_items, display_results as ebay_display_results
 from RapidAmazon.rapidapi_amazon import search_amazon, filter_product_data
 from Gemini.gemini import get_similar_gift_ideas
 from ProductFiltering.parse_products import compare  # Import the compare function
+from Caching.result_cache import TTLCache
+from Caching.single_flight import SingleFlight
+from Monitoring.metrics import register_cache
+from Monitoring.timing import span
+from Transport.rate_limit import PRIORITY_LOW, PRIORITY_MAIN
+from Transport.http_session import pool_maxsize
+from Transport.resilience import is_upstream_error
+from settings import get_bool_setting, get_int_setting
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import json
+import threading
+import time
 import traceback
 
+# Amazon fields kept for every product we show
+AMAZON_FIELDS = [
+    "product_title",
+    "product_url",
+    "product_price",
+    "product_photo",
+    "product_star_rating",
+    "is_prime",
+    "product_original_price",
+    "product_delivery_info",
+    "asin",
+    "sales_volume",
+    "product_availability",
+    "product_num_ratings"
+]
+
+# How much each kind of lookup asks the vendors for and keeps: eBay result limit and fieldgroups
+# (EXTENDED adds the description), and how many Amazon products filter_product_data materializes, with which fields.
+# Similar-gift products get the same cards and details modal as the main ones (eBay description,
+# ASIN, availability, review count), so they keep every field and only fetch fewer products.
+FETCH_PROFILES = {
+    "main": {
+        "ebay_limit": 5,
+        "ebay_fieldgroups": "EXTENDED",
+        "amazon_max_products": 5,
+        "amazon_fields": AMAZON_FIELDS
+    },
+    "top1-similar": {
+        "ebay_limit": 1,
+        "ebay_fieldgroups": "EXTENDED",
+        "amazon_max_products": 1,
+        "amazon_fields": AMAZON_FIELDS
+    }
+}
+
+# Vendors a search fans out to; each task holds a thread for its whole upstream call
+FANOUT_VENDORS = ("ebay", "amazon", "gemini")
+
+
+def default_max_workers():
+    """
+    One thread per pooled connection ([http] POOL_MAXSIZE, or its <VENDOR>_ override) for each vendor,
+    so concurrent searches queue on the connection pools rather than on the executor.
+    """
+    return sum(pool_maxsize(vendor) for vendor in FANOUT_VENDORS)
+
+
+# Thread pool shared by all requests for the vendor fan-out (0 = sized by default_max_workers)
+MAX_WORKERS = get_int_setting('performance', 'max_workers', 0) or default_max_workers()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Final integrated_API results for hot queries ("lego", "airpods", ...), keyed on name + filters
+# Stored as their JSON encoding: one json.dumps per set gives both a frozen copy and its size,
+# and json.loads on a hit is several times cheaper than deep-copying the result
+RESULT_CACHE_ENABLED = get_bool_setting('cache', 'result_cache_enabled', True)
+RESULT_CACHE = TTLCache(
+    max_entries=get_int_setting('cache', 'result_max_entries', 1024),
+    ttl_seconds=get_int_setting('cache', 'result_ttl_seconds', 300),
+    max_bytes=get_int_setting('cache', 'result_max_bytes', 16 * 1024 * 1024),
+    size_fn=len
+)
+register_cache('results', RESULT_CACHE)
+
+# Identical concurrent searches / vendor calls share one in-flight call
+SINGLE_FLIGHT_ENABLED = get_bool_setting('performance', 'single_flight', True)
+SEARCH_FLIGHTS = SingleFlight()
+VENDOR_FLIGHTS = SingleFlight()
+
+# Latency budget per search in milliseconds; 0 waits for every vendor
+DEADLINE_MS = get_int_setting('performance', 'deadline_ms', 0)
+DEADLINE_EXCEEDED = "Deadline exceeded"
+
+# Send all similar-gift terms to eBay as one OR query and split the items back per term locally
+EBAY_BATCH_SIMILAR = get_bool_setting('ebay', 'batch_similar', True)
+EBAY_BATCH_LIMIT_PER_TERM = get_int_setting('ebay', 'batch_limit_per_term', 10)
+EBAY_MAX_LIMIT = 200
+
+
+def get_fetch_profile(name):
+    """The FETCH_PROFILES entry for name; unknown names raise ValueError."""
+    try:
+        return FETCH_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown fetch profile {name!r}, expected one of {sorted(FETCH_PROFILES)}") from None
+
+
+def get_executor():
+    """Return the shared vendor thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="vendor")
+    return _executor
+
+
+def _submit(executor, fn, *args, **kwargs):
+    """
+    Run fn on the executor, or inline when executor is None.
+    Always returns a Future so callers handle both modes the same way.
+    """
+    if executor is not None:
+        return executor.submit(fn, *args, **kwargs)
+
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _timed(timer, name, fn, *args, **kwargs):
+    """Call fn inside a timing span."""
+    with span(timer, name):
+        return fn(*args, **kwargs)
+
+
+def _log_vendor_error(term, error):
+    """One line for expected vendor failures (timeouts, 5xx, open circuit); a traceback only for bugs."""
+    print(f" [{term}] Error: {error}")
+    if not is_upstream_error(error):
+        traceback.print_exc()
+
+
+def _remaining(deadline):
+    """Seconds left before deadline (a time.monotonic() value), or None for no deadline."""
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0)
+
+
+def _expired(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _with_deadline(kwargs, deadline):
+    """kwargs plus deadline=..., only when there is one (vendor calls without a budget are unchanged)."""
+    return dict(kwargs, deadline=deadline) if deadline is not None else kwargs
+
+
+def _result_or_skip(future, source, term, skipped):
+    """The vendor result, or a deadline error (recorded in skipped) if it didn't make the budget."""
+    result = future.result() if future.done() else {"error": DEADLINE_EXCEEDED}
+    if isinstance(result, dict) and result.get("error") == DEADLINE_EXCEEDED:
+        print(f" [{term}] {source} skipped, deadline exceeded.")
+        skipped.append({"source": source, "search_term": term})
+    return result
+
+
+def _flight_key(vendor, term, kwargs, priority=PRIORITY_MAIN, deadline=None):
+    """
+    Single-flight key for one vendor call: the normalized term plus every filter, the priority and
+    whether there is a deadline - so a call never joins one that can be shed or time out when it couldn't.
+    """
+    return (vendor, normalize_product_name(term), tuple(sorted(kwargs.items())), priority, deadline is not None)
+
+
+def _coalesced(calls, key, fn, *args, **kwargs):
+    """
+    Call fn through calls (the current request's group, which also remembers finished results)
+    and the process-wide VENDOR_FLIGHTS group. calls=None means coalescing is off.
+    """
+    if calls is None:
+        return fn(*args, **kwargs)
+    return calls.do(key, VENDOR_FLIGHTS.do, key, fn, *args, **kwargs)
+
+
+def _search_ebay_results(term, ebay_kwargs, first_only=False, timer=None, label="main", calls=None,
+                         deadline=None, priority=PRIORITY_MAIN, profile=None):
+    """
+    Search eBay for one term and return formatted results, fetching as much as profile
+    (a FETCH_PROFILES entry, default "main") asks for.
+    Errors are returned as {"error": ...} so one failing call never breaks the request.
+    """
+    if _expired(deadline):
+        print(f" [{term}] Skipping eBay, deadline exceeded.")
+        return {"error": DEADLINE_EXCEEDED}
+
+    profile = profile or FETCH_PROFILES["main"]
+    ebay_kwargs = dict(ebay_kwargs, limit=profile["ebay_limit"], fieldgroups=profile["ebay_fieldgroups"])
+    print(f"\nSearching eBay for: {term}")
+    try:
+        with span(timer, f"ebay_{label}"):
+            ebay_raw = _coalesced(calls, _flight_key("ebay", term, ebay_kwargs, priority, deadline),
+                                  search_ebay, query=term, priority=priority,
+                                  **_with_deadline(ebay_kwargs, deadline))
+
+        if not ebay_raw:
+            print(f" [{term}] No results found.")
+            return {"error": "No results"}
+
+        with span(timer, f"ebay_display_{label}"):
+            formatted = ebay_display_results(ebay_raw)
+        if not first_only:
+            print(f" [{term}] Found {formatted.get('found_items_count', 0)} items.")
+            return formatted
+
+        # Take only the first item
+        if formatted.get('items') and len(formatted['items']) > 0:
+            print(f" [{term}] Found 1 item.")
+            return {
+                "found_items_count": 1,
+                "items": [formatted['items'][0]]
+            }
+        print(f" [{term}] No results found.")
+        return {"error": "No results"}
+
+    except Exception as e:
+        _log_vendor_error(term, e)
+        return {"error": str(e)}
+
+
+def _search_ebay_batch_results(terms, ebay_kwargs, timer=None, calls=None, deadline=None, priority=PRIORITY_LOW,
+                               profile=None):
+    """
+    Search eBay for several similar-gift terms in one OR query call, with profile's fieldgroups
+    (default "top1-similar"); the limit has to cover every term, so it comes from [ebay] batch_limit_per_term.
+    Returns {term: first-item result} shaped like _search_ebay_results(first_only=True). Terms the
+    batch found nothing for are searched on their own; if the batch call fails, its error (including
+    a missed deadline) is reported for every term.
+    """
+    if _expired(deadline):
+        print(f" [{', '.join(terms)}] Skipping eBay, deadline exceeded.")
+        return {term: {"error": DEADLINE_EXCEEDED} for term in terms}
+
+    profile = profile or FETCH_PROFILES["top1-similar"]
+    query = build_or_query(terms)
+    batch_kwargs = dict(ebay_kwargs, limit=min(EBAY_BATCH_LIMIT_PER_TERM * len(terms), EBAY_MAX_LIMIT),
+                        fieldgroups=profile["ebay_fieldgroups"])
+    print(f"\nSearching eBay for: {query}")
+    try:
+        key = ("ebay_batch", tuple(sorted(normalize_product_name(t) for t in terms)),
+               tuple(sorted(batch_kwargs.items())), priority, deadline is not None)
+        with span(timer, "ebay_similar_batch"):
+            ebay_raw = _coalesced(calls, key, search_ebay, query=query, priority=priority,
+                                  **_with_deadline(batch_kwargs, deadline))
+    except Exception as e:
+        _log_vendor_error(query, e)
+        return {term: {"error": str(e)} for term in terms}
+
+    results = {}
+    missing = []
+    with span(timer, "ebay_display_similar_batch"):
+        partitioned = partition_items((ebay_raw or {}).get('itemSummaries'), terms)
+        for term in terms:
+            formatted = ebay_display_results({"itemSummaries": partitioned[term]}) if partitioned[term] else {}
+            if formatted.get('items'):
+                print(f" [{term}] Found 1 item.")
+                results[term] = {"found_items_count": 1, "items": [formatted['items'][0]]}
+            else:
+                missing.append(term)
+
+    # The batch is sorted across every term and its limit can be used up by one term's items,
+    # so a term left without a match gets its own call before it's reported as not found
+    for term in missing:
+        results[term] = _search_ebay_results(term, ebay_kwargs, first_only=True, timer=timer,
+                                             label="similar_unbatched", calls=calls, deadline=deadline,
+                                             priority=priority, profile=profile)
+    return results
+
+
+def _term_future(batch_future, term):
+    """A Future for one term's share of a batched call, resolved when the batch finishes."""
+    future = Future()
+
+    def resolve(done):
+        try:
+            future.set_result(done.result()[term])
+        except Exception as e:
+            future.set_exception(e)
+
+    batch_future.add_done_callback(resolve)
+    return future
+
+
+def _similar_ebay_futures(executor, product_name, terms, ebay_kwargs, batch, timer, calls, deadline,
+                          main_profile, similar_profile):
+    """
+    One eBay Future per similar-gift term. A term that is the main product shares the main call (and
+    so its main_profile); with batch, the other terms go out together in a single OR query.
+    """
+    batched = []
+    if batch:
+        seen = {normalize_product_name(product_name)}
+        for term in terms:
+            if normalize_product_name(term) not in seen:
+                seen.add(normalize_product_name(term))
+                batched.append(term)
+    if len(batched) < 2:
+        batched = []
+
+    futures = {}
+    if batched:
+        batch_future = _submit(executor, _search_ebay_batch_results, batched, ebay_kwargs, timer=timer,
+                               calls=calls, deadline=deadline, priority=PRIORITY_LOW, profile=similar_profile)
+        futures = {term: _term_future(batch_future, term) for term in batched}
+    return [
+        futures.get(term) or _submit(executor, _search_ebay_results, term, ebay_kwargs, first_only=True,
+                                     timer=timer, label=f"similar{i}", calls=calls, deadline=deadline,
+                                     priority=_priority_for(term, product_name),
+                                     profile=_profile_for(term, product_name, main_profile, similar_profile))
+        for i, term in enumerate(terms, 1)
+    ]
+
+
+def _profile_for(term, product_name, main_profile, similar_profile):
+    """similar_profile, unless term is the main product: then its call is the main one, shared."""
+    return main_profile if normalize_product_name(term) == normalize_product_name(product_name) else similar_profile
+
+
+def _priority_for(term, product_name):
+    """PRIORITY_LOW, unless term is the main product: then its call is the main one, shared."""
+    return PRIORITY_MAIN if normalize_product_name(term) == normalize_product_name(product_name) else PRIORITY_LOW
+
+
+def _search_amazon_results(term, amazon_kwargs, max_products, timer=None, label="main", calls=None,
+                           deadline=None, priority=PRIORITY_MAIN, fields=AMAZON_FIELDS):
+    """
+    Search Amazon for one term and return up to max_products filtered products with only fields.
+    Errors are returned as {"error": ...} so one failing call never breaks the request.
+    """
+    if _expired(deadline):
+        print(f" [{term}] Skipping Amazon, deadline exceeded.")
+        return {"error": DEADLINE_EXCEEDED}
+
+    # Amazon streams the page and stops reading once max_products usable products have arrived
+    amazon_kwargs = dict(amazon_kwargs, max_products=max_products, fields=tuple(fields))
+    print(f"\nSearching Amazon for: {term}")
+    try:
+        with span(timer, f"amazon_{label}"):
+            amazon_json = _coalesced(calls, _flight_key("amazon", term, amazon_kwargs, priority, deadline),
+                                     search_amazon, query=term, priority=priority,
+                                     **_with_deadline(amazon_kwargs, deadline))
+
+        if "error" in amazon_json:
+            print(f" [{term}] Error: {amazon_json['error']}")
+            return amazon_json
+
+        if "amazon_products" in amazon_json:
+            # Streamed: already filtered product by product as it was decoded
+            amazon_filtered = amazon_json
+        else:
+            with span(timer, f"amazon_filter_{label}"):
+                amazon_filtered = filter_product_data(
+                    amazon_json,
+                    max_products=max_products,
+                    fields=fields
+                )
+        count = len(amazon_filtered.get("amazon_products", []))
+        print(f" [{term}] Found {count} item(s).")
+        return amazon_filtered
+
+    except Exception as e:
+        _log_vendor_error(term, e)
+        return {"error": str(e)}
+
+
+def _select_top_main(product_name, main_combined, comparison_criteria, timer=None):
+    """Get top 3 main products using compare function."""
+    print("\n" + "=" * 60)
+    print(f" Selecting TOP 3 products for: {product_name}")
+    print("=" * 60)
+
+    with span(timer, "compare_main"):
+        top_3_main = compare(main_combined, comparison_criteria, top_n=3, ensure_both_sources=True)
+
+    print(f"\nTop 3 products selected:")
+    for idx, prod in enumerate(top_3_main, 1):
+        title = prod.get('title') or prod.get('product_title', 'Unknown')
+        price = prod.get('price', 'N/A')
+        source = prod.get('source', 'Unknown')
+        print(f"  {idx}. [{source}] {title[:50]}... - ${price}")
+    return top_3_main
+
+
+def _select_top_similar(term, similar_combined, comparison_criteria, timer=None, label="similar"):
+    """Get top 1 product for a similar gift, or None if neither vendor found anything."""
+    with span(timer, f"compare_{label}"):
+        top_1_similar = compare(similar_combined, comparison_criteria, top_n=1, ensure_both_sources=False)
+    if not top_1_similar:
+        return None
+
+    top_product = top_1_similar[0]
+    top_product['search_term'] = term  # Add the search term for reference
+
+    title = top_product.get('title') or top_product.get('product_title', 'Unknown')
+    price = top_product.get('price', 'N/A')
+    source = top_product.get('source', 'Unknown')
+    print(f"\n🏆 Best for {term}: [{source}] {title[:40]}... - ${price}")
+    return top_product
+
+
+def normalize_product_name(product_name):
+    """Case and whitespace folded product name, so "  LEGO  " and "lego" share a cache entry."""
+    return " ".join(str(product_name or "").lower().split())
+
+
+def _has_vendor_error(result):
+    """True when a vendor call failed (as opposed to finding nothing)."""
+    return isinstance(result, dict) and "error" in result and result["error"] != "No results"
+
+
+def _replay_cached(on_event, result):
+    """Send the progress events for a cached result so streaming clients behave the same."""
+    similar = [p for p in result["products"] if p.get('product_type') == 'similar']
+    _emit(on_event, "ideas", {"similar_gifts": [p.get('search_term') for p in similar]})
+    _emit(on_event, "main", {"products": [p for p in result["products"] if p.get('product_type') == 'main']})
+    for product in similar:
+        _emit(on_event, "similar", {"search_term": product.get('search_term'), "product": product})
+
+
+def _emit(on_event, name, payload):
+    """Send a progress event to the caller; a broken listener never fails the search."""
+    if on_event is None:
+        return
+    try:
+        on_event(name, payload)
+    except Exception as e:
+        print(f" Event listener error ({name}): {e}")
+        traceback.print_exc()
+
+
 def integrated_API(
     product_name,
     min_price=None,
@@ -16,7 +452,17 @@ def integrated_API(
     max_ship_cost=None,
     guaranteed_days=None,
     amazon_sort=None,
-    comparison_criteria='price'  # New parameter for comparison
+    comparison_criteria='price',  # New parameter for comparison
+    concurrent=True,
+    executor=None,
+    on_event=None,
+    use_cache=True,
+    timer=None,
+    coalesce=True,
+    deadline_ms=None,
+    batch_similar=None,
+    main_profile="main",
+    similar_profile="top1-similar"
 ):
     """
     Integrated multiple search across eBay + Amazon based on AI similar gift ideas.
@@ -33,6 +479,25 @@ def integrated_API(
         guaranteed_days (int, optional): Guaranteed delivery within X days
         amazon_sort (str, optional): Amazon sort (LOW_HIGH_PRICE, HIGH_LOW_PRICE, REVIEWS)
         comparison_criteria (str, optional): Comparison criteria ('price', 'delivery', 'quality'). Default: 'price'
+        concurrent (bool, optional): Run the eBay/Amazon searches in parallel. Default: True
+        executor (Executor, optional): Executor for the parallel searches. Default: shared pool of
+            [performance] max_workers threads
+        on_event (callable, optional): Called as on_event(name, payload) as partial results arrive:
+            'ideas' with the Gemini terms, 'main' with the top 3, then 'similar' once per similar-gift winner
+        use_cache (bool, optional): Serve/store the result in RESULT_CACHE ([cache] section). Default: True
+        timer (RequestTimer, optional): Records a timing span for every stage (Gemini, each vendor call,
+            display_results, filter_product_data, compare, JSON dump)
+        coalesce (bool, optional): Share in-flight searches and vendor calls with identical concurrent
+            callers ([performance] single_flight). Default: True
+        deadline_ms (int, optional): Latency budget for the whole search. Vendor and Gemini calls still
+            running when it runs out are abandoned and the products that did arrive are ranked; the
+            result then has partial=True and lists the calls in skipped_sources.
+            Default: [performance] deadline_ms (0 = no budget)
+        batch_similar (bool, optional): Search eBay for all similar gifts in one OR query instead of
+            one call per term. Default: [ebay] batch_similar (True)
+        main_profile (str, optional): FETCH_PROFILES entry for the main-product searches. Default: "main"
+        similar_profile (str, optional): FETCH_PROFILES entry for the similar-gift searches, which keep
+            one product each. Default: "top1-similar"
     
     Returns:
         dict: Combined results with top 3 main products and top 1 from each similar product
@@ -42,226 +507,207 @@ def integrated_API(
     print(f"\nSearching for: {product_name}")
     print(f"Comparison criteria: {comparison_criteria}")
 
-    # Similar gift ideas from LLM
-    print("\nGenerating AI similar gift ideas using Gemini...")
-    similar_gifts = get_similar_gift_ideas(product_name, num_ideas=2)
+    if deadline_ms is None:
+        deadline_ms = DEADLINE_MS
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
 
-    print("\nSimilar items I will also search for:")
-    for g in similar_gifts:
-        print(" -", g)
+    profiles = (get_fetch_profile(main_profile), get_fetch_profile(similar_profile))
 
-    # Store all results
-    main_results_ebay = {}
-    main_results_amazon = {}
-    similar_results_ebay = {}
-    similar_results_amazon = {}
+    use_cache = use_cache and RESULT_CACHE_ENABLED
+    cache_key = (
+        normalize_product_name(product_name), min_price, max_price, condition_filter, ebay_sort,
+        delivery_country, delivery_postal, max_ship_cost, guaranteed_days, amazon_sort, comparison_criteria,
+        main_profile, similar_profile
+    )
+    if use_cache:
+        with span(timer, "result_cache"):
+            cached = RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            print("Served from result cache.")
+            result = json.loads(cached)
+            _replay_cached(on_event, result)
+            return result
 
-    print("\n" + "=" * 60)
-    print(f" Searching MAIN PRODUCT: {product_name}")
-    print("=" * 60)
+    search_kwargs = dict(
+        product_name=product_name, min_price=min_price, max_price=max_price,
+        condition_filter=condition_filter, ebay_sort=ebay_sort, delivery_country=delivery_country,
+        delivery_postal=delivery_postal, max_ship_cost=max_ship_cost, guaranteed_days=guaranteed_days,
+        amazon_sort=amazon_sort, comparison_criteria=comparison_criteria, concurrent=concurrent,
+        executor=executor, on_event=on_event, use_cache=use_cache, cache_key=cache_key, timer=timer,
+        deadline=deadline, batch_similar=EBAY_BATCH_SIMILAR if batch_similar is None else batch_similar,
+        profiles=profiles
+    )
+    coalesce = coalesce and SINGLE_FLIGHT_ENABLED
+    # Per-request group: a similar-gift term equal to the main product (or to another term) reuses its calls
+    search_kwargs["calls"] = SingleFlight(remember=True) if coalesce else None
+    if not coalesce:
+        return _integrated_search(**search_kwargs)
 
-    # Search main product on eBay
-    print(f"\nSearching eBay for: {product_name}")
-    try:
-        price_range = None
-        if min_price or max_price:
-            price_range = f"{min_price or ''}..{max_price or ''}"
-
-        ebay_raw = search_ebay(
-            query=product_name,
-            price_range=price_range,
-            condition_filter=condition_filter if condition_filter else None,
-            delivery_country=delivery_country or None,
-            delivery_postal_code=delivery_postal or None,
-            guaranteed_delivery_days=guaranteed_days,
-            max_delivery_cost=max_ship_cost,
-            sort_by=ebay_sort
-        )
-
-        if ebay_raw:
-            formatted = ebay_display_results(ebay_raw)
-            main_results_ebay = formatted
-            print(f" Found {formatted.get('found_items_count', 0)} items.")
-        else:
-            main_results_ebay = {"error": "No results"}
-            print(" No results found.")
+    # Identical searches already running (a viral gift) share one result instead of 7 upstream calls each
+    ran = []
 
-    except Exception as e:
-        main_results_ebay = {"error": str(e)}
-        print(f" Error: {e}")
-        traceback.print_exc()
+    def run():
+        ran.append(True)
+        return _integrated_search(**search_kwargs)
 
-    # Search main product on Amazon
-    print(f"\nSearching Amazon for: {product_name}")
-    try:
-        amazon_json = search_amazon(
-            query=product_name,
-            sort_by=amazon_sort or None,
-            min_price=min_price,
-            max_price=max_price
-        )
+    started = time.perf_counter()
+    # Callers with a different budget would wait on the wrong clock, so the budget is part of the key
+    result = SEARCH_FLIGHTS.do((cache_key, deadline_ms), run)
+    if not ran:
+        print("Shared the result of an identical in-flight search.")
+        if timer is not None:
+            timer.record("coalesced", (time.perf_counter() - started) * 1000, started)
+        _replay_cached(on_event, result)
+    return result
 
-        if "error" in amazon_json:
-            main_results_amazon = amazon_json
-            print(f" Error: {amazon_json['error']}")
-        else:
-            amazon_filtered = filter_product_data(
-                amazon_json,
-                max_products=5,
-                fields=[
-                    "product_title",
-                    "product_url",
-                    "product_price",
-                    "product_photo",
-                    "product_star_rating",
-                    "is_prime",
-                    "product_original_price",
-                    "product_delivery_info",
-                    "asin",
-                    "sales_volume",
-                    "product_availability",
-                    "product_num_ratings"
-                ]
-            )
-            main_results_amazon = amazon_filtered
-            count = len(amazon_filtered.get("amazon_products", []))
-            print(f" Found {count} items.")
 
-    except Exception as e:
-        main_results_amazon = {"error": str(e)}
-        print(f" Error: {e}")
-        traceback.print_exc()
+def _integrated_search(
+    product_name, min_price, max_price, condition_filter, ebay_sort, delivery_country, delivery_postal,
+    max_ship_cost, guaranteed_days, amazon_sort, comparison_criteria, concurrent, executor, on_event,
+    use_cache, cache_key, timer, calls, deadline, batch_similar, profiles
+):
+    """
+    The search behind integrated_API (same arguments, plus the result cache key, the
+    request's SingleFlight group for vendor calls, or None to call vendors directly,
+    the time.monotonic() deadline or None, and the (main, similar) FETCH_PROFILES entries).
+    """
+    main_profile, similar_profile = profiles
+    if concurrent and executor is None:
+        executor = get_executor()
+    elif not concurrent:
+        executor = None
 
-    # Get top 3 main products using compare function
-    print("\n" + "=" * 60)
-    print(f" Selecting TOP 3 products for: {product_name}")
-    print("=" * 60)
-    
-    main_combined = {
-        "ebay": main_results_ebay,
-        "amazon": main_results_amazon
+    price_range = None
+    if min_price or max_price:
+        price_range = f"{min_price or ''}..{max_price or ''}"
+
+    ebay_kwargs = {
+        "price_range": price_range,
+        "condition_filter": condition_filter if condition_filter else None,
+        "delivery_country": delivery_country or None,
+        "delivery_postal_code": delivery_postal or None,
+        "guaranteed_delivery_days": guaranteed_days,
+        "max_delivery_cost": max_ship_cost,
+        "sort_by": ebay_sort
     }
-    
-    top_3_main = compare(main_combined, comparison_criteria, top_n=3, ensure_both_sources=True)
-    
-    print(f"\nTop 3 products selected:")
-    for idx, prod in enumerate(top_3_main, 1):
-        title = prod.get('title') or prod.get('product_title', 'Unknown')
-        price = prod.get('price', 'N/A')
-        source = prod.get('source', 'Unknown')
-        print(f"  {idx}. [{source}] {title[:50]}... - ${price}")
+    amazon_kwargs = {
+        "sort_by": amazon_sort or None,
+        "min_price": min_price,
+        "max_price": max_price
+    }
+
+    # Stage 1: Gemini and the main-product searches don't depend on each other, start them together
+    print("\nGenerating AI similar gift ideas using Gemini...")
+    gemini_future = _submit(executor, _timed, timer, "gemini", _coalesced, calls,
+                            _flight_key("gemini", product_name, {"num_ideas": 2}, deadline=deadline),
+                            get_similar_gift_ideas, product_name, **_with_deadline({"num_ideas": 2}, deadline))
 
     print("\n" + "=" * 60)
-    print(" Searching SIMILAR PRODUCTS (1 per similar gift)")
+    print(f" Searching MAIN PRODUCT: {product_name}")
     print("=" * 60)
+    main_ebay_future = _submit(executor, _search_ebay_results, product_name, ebay_kwargs, timer=timer,
+                               calls=calls, deadline=deadline, profile=main_profile)
+    main_amazon_future = _submit(executor, _search_amazon_results, product_name, amazon_kwargs,
+                                 main_profile["amazon_max_products"], timer=timer, calls=calls,
+                                 deadline=deadline, fields=main_profile["amazon_fields"])
 
-    # Store top 1 from each similar product
-    similar_top_products = []
-
-    # Search similar products (1 product each from eBay and Amazon)
-    for term in similar_gifts:
-        print(f"\n--- Similar Gift: {term} ---")
-        
-        ebay_similar = {}
-        amazon_similar = {}
-        
-        # eBay - Get just 1 product
-        print(f"Searching eBay for: {term}")
-        try:
-            price_range = None
-            if min_price or max_price:
-                price_range = f"{min_price or ''}..{max_price or ''}"
-
-            ebay_raw = search_ebay(
-                query=term,
-                price_range=price_range,
-                condition_filter=condition_filter if condition_filter else None,
-                delivery_country=delivery_country or None,
-                delivery_postal_code=delivery_postal or None,
-                guaranteed_delivery_days=guaranteed_days,
-                max_delivery_cost=max_ship_cost,
-                sort_by=ebay_sort
-            )
-
-            if ebay_raw:
-                formatted = ebay_display_results(ebay_raw)
-                # Take only the first item
-                if formatted.get('items') and len(formatted['items']) > 0:
-                    ebay_similar = {
-                        "found_items_count": 1,
-                        "items": [formatted['items'][0]]
-                    }
-                    print(f" Found 1 item.")
-                else:
-                    ebay_similar = {"error": "No results"}
-                    print(" No results found.")
-            else:
-                ebay_similar = {"error": "No results"}
-                print(" No results found.")
-
-        except Exception as e:
-            ebay_similar = {"error": str(e)}
-            print(f" Error: {e}")
-            traceback.print_exc()
+    # Stage 2: whichever finishes first is handled first - similar-gift searches launch as
+    # soon as Gemini answers, the top 3 is picked as soon as both main searches are back
+    # When the deadline passes, calls still running are abandoned and recorded in skipped
+    similar_futures = None
+    top_3_main = None
+    vendor_results = []
+    skipped = []
+    while similar_futures is None or top_3_main is None:
+        waiting = [f for f in (gemini_future, main_ebay_future, main_amazon_future) if not f.done()]
+        wait(waiting, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        expired = _expired(deadline)
 
-        # Amazon - Get just 1 product
-        print(f"Searching Amazon for: {term}")
-        try:
-            amazon_json = search_amazon(
-                query=term,
-                sort_by=amazon_sort or None,
-                min_price=min_price,
-                max_price=max_price
-            )
-
-            if "error" in amazon_json:
-                amazon_similar = amazon_json
-                print(f" Error: {amazon_json['error']}")
+        if similar_futures is None and (gemini_future.done() or expired):
+            if gemini_future.done():
+                try:
+                    similar_gifts = gemini_future.result()
+                except Exception as e:
+                    # e.g. Gemini rate limited or its circuit open - still answer with the main products
+                    _log_vendor_error(product_name, e)
+                    vendor_results.append({"error": str(e)})
+                    similar_gifts = []
             else:
-                amazon_filtered = filter_product_data(
-                    amazon_json,
-                    max_products=1,  # Only get 1 product
-                    fields=[
-                        "product_title",
-                        "product_url",
-                        "product_price",
-                        "product_photo",
-                        "product_star_rating",
-                        "is_prime",
-                        "product_original_price",
-                        "product_delivery_info",
-                        "asin",
-                        "sales_volume",
-                        "product_availability",
-                        "product_num_ratings"
-                    ]
+                print("\nGemini missed the deadline, skipping similar gifts.")
+                skipped.append({"source": "gemini", "search_term": product_name})
+                similar_gifts = []
+            print("\nSimilar items I will also search for:")
+            for g in similar_gifts:
+                print(" -", g)
+            _emit(on_event, "ideas", {"similar_gifts": similar_gifts})
+            # A term that is the main product shares the main calls, so it fetches like them
+            similar_profiles = [_profile_for(t, product_name, main_profile, similar_profile) for t in similar_gifts]
+            similar_ebay = _similar_ebay_futures(executor, product_name, similar_gifts, ebay_kwargs,
+                                                 batch_similar, timer, calls, deadline,
+                                                 main_profile, similar_profile)
+            similar_futures = [
+                (
+                    term,
+                    ebay_future,
+                    _submit(executor, _search_amazon_results, term, amazon_kwargs,
+                            profile["amazon_max_products"], timer=timer, label=f"similar{i}",
+                            calls=calls, deadline=deadline, priority=_priority_for(term, product_name),
+                            fields=profile["amazon_fields"])
                 )
-                amazon_similar = amazon_filtered
-                count = len(amazon_filtered.get("amazon_products", []))
-                print(f" Found {count} item(s).")
+                for i, (term, ebay_future, profile) in enumerate(zip(similar_gifts, similar_ebay, similar_profiles), 1)
+            ]
 
-        except Exception as e:
-            amazon_similar = {"error": str(e)}
-            print(f" Error: {e}")
-            traceback.print_exc()
-        
-        # Get top 1 from this similar product
-        similar_combined = {
-            "ebay": ebay_similar,
-            "amazon": amazon_similar
-        }
-        
-        top_1_similar = compare(similar_combined, comparison_criteria, top_n=1, ensure_both_sources=False)
-        
-        if top_1_similar:
-            top_product = top_1_similar[0]
-            top_product['search_term'] = term  # Add the search term for reference
-            similar_top_products.append(top_product)
-            
-            title = top_product.get('title') or top_product.get('product_title', 'Unknown')
-            price = top_product.get('price', 'N/A')
-            source = top_product.get('source', 'Unknown')
-            print(f"\n🏆 Best for {term}: [{source}] {title[:40]}... - ${price}")
+        if top_3_main is None and ((main_ebay_future.done() and main_amazon_future.done()) or expired):
+            main_combined = {
+                "ebay": _result_or_skip(main_ebay_future, "ebay", product_name, skipped),
+                "amazon": _result_or_skip(main_amazon_future, "amazon", product_name, skipped)
+            }
+            vendor_results.extend(main_combined.values())
+            top_3_main = _select_top_main(product_name, main_combined, comparison_criteria, timer)
+            for idx, product in enumerate(top_3_main, 1):
+                product['rank'] = idx
+                product['product_type'] = 'main'
+            _emit(on_event, "main", {"products": top_3_main})
+
+    print("\n" + "=" * 60)
+    print(" Selecting SIMILAR PRODUCTS (1 per similar gift)")
+    print("=" * 60)
+
+    # Store top 1 from each similar product, picked as soon as both of its searches are back
+    # Winners are ranked 4, 5, ... (and streamed) in the order Gemini returned the terms,
+    # so a winner waits for the terms before it
+    similar_winners = [None] * len(similar_futures)
+    remaining = list(range(len(similar_futures)))
+    next_term = 0
+    next_rank = 4
+    while remaining:
+        waiting = [f for i in remaining for f in similar_futures[i][1:] if not f.done()]
+        wait(waiting, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        expired = _expired(deadline)
+
+        for i in [i for i in remaining if expired or all(f.done() for f in similar_futures[i][1:])]:
+            remaining.remove(i)
+            term, ebay_future, amazon_future = similar_futures[i]
+            similar_combined = {
+                "ebay": _result_or_skip(ebay_future, "ebay", term, skipped),
+                "amazon": _result_or_skip(amazon_future, "amazon", term, skipped)
+            }
+            vendor_results.extend(similar_combined.values())
+            top_product = _select_top_similar(term, similar_combined, comparison_criteria, timer, f"similar{i + 1}")
+            if top_product:
+                top_product['product_type'] = 'similar'
+                similar_winners[i] = top_product
+
+        while next_term < len(similar_futures) and next_term not in remaining:
+            top_product = similar_winners[next_term]
+            if top_product:
+                top_product['rank'] = next_rank
+                next_rank += 1
+                _emit(on_event, "similar", {"search_term": similar_futures[next_term][0], "product": top_product})
+            next_term += 1
+
+    # Keep the order Gemini returned the terms so the payload stays deterministic
+    similar_top_products = [p for p in similar_winners if p]
 
     # Combine top 3 main + top 2 similar into final result
     final_combined_results = {
@@ -277,25 +723,26 @@ def integrated_API(
             "comparison_criteria": comparison_criteria
         },
         "comparison_criteria": comparison_criteria,
+        "partial": bool(skipped),
+        "skipped_sources": skipped,
         "products": []
     }
     
-    # Add top 3 main products
-    for idx, product in enumerate(top_3_main, 1):
-        product['rank'] = idx
-        product['product_type'] = 'main'
-        final_combined_results["products"].append(product)
+    # Add top 3 main products (already ranked 1-3)
+    final_combined_results["products"].extend(top_3_main)
     
-    # Add top 2 similar products
-    for idx, product in enumerate(similar_top_products, 4):
-        product['rank'] = idx
-        product['product_type'] = 'similar'
-        final_combined_results["products"].append(product)
+    # Add top 2 similar products (already ranked 4-5)
+    final_combined_results["products"].extend(similar_top_products)
+
+    # Don't pin a degraded answer in the cache when a vendor call failed or was skipped
+    if use_cache and not skipped and not any(_has_vendor_error(r) for r in vendor_results):
+        RESULT_CACHE.set(cache_key, json.dumps(final_combined_results, default=str))
 
     # Save combined top 5 results
     combined_output_file = "top_5_products.json"
-    with open(combined_output_file, "w", encoding="utf-8") as f:
-        json.dump(final_combined_results, f, indent=4, ensure_ascii=False)
+    with span(timer, "json_dump"):
+        with open(combined_output_file, "w", encoding="utf-8") as f:
+            json.dump(final_combined_results, f, indent=4, ensure_ascii=False)
 
     print("\n" + "=" * 60)
     print(f"Top 5 combined products saved to {combined_output_file}")
@@ -2,14 +2,108 @@
 Flask web application for eBay and Amazon product search
 """
 
-from flask import Flask, render_template, request, jsonify
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from api_process import integrated_API
-from NLP.simple_nlp import SimpleNLPExtractor
+from EbayAPI.ebay_call import warm_up_token as warm_up_ebay_token
+from Gemini.gemini import warm_up as warm_up_gemini
+from Monitoring.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, REGISTRY, register_cache
+from Monitoring.timing import RequestTimer
+from NLP.nlp_pool import pool_from_config
+from NLP.simple_nlp import SimpleNLPExtractor, warm_up as warm_up_nlp
+from RapidAmazon.rapidapi_amazon import warm_up as warm_up_dateparser
+from settings import get_bool_setting, get_int_setting
 
 app = Flask(__name__)
 
-# Initialize NLP extractor for chat mode
-nlp_extractor = SimpleNLPExtractor()
+# Bounds for a client-supplied deadline_ms: tiny budgets would cut vendor timeouts to a few ms
+MIN_DEADLINE_MS = get_int_setting('performance', 'min_deadline_ms', 1000)
+MAX_DEADLINE_MS = get_int_setting('performance', 'max_deadline_ms', 30000)
+
+# NLP pool workers are spawned processes that re-import this module (as __mp_main__ under
+# `python app.py`); only the server process sets up the extractor, the pool and the warm-up
+IS_SERVER_PROCESS = multiprocessing.parent_process() is None
+
+nlp_extractor = None
+nlp_pool = None
+if IS_SERVER_PROCESS:
+    # Initialize NLP extractor for chat mode (spaCy itself loads on first use or in warm_up)
+    nlp_extractor = SimpleNLPExtractor()
+    if nlp_extractor.cache is not None:
+        register_cache('nlp_extract', nlp_extractor.cache)
+    # Optional worker processes for spaCy ([nlp] POOL_PROCESSES); they share nlp_extractor's cache
+    nlp_pool = pool_from_config(nlp_extractor)
+
+
+def warm_up(nlp=None, gemini=None, ebay_token=None, dateparser=None):
+    """
+    Do the slow one-time setup now instead of on the first request that needs it: load spaCy
+    (in every NLP pool worker, if there is a pool), import dateparser, set up the Gemini client,
+    start fetching the first eBay token.
+    Each argument defaults to its [performance] warm_up_* setting. Runs at import with those
+    settings (in the server process only); call it again e.g. from a gunicorn post_fork hook
+    to warm a worker completely.
+    """
+    def enabled(value, option, fallback):
+        return get_bool_setting('performance', option, fallback) if value is None else value
+
+    if enabled(nlp, 'warm_up_nlp', False):
+        if nlp_pool is not None:
+            nlp_pool.warm_up()
+        else:
+            warm_up_nlp()
+    if enabled(dateparser, 'warm_up_dateparser', False):
+        warm_up_dateparser()
+    if enabled(gemini, 'warm_up_gemini', False):
+        warm_up_gemini()
+    # The token is fetched in the background; after that it is refreshed before it expires
+    if enabled(ebay_token, 'warm_up_ebay_token', True):
+        warm_up_ebay_token()
+
+
+if IS_SERVER_PROCESS:
+    warm_up()
+
+
+def _route_label():
+    """The matched URL rule (not the raw path) so metric label values stay bounded"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_route = _route_label()
+    g.metrics_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+
+
+@app.after_request
+def _record_request_metrics(response):
+    # Streaming routes are measured up to their first byte; the stream itself runs afterwards
+    route = g.get('metrics_route')
+    if route is not None:
+        HTTP_LATENCY.observe(time.perf_counter() - g.metrics_start, route=route)
+        HTTP_REQUESTS.inc(route=route, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc=None):
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        HTTP_IN_FLIGHT.dec(route=route)
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: route/vendor latency histograms, error counts, cache hit ratios"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/')
@@ -18,56 +112,175 @@ def index():
     return render_template('index.html')
 
 
+def _search_kwargs(data):
+    """Turn the filter-mode form fields into integrated_API keyword arguments"""
+    product = data.get('product', '')
+    min_price = data.get('min_price', '') or None
+    max_price = data.get('max_price', '') or None
+    condition = data.get('condition', '') or None
+    sort_by = data.get('sort_by', 'price')
+    amazon_sort = data.get('amazon_sort', 'RELEVANCE')
+    
+    # Delivery location
+    country = data.get('country', '') or None
+    postal = data.get('postal', '') or None
+    
+    # Shipping options
+    max_ship = data.get('max_shipping', '')
+    max_ship_cost = float(max_ship) if max_ship else None
+    
+    # Guaranteed delivery
+    delivery_days = data.get('delivery_days', '')
+    guaranteed_days = int(delivery_days) if delivery_days else None
+    
+    return {
+        'product_name': product,
+        'min_price': min_price,
+        'max_price': max_price,
+        'condition_filter': condition,
+        'ebay_sort': sort_by,
+        'delivery_country': country,
+        'delivery_postal': postal,
+        'max_ship_cost': max_ship_cost,
+        'guaranteed_days': guaranteed_days,
+        'amazon_sort': amazon_sort if amazon_sort != "RELEVANCE" else None,
+        'comparison_criteria': 'price',
+        'deadline_ms': _deadline_ms(data)
+    }
+
+
+def _deadline_ms(data):
+    """
+    Optional per-request latency budget, clamped to [performance] min/max_deadline_ms;
+    None uses [performance] deadline_ms. Raises ValueError if it is not a whole number.
+    """
+    deadline_ms = (data or {}).get('deadline_ms')
+    if deadline_ms in (None, ''):
+        return None
+    if isinstance(deadline_ms, (int, str)) and not isinstance(deadline_ms, bool):
+        try:
+            return min(max(int(deadline_ms), MIN_DEADLINE_MS), MAX_DEADLINE_MS)
+        except ValueError:
+            pass
+    raise ValueError(f"deadline_ms must be a whole number of milliseconds, got {deadline_ms!r}")
+
+
+def _chat_kwargs(extracted, deadline_ms=None):
+    """Turn the NLP extraction of a chat message into integrated_API keyword arguments"""
+    min_price = extracted['min_price']
+    max_price = extracted['max_price']
+    return {
+        'product_name': extracted['query'],
+        'min_price': str(min_price) if min_price else None,
+        'max_price': str(max_price) if max_price else None,
+        'condition_filter': None,
+        'ebay_sort': 'price',
+        'comparison_criteria': 'price',
+        'deadline_ms': deadline_ms
+    }
+
+
+def _extracted_payload(extracted):
+    """The NLP fields echoed back to the chat UI"""
+    return {
+        'query': extracted['query'],
+        'min_price': extracted['min_price'],
+        'max_price': extracted['max_price'],
+        'metadata': extracted['metadata']
+    }
+
+
+def _results_payload(result, product):
+    """The part of the response body shared by every search route"""
+    return {
+        'search_query': result.get('search_query', product),
+        'filters': result.get('filters', {}),
+        'products': result.get('products', []),
+        'total_count': len(result.get('products', [])),
+        'partial': result.get('partial', False),
+        'skipped_sources': result.get('skipped_sources', [])
+    }
+
+
+def _wants_timings(data):
+    """Clients opt in to the JSON timings block with "timings": true or ?timings=1"""
+    return bool((data or {}).get('timings')) or request.args.get('timings') in ('1', 'true')
+
+
+def _timed_response(response, timer, data):
+    """jsonify the response with a Server-Timing header (and a timings block if asked for)"""
+    if _wants_timings(data):
+        response['timings'] = timer.as_list()
+    resp = jsonify(response)
+    resp.headers['Server-Timing'] = timer.server_timing_header()
+    return resp
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_search(search_kwargs, first_events=()):
+    """
+    Run integrated_API on a background thread and yield its progress as Server-Sent Events.
+    Events: extracted (chat only), ideas, main, similar (one per winner), then done or error.
+    """
+    events = queue.Queue()
+
+    def on_event(name, payload):
+        # Serialize right away, products are still being ranked by the search thread
+        events.put(_sse(name, payload))
+
+    def run():
+        try:
+            result = integrated_API(on_event=on_event, **search_kwargs)
+            payload = {'success': True}
+            payload.update(_results_payload(result, search_kwargs['product_name']))
+            events.put(_sse('done', payload))
+        except Exception as e:
+            traceback.print_exc()
+            events.put(_sse('error', {'success': False, 'error': str(e)}))
+        events.put(None)
+
+    for event in first_events:
+        yield event
+
+    threading.Thread(target=run, name="search-stream", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+
+
+def _stream_response(generator):
+    """Wrap an event generator in an unbuffered text/event-stream response"""
+    return Response(stream_with_context(generator), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/search', methods=['POST'])
 def search():
     """Handle search requests from the frontend - uses integrated API with LLM recommendations"""
     try:
+        timer = RequestTimer()
+        
         # Get search parameters from request
         data = request.json
-        product = data.get('product', '')
-        min_price = data.get('min_price', '') or None
-        max_price = data.get('max_price', '') or None
-        condition = data.get('condition', '') or None
-        sort_by = data.get('sort_by', 'price')
-        amazon_sort = data.get('amazon_sort', 'RELEVANCE')
-        
-        # Delivery location
-        country = data.get('country', '') or None
-        postal = data.get('postal', '') or None
-        
-        # Shipping options
-        max_ship = data.get('max_shipping', '')
-        max_ship_cost = float(max_ship) if max_ship else None
-        
-        # Guaranteed delivery
-        delivery_days = data.get('delivery_days', '')
-        guaranteed_days = int(delivery_days) if delivery_days else None
+        try:
+            search_kwargs = _search_kwargs(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Call the integrated API which uses LLM for similar recommendations
-        result = integrated_API(
-            product_name=product,
-            min_price=min_price,
-            max_price=max_price,
-            condition_filter=condition,
-            ebay_sort=sort_by,
-            delivery_country=country,
-            delivery_postal=postal,
-            max_ship_cost=max_ship_cost,
-            guaranteed_days=guaranteed_days,
-            amazon_sort=amazon_sort if amazon_sort != "RELEVANCE" else None,
-            comparison_criteria='price'
-        )
+        result = integrated_API(timer=timer, **search_kwargs)
         
-        return jsonify({
-            'success': True,
-            'search_query': result.get('search_query', product),
-            'filters': result.get('filters', {}),
-            'products': result.get('products', []),
-            'total_count': len(result.get('products', []))
-        })
+        response = {'success': True}
+        response.update(_results_payload(result, search_kwargs['product_name']))
+        return _timed_response(response, timer, data)
     
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({
             'success': False,
@@ -75,50 +288,55 @@ def search():
         }), 500
 
 
+@app.route('/search/stream', methods=['POST'])
+def search_stream():
+    """Streaming variant of /search - sends results as Server-Sent Events as they arrive"""
+    try:
+        search_kwargs = _search_kwargs(request.json)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return _stream_response(_stream_search(search_kwargs))
+
+
+def _extract(message):
+    """NLP fields for a chat message; parsed in the NLP pool when there is one"""
+    if nlp_pool is not None:
+        return nlp_pool.extract(message)
+    return nlp_extractor.extract(message)
+
+
 @app.route('/chat-search', methods=['POST'])
 def chat_search():
     """Handle chat-based natural language search requests"""
     try:
+        timer = RequestTimer()
         data = request.json
         user_message = data.get('message', '')
         
         if not user_message.strip():
             return jsonify({'success': False, 'error': 'Please enter a search query'}), 400
+        try:
+            deadline_ms = _deadline_ms(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Use NLP extractor to parse the natural language query
-        extracted = nlp_extractor.extract(user_message)
-        
-        product = extracted['query']
-        min_price = extracted['min_price']
-        max_price = extracted['max_price']
-        metadata = extracted['metadata']
+        with timer.span('nlp'):
+            extracted = _extract(user_message)
+        search_kwargs = _chat_kwargs(extracted, deadline_ms)
         
         # Call the integrated API which uses LLM for similar recommendations
-        result = integrated_API(
-            product_name=product,
-            min_price=str(min_price) if min_price else None,
-            max_price=str(max_price) if max_price else None,
-            condition_filter=None,
-            ebay_sort='price',
-            comparison_criteria='price'
-        )
+        result = integrated_API(timer=timer, **search_kwargs)
         
-        return jsonify({
+        response = {
             'success': True,
-            'extracted': {
-                'query': product,
-                'min_price': min_price,
-                'max_price': max_price,
-                'metadata': metadata
-            },
-            'search_query': result.get('search_query', product),
-            'filters': result.get('filters', {}),
-            'products': result.get('products', []),
-            'total_count': len(result.get('products', []))
-        })
+            'extracted': _extracted_payload(extracted)
+        }
+        response.update(_results_payload(result, extracted['query']))
+        return _timed_response(response, timer, data)
     
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({
             'success': False,
@@ -126,5 +344,28 @@ def chat_search():
         }), 500
 
 
+@app.route('/chat-search/stream', methods=['POST'])
+def chat_search_stream():
+    """Streaming variant of /chat-search - the NLP fields are sent first, then results as they arrive"""
+    try:
+        data = request.json
+        user_message = data.get('message', '')
+        
+        if not user_message.strip():
+            return jsonify({'success': False, 'error': 'Please enter a search query'}), 400
+        try:
+            deadline_ms = _deadline_ms(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        extracted = _extract(user_message)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    first_events = [_sse('extracted', _extracted_payload(extracted))]
+    return _stream_response(_stream_search(_chat_kwargs(extracted, deadline_ms), first_events))
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
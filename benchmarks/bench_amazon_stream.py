@@ -0,0 +1,79 @@
+"""
+Microbenchmark: decoding an Amazon results page, full json.loads + filter vs streaming stop-early
+Run from the project root: python -m benchmarks.bench_amazon_stream
+"""
+
+import json
+import timeit
+import tracemalloc
+
+from RapidAmazon import rapidapi_amazon
+
+FIELDS = ["product_title", "product_url", "product_price", "product_photo", "product_star_rating",
+          "is_prime", "product_original_price", "product_delivery_info"]
+NUMBER = 200
+
+
+def _page(products=48):
+    """A results page shaped like the RapidAPI one, with the usual bulky per-product fields."""
+    return json.dumps({"status": "OK", "data": {"total_products": 1000, "country": "US", "products": [
+        {
+            "asin": f"B0{i:08d}",
+            "product_title": f"Product {i} " + "with a long marketing title " * 4,
+            "product_price": f"${10 + i}.99",
+            "product_original_price": f"${20 + i}.99",
+            "product_star_rating": "4.5",
+            "product_num_ratings": 1200 + i,
+            "product_url": f"https://www.amazon.com/Product-{i}/dp/B0{i:08d}",
+            "product_photo": f"https://m.media-amazon.com/images/I/{i}.jpg",
+            "product_num_offers": 3,
+            "is_prime": True,
+            "climate_pledge_friendly": False,
+            "sales_volume": "1K+ bought in past month",
+            "product_delivery_info": "FREE deliverySat, Nov 22on $35 of items shipped by Amazon",
+            "product_badge": "Best Seller",
+            "product_byline": "Visit the Store",
+            "unit_price": None,
+            "coupon_text": None,
+            "product_variations": {"color": [{"asin": f"B1{i:07d}{v}", "value": f"Color {v}"} for v in range(6)]},
+        }
+        for i in range(products)
+    ]}}).encode("utf-8")
+
+
+def _chunks(page):
+    size = rapidapi_amazon.STREAM_CHUNK_SIZE
+    return (page[i:i + size] for i in range(0, len(page), size))
+
+
+def _full(page, max_products):
+    return rapidapi_amazon.filter_product_data(json.loads(page), max_products, FIELDS)
+
+
+def _streamed(page, max_products):
+    # Products are filtered as they are decoded, so there is no second filter_product_data pass
+    return rapidapi_amazon.stream_products(_chunks(page), max_products, FIELDS)
+
+
+def _peak_kib(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    page = _page()
+    print(f"page: {len(page) / 1024:.0f} KiB\n")
+    for max_products in (1, 5):
+        assert _full(page, max_products) == _streamed(page, max_products)
+        full = timeit.timeit(lambda: _full(page, max_products), number=NUMBER) / NUMBER
+        streamed = timeit.timeit(lambda: _streamed(page, max_products), number=NUMBER) / NUMBER
+        print(f"max_products={max_products}")
+        print(f"  json.loads + filter   {full * 1e6:8.0f} us  peak {_peak_kib(_full, page, max_products):6.0f} KiB")
+        print(f"  stream_products       {streamed * 1e6:8.0f} us  peak {_peak_kib(_streamed, page, max_products):6.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
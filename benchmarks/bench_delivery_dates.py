@@ -0,0 +1,55 @@
+"""
+Microbenchmark: Amazon delivery-date parsing, fast path vs dateparser
+Run from the project root: python -m benchmarks.bench_delivery_dates
+"""
+
+import timeit
+
+import dateparser
+
+from RapidAmazon import rapidapi_amazon
+
+# Typical product_delivery_info strings from a results page
+DELIVERY_INFOS = [
+    "FREE deliverySat, Nov 22on $35 of items shipped by AmazonOr fastest deliveryTomorrow, Nov 18",
+    "FREE deliveryDec 1 - 10on $35 of items shipped by AmazonOr fastest deliveryDec 1 - 7",
+    "FREE deliveryWed, Dec 3on $35 of items shipped by Amazon",
+    "FREE deliveryTomorrow, Nov 18on orders shipped by Amazon over $35",
+    "FREE deliveryMon, Dec 8 - Fri, Dec 12on $35 of items shipped by AmazonOr fastest deliveryThu, Dec 4",
+]
+FRAGMENTS = ["Sat, Nov 22", "Nov 18", "Dec 1", "Dec 10", "Wed, Dec 3", "Thu, Dec 4"]
+NUMBER = 200
+
+
+def _dateparser_only(fragment):
+    parsed = dateparser.parse(fragment)
+    return parsed.strftime("%Y-%m-%d") if parsed else None
+
+
+def _report(name, seconds, calls):
+    print(f"{name:<40} {seconds / calls * 1e6:10.1f} us/call")
+    return seconds
+
+
+def main():
+    # Same answers on every fragment before timing anything
+    for fragment in FRAGMENTS:
+        assert rapidapi_amazon.parse_delivery_date(fragment) == _dateparser_only(fragment), fragment
+
+    calls = NUMBER * len(FRAGMENTS)
+    slow = _report("dateparser.parse", timeit.timeit(
+        lambda: [_dateparser_only(f) for f in FRAGMENTS], number=NUMBER), calls)
+    today = rapidapi_amazon.date.today()
+    fast = _report("fast path (no memo)", timeit.timeit(
+        lambda: [rapidapi_amazon._parse_delivery_fragment(f, today) for f in FRAGMENTS], number=NUMBER), calls)
+    memo = _report("parse_delivery_date (memoized)", timeit.timeit(
+        lambda: [rapidapi_amazon.parse_delivery_date(f) for f in FRAGMENTS], number=NUMBER), calls)
+    _report("extract_delivery_date (per product)", timeit.timeit(
+        lambda: [rapidapi_amazon.extract_delivery_date(i, "", "") for i in DELIVERY_INFOS], number=NUMBER),
+        NUMBER * len(DELIVERY_INFOS))
+
+    print(f"\nfast path: {slow / fast:.0f}x faster, memoized: {slow / memo:.0f}x faster than dateparser")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: how long a fresh interpreter takes to import each module (worker boot time)
+Run from the project root: python -m benchmarks.bench_import_time [runs]
+Add --warm to also time app.warm_up() with every dependency enabled.
+
+For a per-module breakdown of a single import use: python -X importtime -c "import app"
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "settings",
+    "EbayAPI.ebay_call",
+    "RapidAmazon.rapidapi_amazon",
+    "Gemini.gemini",
+    "NLP.simple_nlp",
+    "api_process",
+    "app",
+]
+# Heavy dependencies that should only be loaded by warm_up() or on first use
+LAZY = ["spacy", "dateparser", "google.generativeai"]
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {lazy!r} if m in sys.modules))
+"""
+
+WARM_SNIPPET = """
+import time
+import app
+start = time.perf_counter()
+app.warm_up(nlp=True, gemini=True, ebay_token=False, dateparser=True)
+print(time.perf_counter() - start, "")
+"""
+
+
+def _run(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    # The last line is "<seconds> <modules>"; anything printed before it comes from the import itself
+    parts = out.stdout.strip().splitlines()[-1].split(None, 1)
+    return float(parts[0]), parts[1] if len(parts) > 1 else ""
+
+
+def _median_ms(code, runs):
+    results = [_run(code) for _ in range(runs)]
+    return statistics.median(seconds for seconds, _ in results) * 1000, results[-1][1]
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    runs = int(args[0]) if args else 5
+
+    print(f"{'module':<30} {'median ms':>10}  heavy deps loaded")
+    for module in MODULES:
+        ms, loaded = _median_ms(SNIPPET.format(module=module, lazy=LAZY), runs)
+        print(f"{module:<30} {ms:10.1f}  {loaded or '-'}")
+
+    if "--warm" in sys.argv:
+        ms, _ = _median_ms(WARM_SNIPPET, runs)
+        print(f"{'app.warm_up() (all)':<30} {ms:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
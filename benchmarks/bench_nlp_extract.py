@@ -0,0 +1,84 @@
+"""
+Microbenchmark: per-query cost of the regex stages of SimpleNLPExtractor.extract,
+one re.search per table entry vs the indexed tables
+Run from the project root: python -m benchmarks.bench_nlp_extract
+spaCy is switched off so only the pattern matching is measured.
+"""
+
+import re
+import timeit
+
+from NLP.simple_nlp import SimpleNLPExtractor
+
+QUERIES = [
+    "I need a gift for my 10 year old niece under $50",
+    "Looking for headphones for my boyfriend around $100",
+    "Get me a lego star wars set under 30 dollars",
+    "something for my mom, maybe kitchen stuff under $75",
+    "toy for 5 year old nephew",
+    "gaming keyboard for teen",
+    "nice watch for my husband's birthday around $200",
+    "art supplies for creative daughter age 8",
+    "a cozy hoodie and some yoga gear for my sister, at least $20",
+    "vinyl record player for grandpa between $40 and $90",
+]
+NUMBER = 500
+
+
+def _per_keyword_categories(extractor, query):
+    """The old _identify_categories: one search per keyword."""
+    found = []
+    for category, keywords in extractor.category_keywords.items():
+        for keyword in keywords:
+            if re.search(rf'\b{keyword}s?\b', query):
+                found.append(category)
+                break
+    return found
+
+
+def _per_keyword_relationship(extractor, query):
+    """The old _extract_relationship: one search per relationship."""
+    for rel in extractor.relationships:
+        if re.search(rf'\b{rel}\b', query):
+            return rel
+    return None
+
+
+def _report(name, seconds):
+    print(f"{name:<36} {seconds / (NUMBER * len(QUERIES)) * 1e6:8.2f} us/query")
+    return seconds
+
+
+def main():
+    extractor = SimpleNLPExtractor(cache_size=0)
+    extractor.use_spacy = False
+    lowered = [q.lower() for q in QUERIES]
+
+    # Same answers on every query before timing anything
+    for query in lowered:
+        assert extractor._identify_categories(query) == _per_keyword_categories(extractor, query), query
+        assert extractor._extract_relationship(query) == _per_keyword_relationship(extractor, query), query
+
+    slow = _report("categories, search per keyword", timeit.timeit(
+        lambda: [_per_keyword_categories(extractor, q) for q in lowered], number=NUMBER))
+    fast = _report("_identify_categories", timeit.timeit(
+        lambda: [extractor._identify_categories(q) for q in lowered], number=NUMBER))
+    print(f"{'':<36} {slow / fast:8.0f}x faster")
+    slow = _report("relationship, search per entry", timeit.timeit(
+        lambda: [_per_keyword_relationship(extractor, q) for q in lowered], number=NUMBER))
+    fast = _report("_extract_relationship", timeit.timeit(
+        lambda: [extractor._extract_relationship(q) for q in lowered], number=NUMBER))
+    print(f"{'':<36} {slow / fast:8.0f}x faster")
+    _report("_extract_price", timeit.timeit(
+        lambda: [extractor._extract_price(q) for q in lowered], number=NUMBER))
+    _report("extract (regex only)", timeit.timeit(
+        lambda: [extractor.extract(q) for q in QUERIES], number=NUMBER))
+
+    cached = SimpleNLPExtractor()
+    cached.use_spacy = False
+    _report("extract (cache hit)", timeit.timeit(
+        lambda: [cached.extract(q) for q in QUERIES], number=NUMBER))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Optional tuning settings read from config.ini
+Every setting has a fallback so a config.ini with only API keys still works.
+"""
+
+import os
+import threading
+from configparser import ConfigParser, ExtendedInterpolation
+
+# config.ini lives next to this file in the SantasHelpr folder
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini')
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def load_config():
+    """Parse config.ini once per process and return the ConfigParser."""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                config = ConfigParser(interpolation=ExtendedInterpolation())
+                config.read(CONFIG_PATH)
+                _config = config
+    return _config
+
+
+def reload_config():
+    """Drop the parsed config so the next lookup re-reads config.ini."""
+    global _config
+    with _config_lock:
+        _config = None
+
+
+def get_setting(section, option, fallback=None):
+    """Return a string setting, or fallback when the section/option is missing."""
+    return load_config().get(section, option, fallback=fallback)
+
+
+def get_int_setting(section, option, fallback):
+    """Return an integer setting, or fallback when missing or malformed."""
+    try:
+        return load_config().getint(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
+
+
+def get_float_setting(section, option, fallback):
+    """Return a float setting, or fallback when missing or malformed."""
+    try:
+        return load_config().getfloat(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
+
+
+def get_bool_setting(section, option, fallback):
+    """Return a boolean setting (yes/no, true/false, on/off, 1/0), or fallback."""
+    try:
+        return load_config().getboolean(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
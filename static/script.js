@@ -36,6 +36,97 @@ document.getElementById('chatInput').addEventListener('keypress', (e) => {
     if (e.key === 'Enter') performChatSearch();
 });
 
+// Streaming search - reads Server-Sent Events from a POST response and
+// calls onEvent(name, data) for each one as it arrives
+async function streamSearch(url, body, onEvent) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(body)
+    });
+    
+    // Validation errors come back as plain JSON before the stream starts
+    if (!response.ok || !response.body) {
+        const data = await response.json();
+        throw new Error(data.error || 'Search failed');
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let name = 'message';
+            let dataText = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) name = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+            });
+            onEvent(name, dataText ? JSON.parse(dataText) : {});
+        }
+    }
+}
+
+// Keeps the products received so far and redraws the result cards
+function createProgressiveResults() {
+    const mainProducts = [];
+    const similarProducts = [];
+    
+    return {
+        addMain(products) {
+            mainProducts.push(...products);
+            displayResults({ products: mainProducts.concat(similarProducts) });
+        },
+        addSimilar(product) {
+            similarProducts.push(product);
+            displayResults({ products: mainProducts.concat(similarProducts) });
+        }
+    };
+}
+
+function showExtractedInfo(ext) {
+    const extractedInfo = document.getElementById('extractedInfo');
+    const meta = ext.metadata;
+    
+    let infoHtml = `<h4>🎁 Santa Understood Your Request 🎅</h4>`;
+    infoHtml += `<p><span class="label">Searching for:</span> ${ext.query}</p>`;
+    
+    if (ext.min_price || ext.max_price) {
+        infoHtml += `<p><span class="label">Price range:</span> $${ext.min_price || '0'} - $${ext.max_price || 'any'}</p>`;
+    }
+    if (meta.relationship) {
+        let recipientInfo = meta.relationship;
+        if (meta.demographic) {
+            recipientInfo += ` (${meta.demographic})`;
+        }
+        infoHtml += `<p><span class="label">Recipient:</span> ${recipientInfo}</p>`;
+    }
+    if (meta.age) {
+        infoHtml += `<p><span class="label">Age:</span> ${meta.age} years old</p>`;
+    }
+    if (meta.categories && meta.categories.length > 0) {
+        infoHtml += `<p><span class="label">Categories:</span> ${meta.categories.join(', ')}</p>`;
+    }
+    if (meta.keywords && meta.keywords.length > 0) {
+        infoHtml += `<p><span class="label">Keywords:</span> ${meta.keywords.slice(0, 5).join(', ')}</p>`;
+    }
+    
+    extractedInfo.innerHTML = infoHtml;
+    extractedInfo.style.display = 'block';
+}
+
 async function performChatSearch() {
     const searchBtn = document.getElementById('chatSearchBtn');
     const loading = document.getElementById('loading');
@@ -59,62 +150,35 @@ async function performChatSearch() {
     results.innerHTML = '';
     extractedInfo.style.display = 'none';
     
+    const progress = createProgressiveResults();
+    
     try {
-        const response = await fetch('/chat-search', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ message })
-        });
-        
-        const data = await response.json();
-        
-        if (data.success) {
-            // Show what was extracted
-            const ext = data.extracted;
-            const meta = ext.metadata;
-            
-            let infoHtml = `<h4>🎁 Santa Understood Your Request 🎅</h4>`;
-            infoHtml += `<p><span class="label">Searching for:</span> ${ext.query}</p>`;
-            
-            if (ext.min_price || ext.max_price) {
-                infoHtml += `<p><span class="label">Price range:</span> $${ext.min_price || '0'} - $${ext.max_price || 'any'}</p>`;
-            }
-            if (meta.relationship) {
-                let recipientInfo = meta.relationship;
-                if (meta.demographic) {
-                    recipientInfo += ` (${meta.demographic})`;
-                }
-                infoHtml += `<p><span class="label">Recipient:</span> ${recipientInfo}</p>`;
-            }
-            if (meta.age) {
-                infoHtml += `<p><span class="label">Age:</span> ${meta.age} years old</p>`;
-            }
-            if (meta.categories && meta.categories.length > 0) {
-                infoHtml += `<p><span class="label">Categories:</span> ${meta.categories.join(', ')}</p>`;
-            }
-            if (meta.keywords && meta.keywords.length > 0) {
-                infoHtml += `<p><span class="label">Keywords:</span> ${meta.keywords.slice(0, 5).join(', ')}</p>`;
+        await streamSearch('/chat-search/stream', { message }, (event, data) => {
+            if (event === 'extracted') {
+                // Show what was extracted
+                showExtractedInfo(data);
+            } else if (event === 'ideas') {
+                showSimilarIdeas(data.similar_gifts);
+            } else if (event === 'main') {
+                progress.addMain(data.products || []);
+            } else if (event === 'similar') {
+                progress.addSimilar(data.product);
+            } else if (event === 'done') {
+                displayResults(data);
+                
+                // Show status
+                const mainCount = data.products ? data.products.filter(p => p.product_type === 'main').length : 0;
+                const similarCount = data.products ? data.products.filter(p => p.product_type === 'similar').length : 0;
+                let statusMsg = `Found ${mainCount} main results, ${similarCount} similar recommendations`;
+                statusMsg += skippedNote(data);
+                
+                status.textContent = statusMsg;
+                status.className = 'status success';
+                status.style.display = 'block';
+            } else if (event === 'error') {
+                throw new Error(data.error || 'Search failed');
             }
-            
-            extractedInfo.innerHTML = infoHtml;
-            extractedInfo.style.display = 'block';
-            
-            displayResults(data);
-            
-            // Show status
-            const totalCount = data.total_count || 0;
-            const mainCount = data.products ? data.products.filter(p => p.product_type === 'main').length : 0;
-            const similarCount = data.products ? data.products.filter(p => p.product_type === 'similar').length : 0;
-            let statusMsg = `Found ${mainCount} main results, ${similarCount} similar recommendations`;
-            
-            status.textContent = statusMsg;
-            status.className = 'status success';
-            status.style.display = 'block';
-        } else {
-            throw new Error(data.error || 'Search failed');
-        }
+        });
     } catch (error) {
         console.error('Chat search error:', error);
         status.textContent = `Error: ${error.message}`;
@@ -152,32 +216,32 @@ async function performSearch() {
     status.style.display = 'none';
     results.innerHTML = '';
     
+    const progress = createProgressiveResults();
+    
     try {
-        const response = await fetch('/search', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(searchParams)
+        await streamSearch('/search/stream', searchParams, (event, data) => {
+            if (event === 'ideas') {
+                showSimilarIdeas(data.similar_gifts);
+            } else if (event === 'main') {
+                progress.addMain(data.products || []);
+            } else if (event === 'similar') {
+                progress.addSimilar(data.product);
+            } else if (event === 'done') {
+                displayResults(data);
+                
+                // Show status
+                const mainCount = data.products ? data.products.filter(p => p.product_type === 'main').length : 0;
+                const similarCount = data.products ? data.products.filter(p => p.product_type === 'similar').length : 0;
+                let statusMsg = `Found ${mainCount} main results, ${similarCount} AI-recommended similar items`;
+                statusMsg += skippedNote(data);
+                
+                status.textContent = statusMsg;
+                status.className = 'status success';
+                status.style.display = 'block';
+            } else if (event === 'error') {
+                throw new Error(data.error || 'Search failed');
+            }
         });
-        
-        const data = await response.json();
-        
-        if (data.success) {
-            displayResults(data);
-            
-            // Show status
-            const totalCount = data.total_count || 0;
-            const mainCount = data.products ? data.products.filter(p => p.product_type === 'main').length : 0;
-            const similarCount = data.products ? data.products.filter(p => p.product_type === 'similar').length : 0;
-            let statusMsg = `Found ${mainCount} main results, ${similarCount} AI-recommended similar items`;
-            
-            status.textContent = statusMsg;
-            status.className = 'status success';
-            status.style.display = 'block';
-        } else {
-            throw new Error(data.error || 'Search failed');
-        }
     } catch (error) {
         console.error('Search error:', error);
         status.textContent = `Error: ${error.message}`;
@@ -189,6 +253,24 @@ async function performSearch() {
     }
 }
 
+// Tell the user which similar gifts are being searched while their results load
+function showSimilarIdeas(ideas) {
+    if (!ideas || ideas.length === 0) return;
+    const status = document.getElementById('status');
+    status.textContent = `Also searching for similar gifts: ${ideas.join(', ')}`;
+    status.className = 'status';
+    status.style.display = 'block';
+}
+
+// Note for results returned at the deadline without some vendors
+function skippedNote(data) {
+    if (!data.partial || !data.skipped_sources || data.skipped_sources.length === 0) {
+        return '';
+    }
+    const sources = [...new Set(data.skipped_sources.map(s => s.source))];
+    return ` (${sources.join(', ')} took too long and ${sources.length === 1 ? 'was' : 'were'} skipped)`;
+}
+
 function displayResults(data) {
     const results = document.getElementById('results');
     results.innerHTML = '';
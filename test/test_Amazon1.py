@@ -1,41 +1,50 @@
 import unittest
+import json
 import os
 import sys
 import configparser
+import http.server
 import importlib
+import tempfile
+import threading
+import time
 from unittest.mock import patch, Mock
 
+import requests
+
 # Add the project root to sys.path so Python can find the modules
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+import settings
+from settings import reload_config
+
 class TestAmazonSearch(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        # Ensure a config.ini exists so the module can import without raising at import-time.
-        # rapidapi_amazon.py reads 'config.ini' at import, so write a minimal one in the repo root.
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        cls.config_path = os.path.join(repo_root, 'config.ini')
+        # Credentials come from a throwaway config file, never the repo's config.ini
+        cls.config_dir = tempfile.TemporaryDirectory()
+        config_path = os.path.join(cls.config_dir.name, 'config.ini')
 
         config = configparser.ConfigParser()
         config['amazon'] = {
             'rapid_api_key': 'fake_key_for_tests',
             'rapid_api_host': 'fake_host_for_tests'
         }
-        with open(cls.config_path, 'w', encoding='utf-8') as f:
+        with open(config_path, 'w', encoding='utf-8') as f:
             config.write(f)
+        cls.config_patch = patch.object(settings, 'CONFIG_PATH', config_path)
+        cls.config_patch.start()
+        reload_config()
 
-        # Import the module after creating config.ini so top-level config access succeeds
         cls.module = importlib.import_module('RapidAmazon.rapidapi_amazon')
 
     @classmethod
     def tearDownClass(cls):
-        # Remove created config.ini
-        try:
-            os.remove(cls.config_path)
-        except OSError:
-            pass
+        cls.config_patch.stop()
+        cls.config_dir.cleanup()
+        reload_config()
 
     def test_is_valid_price(self):
         is_valid = self.module.is_valid_price
@@ -74,6 +83,28 @@ class TestAmazonSearch(unittest.TestCase):
         self.assertIn("minDelivery", result_range)
         self.assertIn("maxDelivery", result_range)
 
+    def test_parse_delivery_date_fast_path(self):
+        year = self.module.date.today().year
+        tomorrow = self.module.date.today() + self.module.timedelta(days=1)
+        with patch.object(self.module, 'dateparser') as mock_dateparser:
+            mock_parse = mock_dateparser.parse
+            self.assertEqual(self.module.parse_delivery_date("Sat, Nov 22"), f"{year}-11-22")
+            self.assertEqual(self.module.parse_delivery_date("Tomorrow, Nov 18"), f"{year}-11-18")
+            self.assertEqual(self.module.parse_delivery_date("Sept 3"), f"{year}-09-03")
+            self.assertEqual(self.module.parse_delivery_date("Tomorrow"), tomorrow.isoformat())
+            self.assertIsNone(self.module.parse_delivery_date("Feb 30"))
+            mock_parse.assert_not_called()
+
+            # Unrecognised text falls back to dateparser, once per string
+            mock_parse.return_value = None
+            self.assertIsNone(self.module.parse_delivery_date("Overnight 7 AM - 11 AM"))
+            self.assertIsNone(self.module.parse_delivery_date("Overnight 7 AM - 11 AM"))
+            mock_parse.assert_called_once_with("Overnight 7 AM - 11 AM")
+
+        result = self.module.extract_delivery_date(
+            "FREE deliveryDec 1 - 10on $35 of items shipped by AmazonOr fastest deliveryDec 1 - 7", "", "")
+        self.assertEqual(result, {"minDelivery": f"{year}-12-01", "maxDelivery": f"{year}-12-10"})
+
     def test_filter_product_data(self):
         sample = {
             "products": [
@@ -119,17 +150,22 @@ class TestAmazonSearch(unittest.TestCase):
         self.assertIsInstance(p.get("product_delivery_info"), dict)
 
     def test_search_amazon_makes_request(self):
-        # Mock requests.get used inside the module to avoid network calls
+        # Mock the pooled session used inside the module to avoid network calls
         mock_response = Mock()
         mock_response.status_code = 200  # Add status_code to avoid TypeError
         mock_response.json.return_value = {"products": []}
 
-        with patch.object(self.module.requests, 'get', return_value=mock_response) as mock_get:
+        mock_session = Mock()
+        mock_session.get.return_value = mock_response
+
+        with patch.object(self.module, 'get_session', return_value=mock_session) as mock_get_session:
+            mock_get = mock_session.get
             # call with minimal args (min_price and max_price are optional in behavior)
             result = self.module.search_amazon("laptop", None, None, "")
             # ensure we got the mocked response back
             self.assertEqual(result, {"products": []})
             mock_get.assert_called_once()
+            mock_get_session.assert_called_once_with("amazon")
             call_args = mock_get.call_args
             # First positional arg should be the URL
             self.assertEqual(call_args[0][0], self.module.url)
@@ -145,5 +181,126 @@ class TestAmazonSearch(unittest.TestCase):
             self.assertEqual(params["page"], 1)
             self.assertEqual(params["geo"], "US")
 
+    def test_stream_products_stops_early(self):
+        page = json.dumps({"status": "OK", "data": {"total_products": 3, "products": [
+            {"product_title": "Free", "product_price": "N/A"},
+            {"product_title": "Kite", "product_price": "$12.99", "asin": "B1"},
+            {"product_title": "Yo-yo", "product_price": "$4.99", "asin": "B2"},
+        ]}}).encode("utf-8")
+        read = []
+
+        def chunks():
+            # 7-byte chunks, so products arrive split across reads
+            for i in range(0, len(page), 7):
+                read.append(i)
+                yield page[i:i + 7]
+
+        result = self.module.stream_products(chunks(), max_products=1, fields=["product_title", "product_price"])
+
+        self.assertEqual(result, {"amazon_products": [{"product_title": "Kite", "product_price": "$12.99"}]})
+        self.assertLess(len(read) * 7, page.index(b"Yo-yo"))
+
+        everything = self.module.stream_products([page], max_products=10)
+        self.assertEqual([p["asin"] for p in everything["amazon_products"]], ["B1", "B2"])
+        # Filtered once, exactly as filter_product_data would filter the whole page
+        self.assertEqual(everything, self.module.filter_product_data(json.loads(page)["data"], 10, None))
+
+    def test_stream_products_error_payload(self):
+        error = b'{"status": "ERROR", "error": {"message": "Invalid API key"}}'
+        result = self.module.stream_products([error[:10], error[10:]], max_products=1)
+        self.assertEqual(result["status"], "ERROR")
+
+        with self.assertRaises(ValueError):
+            self.module.stream_products([b'{"products": [{"product_title": "cut off'], max_products=1)
+
+    def test_search_amazon_streams_when_limited(self):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b'{"products": [{"product_price": "5.00", "asin": "B1"}, ']
+
+        mock_session = Mock()
+        mock_session.get.return_value = mock_response
+
+        with patch.object(self.module, 'get_session', return_value=mock_session):
+            result = self.module.search_amazon("laptop", None, None, "", max_products=1, fields=("asin",))
+
+        self.assertEqual(result, {"amazon_products": [{"asin": "B1"}]})
+        self.assertTrue(mock_session.get.call_args.kwargs["stream"])
+        mock_response.json.assert_not_called()
+        mock_response.close.assert_called_once()
+
+    def test_streamed_body_stops_at_the_deadline(self):
+        read = []
+
+        def slow_body(chunk_size):
+            # The headers came back in time, the body trickles in
+            for i in range(100):
+                read.append(i)
+                time.sleep(0.02)
+                yield b'{"products": [' if i == 0 else b' '
+
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_content.side_effect = slow_body
+        mock_session = Mock()
+        mock_session.get.return_value = mock_response
+
+        with patch.object(self.module, 'get_session', return_value=mock_session):
+            with self.assertRaises(TimeoutError):
+                self.module.search_amazon("laptop", None, None, "", max_products=1,
+                                          deadline=time.monotonic() + 0.1)
+        # Neither decoding nor draining read on past the deadline
+        self.assertLess(len(read), 15)
+        mock_response.close.assert_called_once()
+
+    def test_stopping_early_keeps_the_connection(self):
+        # A real keep-alive server: the unread rest of the page is drained, so both searches
+        # share one connection instead of the second paying for a new handshake
+        page = json.dumps({"data": {"products": [
+            {"product_title": f"Item {i}", "product_price": f"${i + 1}.00"} for i in range(2000)
+        ]}}).encode("utf-8")
+        connections = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                connections.append(self.client_address)
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        session = requests.Session()
+        self.addCleanup(session.close)
+
+        url = f"http://127.0.0.1:{server.server_address[1]}/search"
+        with patch.object(self.module, 'url', url), patch.object(self.module, 'get_session', return_value=session), \
+                patch('builtins.print'):
+            for _ in range(2):
+                result = self.module.search_amazon("laptop", None, None, "", max_products=1, fields=("product_title",))
+                self.assertEqual(result, {"amazon_products": [{"product_title": "Item 0"}]})
+        self.assertEqual(len(connections), 1)
+
+        # Past STREAM_DRAIN_MAX_BYTES the connection is dropped rather than read to the end,
+        # so the next search has to open a new one
+        with patch.object(self.module, 'url', url), patch.object(self.module, 'get_session', return_value=session), \
+                patch('builtins.print'):
+            with patch.object(self.module, 'STREAM_DRAIN_MAX_BYTES', 1024):
+                self.module.search_amazon("laptop", None, None, "", max_products=1)
+            self.module.search_amazon("laptop", None, None, "", max_products=1)
+        self.assertEqual(len(connections), 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -3,6 +3,8 @@ import json
 import sys
 import os
 import types
+import threading
+import time
 from unittest.mock import patch, mock_open, MagicMock
 
 # Add project root to path for imports
@@ -17,11 +19,21 @@ google_mock.generativeai = genai_mock
 sys.modules["google"] = google_mock
 sys.modules["google.generativeai"] = genai_mock
 
+import api_process
 from api_process import integrated_API
+from Caching.single_flight import SingleFlight
+from Monitoring.timing import RequestTimer
+from settings import reload_config
+from Transport import http_session, rate_limit, resilience
+from Transport.rate_limit import PRIORITY_LOW, RateLimitedError
 
 
 class TestIntegratedAPI(unittest.TestCase):
 
+    def setUp(self):
+        # Every test starts with an empty result cache
+        api_process.RESULT_CACHE.clear()
+
     # =====================================================================
     #  FULL FLOW TEST
     # =====================================================================
@@ -40,7 +52,9 @@ class TestIntegratedAPI(unittest.TestCase):
         """Main happy-path flow."""
 
         mock_get_similar.return_value = ["rare holo card", "trading binder"]
-        mock_search_ebay.return_value = {"itemSummaries": [{"title": "Item 1"}]}
+        mock_search_ebay.return_value = {"itemSummaries": [
+            {"title": "Pokemon cards lot"}, {"title": "Rare holo card"}, {"title": "Trading card binder"}
+        ]}
         mock_ebay_display.return_value = {
             "found_items_count": 2,
             "items": [{"title": "eBay Item", "price": "10.00"}]
@@ -70,8 +84,8 @@ class TestIntegratedAPI(unittest.TestCase):
 
         mock_get_similar.assert_called_once_with("pokemon cards", num_ideas=2)
 
-        # Should search main + 2 similar terms = 3 calls each
-        self.assertEqual(mock_search_ebay.call_count, 3)
+        # Main + 2 similar terms = 3 Amazon calls; eBay gets the similar terms in one OR query
+        self.assertEqual(mock_search_ebay.call_count, 2)
         self.assertEqual(mock_search_amazon.call_count, 3)
 
         # Check result structure
@@ -139,6 +153,23 @@ class TestIntegratedAPI(unittest.TestCase):
         self.assertEqual(mock_amazon.call_count, 1)
         self.assertIn("products", results)
 
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[{"source": "eBay", "title": "Shoe", "price": 20.0}])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", side_effect=RateLimitedError("gemini rate limit reached"))
+    def test_gemini_failure_still_returns_main_products(
+        self, mock_gemini, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        results = integrated_API(product_name="shoes")
+
+        self.assertEqual(mock_ebay.call_count, 1)
+        self.assertEqual([p["product_type"] for p in results["products"]], ["main"])
+        self.assertEqual(len(api_process.RESULT_CACHE), 0)
+
     # =====================================================================
     #  EBAY RETURNS NO RESULTS
     # =====================================================================
@@ -222,6 +253,597 @@ class TestIntegratedAPI(unittest.TestCase):
         self.assertIn("filters", results)
         self.assertEqual(results["filters"]["price_range"], "$any - $any")
 
+    # =====================================================================
+    #  CONCURRENT FAN-OUT
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results")
+    @patch("api_process.search_ebay")
+    @patch("api_process.get_similar_gift_ideas", return_value=["slow gift", "fast gift"])
+    def test_concurrent_searches_overlap_and_keep_order(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        """Vendor calls run in parallel but products come back in Gemini order."""
+        lock = threading.Lock()
+        in_flight = {"now": 0, "max": 0}
+
+        def slow_ebay(query, **kwargs):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            # The first similar gift finishes last
+            time.sleep(0.2 if query == "slow gift" else 0.05)
+            with lock:
+                in_flight["now"] -= 1
+            return {"itemSummaries": [{"title": query}]}
+
+        mock_ebay.side_effect = slow_ebay
+        mock_ebay_display.side_effect = lambda raw: {
+            "found_items_count": 1,
+            "items": [{"title": raw["itemSummaries"][0]["title"]}]
+        }
+        mock_compare.side_effect = lambda combined, *args, **kwargs: [
+            {"source": "eBay", "title": combined["ebay"]["items"][0]["title"], "price": 1.0}
+        ]
+
+        results = integrated_API(product_name="robot", batch_similar=False)
+
+        self.assertGreater(in_flight["max"], 1)
+        titles = [p["title"] for p in results["products"]]
+        self.assertEqual(titles, ["robot", "slow gift", "fast gift"])
+        self.assertEqual([p["rank"] for p in results["products"]], [1, 4, 5])
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["alt"])
+    def test_sequential_mode_runs_on_caller_thread(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        caller = threading.current_thread().name
+        seen = []
+        mock_ebay.side_effect = lambda query, **kwargs: seen.append(threading.current_thread().name)
+
+        results = integrated_API(product_name="lamp", concurrent=False)
+
+        self.assertEqual(seen, [caller, caller])
+        self.assertIn("products", results)
+
+    def test_default_pool_has_a_thread_per_vendor_connection(self):
+        settings = {"pool_maxsize": 10, "amazon_pool_maxsize": 4}
+        with patch.object(http_session, "get_int_setting", side_effect=lambda s, o, fallback: settings.get(o, fallback)):
+            self.assertEqual(api_process.default_max_workers(), 10 + 4 + 10)
+        # The shipped defaults leave room for 8 searches of 6 tasks each, not 2
+        with patch.object(http_session, "get_int_setting", side_effect=lambda s, o, fallback: fallback):
+            self.assertEqual(api_process.default_max_workers(), 48)
+
+    # =====================================================================
+    #  GEMINI OVERLAPS MAIN SEARCHES
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay")
+    @patch("api_process.get_similar_gift_ideas")
+    def test_main_searches_start_before_gemini_returns(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        main_started = threading.Event()
+        queries = []
+
+        def fake_ebay(query, **kwargs):
+            queries.append(query)
+            if query == "kite":
+                main_started.set()
+            return None
+
+        def fake_gemini(name, num_ideas=2):
+            # Only answers once the main eBay search is already running
+            self.assertTrue(main_started.wait(timeout=2))
+            return ["yo-yo"]
+
+        mock_ebay.side_effect = fake_ebay
+        mock_gift.side_effect = fake_gemini
+
+        results = integrated_API(product_name="kite")
+
+        self.assertEqual(sorted(queries), ["kite", "yo-yo"])
+        self.assertIn("products", results)
+
+    # =====================================================================
+    #  BATCHED SIMILAR-GIFT EBAY SEARCH
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.search_ebay")
+    @patch("api_process.get_similar_gift_ideas", return_value=["jigsaw puzzle", "board game", "Train Set"])
+    def test_similar_gifts_share_one_ebay_call(
+        self, mock_gift, mock_ebay, mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        def fake_ebay(query, **kwargs):
+            if query.startswith("("):
+                return {"itemSummaries": [
+                    {"title": "Classic Board Game"}, {"title": "1000 piece jigsaw puzzle"}, {"title": "Jigsaw mat"}
+                ]}
+            return {"itemSummaries": [{"title": query.lower()}]}
+
+        mock_ebay.side_effect = fake_ebay
+        mock_compare.side_effect = lambda combined, *args, **kwargs: [
+            {"source": "eBay", "title": combined["ebay"]["items"][0]["title"], "price": 1.0}
+        ] if "items" in combined["ebay"] else []
+
+        results = integrated_API(product_name="train set", use_cache=False)
+
+        # "Train Set" is the main product: it shares the main call, the other two go out together
+        # (whichever of "train set" / "Train Set" starts first makes the shared call)
+        queries = sorted(c.kwargs["query"].lower() for c in mock_ebay.call_args_list)
+        self.assertEqual(queries, ["(jigsaw puzzle, board game)", "train set"])
+        batch_call = [c for c in mock_ebay.call_args_list if c.kwargs["query"].startswith("(")][0]
+        self.assertEqual(batch_call.kwargs["limit"], 2 * api_process.EBAY_BATCH_LIMIT_PER_TERM)
+        self.assertEqual(batch_call.kwargs["priority"], PRIORITY_LOW)
+
+        titles = [(p["title"], p.get("search_term")) for p in results["products"]]
+        self.assertEqual(titles, [
+            ("train set", None),
+            ("1000 piece jigsaw puzzle", "jigsaw puzzle"),
+            ("Classic Board Game", "board game"),
+            ("train set", "Train Set"),
+        ])
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.search_ebay")
+    @patch("api_process.get_similar_gift_ideas", return_value=["kite", "yo-yo"])
+    def test_crowded_out_term_gets_its_own_ebay_call(
+        self, mock_gift, mock_ebay, mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        def fake_ebay(query, **kwargs):
+            if query.startswith("("):
+                # Price-sorted across both terms: cheap kites fill the whole shared limit
+                return {"itemSummaries": [{"title": f"Kite {i}"} for i in range(kwargs["limit"])]}
+            return {"itemSummaries": [{"title": f"{query} deluxe"}]}
+
+        mock_ebay.side_effect = fake_ebay
+        integrated_API(product_name="lego", use_cache=False)
+
+        queries = sorted(c.kwargs["query"] for c in mock_ebay.call_args_list)
+        self.assertEqual(queries, ["(kite, yo-yo)", "lego", "yo-yo"])
+        similar_ebay = {c.args[0]["ebay"]["items"][0]["title"] for c in mock_compare.call_args_list[1:]}
+        self.assertEqual(similar_ebay, {"Kite 0", "yo-yo deluxe"})
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.search_ebay", side_effect=Exception("eBay failure"))
+    @patch("api_process.get_similar_gift_ideas", return_value=["puzzle", "board game"])
+    def test_batched_ebay_failure_reported_per_term(
+        self, mock_gift, mock_ebay, mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        results = integrated_API(product_name="lego", use_cache=False)
+
+        self.assertEqual(mock_ebay.call_count, 2)
+        self.assertEqual(results["products"], [])
+        similar_ebay = [c.args[0]["ebay"] for c in mock_compare.call_args_list[1:]]
+        self.assertEqual(similar_ebay, [{"error": "eBay failure"}, {"error": "eBay failure"}])
+
+    # =====================================================================
+    #  RATE LIMITS (shipped config.ini)
+    # =====================================================================
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["kite", "yo-yo"])
+    def test_full_search_fits_the_shipped_amazon_limits(
+        self, mock_gift, mock_ebay, mock_display, mock_compare
+    ):
+        page = json.dumps({"data": {"products": [
+            {"product_title": "Item", "product_price": "$10.00", "product_url": "https://example.com"}
+        ]}}).encode("utf-8")
+
+        class Response:
+            status_code = 200
+
+            def iter_content(self, chunk_size=None):
+                yield page
+
+            def close(self):
+                pass
+
+        session = MagicMock()
+        session.get.side_effect = lambda *args, **kwargs: Response()
+
+        # The real limiter and breakers, configured from the repo's config.ini, on an idle server
+        reload_config()
+        rate_limit.reset()
+        resilience.reset()
+        self.addCleanup(rate_limit.reset)
+        self.addCleanup(resilience.reset)
+        limiter = rate_limit.get_limiter("amazon")  # built before open() is mocked below
+        self.assertIsNotNone(limiter.bucket)
+
+        with patch("RapidAmazon.rapidapi_amazon.get_session", return_value=session), \
+                patch("builtins.open", mock_open()), patch("builtins.print"):
+            integrated_API(product_name="lego", use_cache=False)
+
+        self.assertEqual(session.get.call_count, 3)  # 1 main + 2 low priority
+        amazon = {c.args[0]["amazon"].get("error") for c in mock_compare.call_args_list}
+        self.assertEqual(amazon, {None})
+
+    # =====================================================================
+    #  FETCH PROFILES
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["yo-yo"])
+    def test_similar_searches_fetch_less(
+        self, mock_gift, mock_ebay, mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        integrated_API(product_name="kite", use_cache=False)
+
+        ebay_calls = {c.kwargs["query"]: c.kwargs for c in mock_ebay.call_args_list}
+        self.assertEqual((ebay_calls["kite"]["limit"], ebay_calls["kite"]["fieldgroups"]), (5, "EXTENDED"))
+        self.assertEqual((ebay_calls["yo-yo"]["limit"], ebay_calls["yo-yo"]["fieldgroups"]), (1, "EXTENDED"))
+
+        filters = sorted((c.kwargs["max_products"], len(c.kwargs["fields"])) for c in mock_filter.call_args_list)
+        self.assertEqual(filters, [(1, len(api_process.AMAZON_FIELDS)), (5, len(api_process.AMAZON_FIELDS))])
+        # Amazon stops decoding the page once it has the products it needs
+        amazon_calls = {c.kwargs["query"]: c.kwargs for c in mock_amazon.call_args_list}
+        self.assertEqual(amazon_calls["yo-yo"]["max_products"], 1)
+        self.assertEqual(amazon_calls["yo-yo"]["fields"], tuple(api_process.AMAZON_FIELDS))
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["yo-yo"])
+    def test_profiles_selectable_per_call(
+        self, mock_gift, mock_ebay, mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        integrated_API(product_name="kite", similar_profile="main", use_cache=False)
+
+        self.assertEqual({c.kwargs["limit"] for c in mock_ebay.call_args_list}, {5})
+        self.assertEqual({c.kwargs["max_products"] for c in mock_filter.call_args_list}, {5})
+        with self.assertRaises(ValueError):
+            integrated_API(product_name="kite", main_profile="everything")
+
+    # =====================================================================
+    #  PROGRESS EVENTS FOR STREAMING
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results")
+    @patch("api_process.search_ebay")
+    @patch("api_process.get_similar_gift_ideas", return_value=["puzzle", "board game"])
+    def test_progress_events(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        mock_ebay.side_effect = lambda query, **kwargs: {"itemSummaries": [{"title": query}]}
+        mock_ebay_display.side_effect = lambda raw: {
+            "found_items_count": 1,
+            "items": [{"title": raw["itemSummaries"][0]["title"]}]
+        }
+        mock_compare.side_effect = lambda combined, *args, **kwargs: [
+            {"source": "eBay", "title": combined["ebay"]["items"][0]["title"], "price": 1.0}
+        ]
+        events = []
+
+        results = integrated_API(product_name="lego", batch_similar=False,
+                                 on_event=lambda name, payload: events.append((name, payload)))
+
+        names = [name for name, _ in events]
+        self.assertEqual(names.count("ideas"), 1)
+        self.assertEqual(names.count("main"), 1)
+        self.assertEqual(names.count("similar"), 2)
+        self.assertEqual(dict(events)["ideas"], {"similar_gifts": ["puzzle", "board game"]})
+        main_products = dict(events)["main"]["products"]
+        self.assertEqual(main_products[0]["product_type"], "main")
+        self.assertEqual(main_products[0]["rank"], 1)
+        similar_terms = sorted(p["search_term"] for name, p in events if name == "similar")
+        self.assertEqual(similar_terms, ["board game", "puzzle"])
+        self.assertEqual(len(results["products"]), 3)
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["alt"])
+    def test_broken_event_listener_does_not_fail_search(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        def listener(name, payload):
+            raise RuntimeError("client went away")
+
+        results = integrated_API(product_name="lamp", on_event=listener)
+        self.assertIn("products", results)
+
+    # =====================================================================
+    #  RESULT CACHE
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["alt"])
+    def test_repeat_query_served_from_cache(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        mock_compare.side_effect = lambda *args, **kwargs: [{"source": "eBay", "title": "Lego Set", "price": 5.0}]
+
+        first = integrated_API(product_name="Lego", max_price="50")
+        first["products"].clear()  # callers can't corrupt the cached copy
+        second = integrated_API(product_name="  LEGO ", max_price="50")
+
+        self.assertEqual(mock_gift.call_count, 1)
+        self.assertEqual(mock_ebay.call_count, 2)
+        self.assertEqual(len(second["products"]), 2)
+        self.assertEqual(api_process.RESULT_CACHE.stats()["hits"], 1)
+
+        # Different filters are a different entry
+        integrated_API(product_name="lego", max_price="60")
+        self.assertEqual(mock_gift.call_count, 2)
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", side_effect=Exception("Amazon blew up"))
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=[])
+    def test_vendor_errors_are_not_cached(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        integrated_API(product_name="drone")
+        integrated_API(product_name="drone")
+        self.assertEqual(mock_amazon.call_count, 2)
+
+    # =====================================================================
+    #  PER-STAGE TIMINGS
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value={"itemSummaries": []})
+    @patch("api_process.get_similar_gift_ideas", return_value=["alt"])
+    def test_timer_records_every_stage(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        timer = RequestTimer()
+        integrated_API(product_name="bike", timer=timer)
+
+        names = {s["name"] for s in timer.as_list()}
+        for expected in ["gemini", "ebay_main", "ebay_display_main", "amazon_main", "amazon_filter_main",
+                         "compare_main", "ebay_similar1", "amazon_similar1", "compare_similar1",
+                         "json_dump", "total"]:
+            self.assertIn(expected, names)
+
+    # =====================================================================
+    #  REQUEST COALESCING
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas")
+    def test_identical_concurrent_searches_share_one_call(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        gemini_started = threading.Event()
+        release = threading.Event()
+
+        def slow_gemini(name, num_ideas=2):
+            gemini_started.set()
+            self.assertTrue(release.wait(timeout=2))
+            return ["robot kit"]
+
+        mock_gift.side_effect = slow_gemini
+        mock_compare.side_effect = lambda *args, **kwargs: [{"source": "eBay", "title": "Robot", "price": 9.0}]
+        shared_before = api_process.SEARCH_FLIGHTS.stats()["shared"]
+        results = {}
+        events = []
+
+        leader = threading.Thread(target=lambda: results.update(leader=integrated_API("robot", use_cache=False)))
+        leader.start()
+        self.assertTrue(gemini_started.wait(timeout=2))
+        follower = threading.Thread(target=lambda: results.update(follower=integrated_API(
+            " Robot ", use_cache=False, on_event=lambda name, payload: events.append(name))))
+        follower.start()
+        # Wait until the follower is parked on the leader's call
+        deadline = time.monotonic() + 2
+        while api_process.SEARCH_FLIGHTS.stats()["shared"] == shared_before and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        leader.join(timeout=2)
+        follower.join(timeout=2)
+
+        self.assertEqual(mock_gift.call_count, 1)
+        self.assertEqual(mock_ebay.call_count, 2)
+        self.assertEqual(results["leader"], results["follower"])
+        self.assertIsNot(results["leader"], results["follower"])
+        self.assertEqual(events, ["ideas", "main", "similar"])
+
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 1, "items": [{"title": "Robot"}]})
+    @patch("api_process.search_ebay")
+    def test_main_call_does_not_join_a_shed_low_priority_call(self, mock_ebay, mock_ebay_display):
+        low_started = threading.Event()
+        release = threading.Event()
+
+        def ebay(query, priority, **kwargs):
+            if priority == PRIORITY_LOW:
+                low_started.set()
+                self.assertTrue(release.wait(timeout=2))
+                raise RateLimitedError("ebay rate limit reached")
+            return {"itemSummaries": [{"title": "Robot"}]}
+
+        mock_ebay.side_effect = ebay
+        results = {}
+        low = threading.Thread(target=lambda: results.update(low=api_process._search_ebay_results(
+            "robot", {}, calls=SingleFlight(remember=True), priority=PRIORITY_LOW)))
+        low.start()
+        self.assertTrue(low_started.wait(timeout=2))
+        # Same term and filters while the low-priority call is in flight: it makes its own call
+        with patch("builtins.print"):
+            main = api_process._search_ebay_results("robot", {}, calls=SingleFlight(remember=True))
+        release.set()
+        low.join(timeout=2)
+
+        self.assertEqual(mock_ebay.call_count, 2)
+        self.assertEqual(main["items"], [{"title": "Robot"}])
+        self.assertIn("error", results["low"])
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["Kite", "kite string"])
+    def test_similar_term_equal_to_main_product_reuses_its_calls(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        integrated_API(product_name="kite")
+
+        # Whichever of "kite" / "Kite" starts first makes the one shared call
+        self.assertEqual(sorted(c.kwargs["query"].lower() for c in mock_ebay.call_args_list), ["kite", "kite string"])
+        self.assertEqual(mock_amazon.call_count, 2)
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["Kite"])
+    def test_coalescing_can_be_turned_off(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        integrated_API(product_name="kite", coalesce=False)
+        self.assertEqual(mock_ebay.call_count, 2)
+
+
+    # =====================================================================
+    #  DEADLINE / PARTIAL RESULTS
+    # =====================================================================
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare")
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon")
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 1, "items": [{"title": "Drum"}]})
+    @patch("api_process.search_ebay", return_value={"itemSummaries": [{"title": "Drum"}]})
+    @patch("api_process.get_similar_gift_ideas", return_value=["xylophone"])
+    def test_slow_vendor_is_skipped_at_the_deadline(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        release = threading.Event()
+
+        def slow_amazon(query, **kwargs):
+            release.wait(timeout=2)
+            return {"products": []}
+
+        mock_amazon.side_effect = slow_amazon
+        mock_compare.side_effect = lambda combined, *args, **kwargs: (
+            [{"source": "eBay", "title": "Drum", "price": 3.0}] if "items" in combined["ebay"] else []
+        )
+
+        start = time.perf_counter()
+        results = integrated_API(product_name="drum", deadline_ms=200)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+        self.assertLess(elapsed, 1.0)
+        self.assertTrue(results["partial"])
+        self.assertEqual(results["skipped_sources"], [
+            {"source": "amazon", "search_term": "drum"},
+            {"source": "amazon", "search_term": "xylophone"}
+        ])
+        # eBay made it in time, so its products are still ranked
+        self.assertEqual([p["title"] for p in results["products"]], ["Drum", "Drum"])
+        # Partial answers are never cached
+        self.assertEqual(len(api_process.RESULT_CACHE), 0)
+        # Every vendor call got the deadline
+        self.assertIn("deadline", mock_ebay.call_args.kwargs)
+        self.assertIn("deadline", mock_gift.call_args.kwargs)
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas")
+    def test_slow_gemini_skips_similar_gifts(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        release = threading.Event()
+
+        def slow_gemini(name, **kwargs):
+            release.wait(timeout=2)
+            return ["late idea"]
+
+        mock_gift.side_effect = slow_gemini
+
+        results = integrated_API(product_name="globe", deadline_ms=150)
+        release.set()
+
+        self.assertEqual(results["skipped_sources"], [{"source": "gemini", "search_term": "globe"}])
+        self.assertEqual(mock_ebay.call_count, 1)
+
+    @patch("builtins.open", new_callable=mock_open)
+    @patch("api_process.compare", return_value=[])
+    @patch("api_process.filter_product_data", return_value={"amazon_products": []})
+    @patch("api_process.search_amazon", return_value={"products": []})
+    @patch("api_process.ebay_display_results", return_value={"found_items_count": 0, "items": []})
+    @patch("api_process.search_ebay", return_value=None)
+    @patch("api_process.get_similar_gift_ideas", return_value=["alt"])
+    def test_no_deadline_means_complete_result(
+        self, mock_gift, mock_ebay, mock_ebay_display,
+        mock_amazon, mock_filter, mock_compare, mock_file
+    ):
+        results = integrated_API(product_name="yo-yo", deadline_ms=0)
+
+        self.assertFalse(results["partial"])
+        self.assertEqual(results["skipped_sources"], [])
+        self.assertNotIn("deadline", mock_ebay.call_args.kwargs)
+
 
 if __name__ == "__main__":
     unittest.main()
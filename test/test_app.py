@@ -0,0 +1,156 @@
+import unittest
+import json
+import os
+import sys
+import time
+from unittest.mock import mock_open, patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Importing app starts fetching an eBay token; tests don't need one
+with patch("EbayAPI.ebay_call.warm_up_token"), patch("builtins.print"):
+    import app
+import api_process
+
+RESULT = {"search_query": "lego", "filters": {}, "products": [{"title": "Lego", "rank": 1}]}
+
+
+class TestSearchRoutes(unittest.TestCase):
+
+    def setUp(self):
+        patch("builtins.print").start()
+        self.client = app.app.test_client()
+        self.integrated_API = patch.object(app, "integrated_API", return_value=RESULT).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_deadline_is_clamped(self):
+        self.client.post("/search", json={"product": "lego", "deadline_ms": 1})
+        self.assertEqual(self.integrated_API.call_args.kwargs["deadline_ms"], app.MIN_DEADLINE_MS)
+
+        self.client.post("/chat-search", json={"message": "lego", "deadline_ms": str(10 ** 9)})
+        self.assertEqual(self.integrated_API.call_args.kwargs["deadline_ms"], app.MAX_DEADLINE_MS)
+
+        self.client.post("/search", json={"product": "lego", "deadline_ms": 5000})
+        self.assertEqual(self.integrated_API.call_args.kwargs["deadline_ms"], 5000)
+
+    def test_server_timing_on_search_routes(self):
+        def search(timer=None, **kwargs):
+            timer.record("ebay_main", 12.5)
+            return RESULT
+        self.integrated_API.side_effect = search
+
+        response = self.client.post("/search", json={"product": "lego"})
+        self.assertIn("ebay_main;dur=12.5", response.headers["Server-Timing"])
+        self.assertIn("total;dur=", response.headers["Server-Timing"])
+        self.assertNotIn("timings", response.get_json())
+
+        # Opt in with ?timings=1 ...
+        response = self.client.post("/search?timings=1", json={"product": "lego"})
+        names = [s["name"] for s in response.get_json()["timings"]]
+        self.assertEqual(names[0], "ebay_main")
+        self.assertEqual(names[-1], "total")
+
+        # ... or "timings": true in the body; chat mode also times the NLP step
+        response = self.client.post("/chat-search", json={"message": "lego", "timings": True})
+        self.assertIn("nlp;dur=", response.headers["Server-Timing"])
+        self.assertEqual([s["name"] for s in response.get_json()["timings"]], ["nlp", "ebay_main", "total"])
+
+    def test_metrics_route(self):
+        self.client.post("/search", json={"product": "lego"})
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        text = response.get_data(as_text=True)
+        # Labelled with the URL rule, not the raw path
+        self.assertIn('santas_http_requests_total{route="/search",status="200"}', text)
+        self.assertIn('santas_http_request_duration_seconds_count{route="/search"}', text)
+        self.assertIn('santas_http_requests_in_flight{route="/metrics"} 1', text)
+        self.assertIn("# TYPE santas_cache_hits_total counter", text)
+
+    def test_bad_deadline_is_a_400(self):
+        for route, body in [("/search", {"product": "lego"}), ("/search/stream", {"product": "lego"}),
+                            ("/chat-search", {"message": "lego"}), ("/chat-search/stream", {"message": "lego"})]:
+            for deadline_ms in ("soon", 1.5, True, [100]):
+                response = self.client.post(route, json=dict(body, deadline_ms=deadline_ms))
+                self.assertEqual(response.status_code, 400, (route, deadline_ms))
+                self.assertIn("deadline_ms", response.get_json()["error"])
+        self.integrated_API.assert_not_called()
+
+
+def _events(response):
+    """(name, data) for each Server-Sent Event in a streamed response"""
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            name, data = block.split("\n")
+            events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class TestStreamRoutes(unittest.TestCase):
+
+    def setUp(self):
+        patch("builtins.print").start()
+        self.client = app.app.test_client()
+        api_process.RESULT_CACHE.clear()
+
+        def ebay(query, **kwargs):
+            # The first similar gift finishes last, its event must still come first
+            time.sleep(0.2 if query == "slow gift" else 0.05)
+            return {"itemSummaries": [{"title": query}]}
+
+        patch.object(api_process, "EBAY_BATCH_SIMILAR", False).start()
+        patch.object(api_process, "get_similar_gift_ideas", return_value=["slow gift", "fast gift"]).start()
+        patch.object(api_process, "search_ebay", side_effect=ebay).start()
+        patch.object(api_process, "ebay_display_results", side_effect=lambda raw: {
+            "found_items_count": 1, "items": [{"title": raw["itemSummaries"][0]["title"]}]}).start()
+        patch.object(api_process, "search_amazon", return_value={"products": []}).start()
+        patch.object(api_process, "filter_product_data", return_value={"amazon_products": []}).start()
+        patch.object(api_process, "compare", side_effect=lambda combined, *args, **kwargs: [
+            {"source": "eBay", "title": combined["ebay"]["items"][0]["title"], "price": 1.0}]).start()
+        patch("builtins.open", new_callable=mock_open).start()
+
+    def tearDown(self):
+        patch.stopall()
+        api_process.RESULT_CACHE.clear()
+
+    def _check_search_events(self, events):
+        self.assertEqual([name for name, _ in events], ["ideas", "main", "similar", "similar", "done"])
+        self.assertEqual(events[0][1], {"similar_gifts": ["slow gift", "fast gift"]})
+        self.assertEqual([p["rank"] for p in events[1][1]["products"]], [1])
+        # Streamed similar products carry the rank they have in the final list
+        self.assertEqual([(e["search_term"], e["product"]["rank"]) for _, e in events[2:4]],
+                         [("slow gift", 4), ("fast gift", 5)])
+        done = events[4][1]
+        self.assertTrue(done["success"])
+        self.assertEqual([(p["title"], p["rank"]) for p in done["products"]],
+                         [("robot", 1), ("slow gift", 4), ("fast gift", 5)])
+
+    def test_search_stream_event_order(self):
+        response = self.client.post("/search/stream", json={"product": "robot"})
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self._check_search_events(_events(response))
+
+    def test_chat_search_stream_event_order(self):
+        extracted = {"query": "robot", "min_price": None, "max_price": None, "metadata": {"keywords": ["robot"]}}
+        with patch.object(app, "_extract", return_value=extracted):
+            events = _events(self.client.post("/chat-search/stream", json={"message": "a robot"}))
+
+        self.assertEqual(events[0], ("extracted", extracted))
+        self._check_search_events(events[1:])
+
+    def test_failed_search_streams_an_error_event(self):
+        with patch.object(app, "integrated_API", side_effect=RuntimeError("vendor exploded")), \
+                patch("traceback.print_exc"):
+            events = _events(self.client.post("/search/stream", json={"product": "robot"}))
+        self.assertEqual(events, [("error", {"success": False, "error": "vendor exploded"})])
+
+
+if __name__ == "__main__":
+    unittest.main()
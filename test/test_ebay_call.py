@@ -7,6 +7,7 @@ import sys
 import os
 import types
 import importlib
+import tempfile
 import time
 from unittest.mock import patch, mock_open, MagicMock
 
@@ -15,14 +16,21 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+import settings
+from settings import reload_config
+
 
 class TestEbayCallModule(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        # Ensure a minimal config.ini exists in project root before importing the module
-        cls.config_path = os.path.join(project_root, "config.ini")
-        with open(cls.config_path, "w", encoding="utf-8") as f:
+        # Read credentials from a throwaway config file, never the repo's config.ini
+        cls.config_dir = tempfile.TemporaryDirectory()
+        config_path = os.path.join(cls.config_dir.name, "config.ini")
+        with open(config_path, "w", encoding="utf-8") as f:
             f.write("[ebay]\nCLIENT_ID = test_id\nCLIENT_SECRET = test_secret\n")
+        cls.config_patch = patch.object(settings, "CONFIG_PATH", config_path)
+        cls.config_patch.start()
+        reload_config()
 
         # Provide a minimal requests shim so `import requests` succeeds if not installed.
         if "requests" not in sys.modules:
@@ -52,17 +60,15 @@ class TestEbayCallModule(unittest.TestCase):
             req_mod.post = _post
             sys.modules["requests"] = req_mod
 
-        # Import the module under test after config and shim are in place
+        # Import the module under test after the shim is in place
         cls.ebay_call = importlib.import_module("EbayAPI.ebay_call")
         importlib.reload(cls.ebay_call)
 
     @classmethod
     def tearDownClass(cls):
-        # Remove the temporary config.ini
-        try:
-            os.remove(cls.config_path)
-        except Exception:
-            pass
+        cls.config_patch.stop()
+        cls.config_dir.cleanup()
+        reload_config()
         # Cleanup imported module state
         if "EbayAPI.ebay_call" in sys.modules:
             del sys.modules["EbayAPI.ebay_call"]
@@ -80,30 +86,74 @@ class TestEbayCallModule(unittest.TestCase):
         self.assertIn("USED", cm)
 
     def test_get_access_token_success(self):
-        # Patch requests.post to return a successful token response
+        # Patch the pooled session's post to return a successful token response
         fake_resp = MagicMock()
         fake_resp.status_code = 200
         fake_resp.json.return_value = {"access_token": "tok123", "expires_in": 3600}
 
-        with patch.object(self.ebay_call, "requests") as mock_requests:
-            mock_requests.post.return_value = fake_resp
+        with patch.object(self.ebay_call, "get_session") as mock_get_session:
+            mock_get_session.return_value.post.return_value = fake_resp
             ok = self.ebay_call.get_access_token()
             self.assertTrue(ok)
             self.assertEqual(self.ebay_call.EBAY_ACCESS_TOKEN, "tok123")
             self.assertGreater(self.ebay_call.TOKEN_EXPIRY_TIME, time.time())
 
     def test_get_access_token_failure(self):
-        # Patch requests.post to simulate failure
+        # Patch the pooled session's post to simulate failure
         fake_resp = MagicMock()
         fake_resp.status_code = 400
         fake_resp.text = "bad request"
 
-        with patch.object(self.ebay_call, "requests") as mock_requests:
-            mock_requests.post.return_value = fake_resp
+        with patch.object(self.ebay_call, "get_session") as mock_get_session:
+            mock_get_session.return_value.post.return_value = fake_resp
             ok = self.ebay_call.get_access_token()
             self.assertFalse(ok)
             self.assertIsNone(self.ebay_call.EBAY_ACCESS_TOKEN)
 
+    def test_get_access_token_refreshes_in_background_near_expiry(self):
+        # Token still valid but inside the refresh margin: use it and refresh without waiting
+        self.ebay_call.EBAY_ACCESS_TOKEN = "old"
+        self.ebay_call.TOKEN_EXPIRY_TIME = time.time() + self.ebay_call.TOKEN_REFRESH_MARGIN - 10
+
+        with patch.object(self.ebay_call.TOKEN_MANAGER, "refresh_async") as mock_async, \
+                patch.object(self.ebay_call.TOKEN_MANAGER, "refresh_now") as mock_now:
+            self.assertTrue(self.ebay_call.get_access_token())
+            mock_async.assert_called_once()
+            mock_now.assert_not_called()
+        self.assertEqual(self.ebay_call.EBAY_ACCESS_TOKEN, "old")
+
+    def test_margin_past_the_lifetime_keeps_fresh_tokens(self):
+        # TOKEN_REFRESH_MARGIN >= the token lifetime must not refresh on every request
+        self.ebay_call.EBAY_ACCESS_TOKEN = "fresh"
+        self.ebay_call.TOKEN_EXPIRY_TIME = time.time() + 7200
+
+        with patch.object(self.ebay_call.TOKEN_MANAGER, "refresh_margin", 7200), \
+                patch.object(self.ebay_call.TOKEN_MANAGER, "refresh_async") as mock_async, \
+                patch.object(self.ebay_call.TOKEN_MANAGER, "refresh_now") as mock_now:
+            self.assertTrue(self.ebay_call.get_access_token())
+            mock_async.assert_not_called()
+            mock_now.assert_not_called()
+
+    def test_fetch_token_uses_shared_store(self):
+        store = MagicMock()
+        # Another worker already refreshed: no request to TOKEN_URL
+        store.read.return_value = ("shared", time.time() + 7200)
+        with patch.object(self.ebay_call, "TOKEN_STORE", store), \
+                patch.object(self.ebay_call, "_request_token") as mock_request:
+            token, expires_in = self.ebay_call._fetch_token()
+            mock_request.assert_not_called()
+        self.assertEqual(token, "shared")
+        self.assertGreater(expires_in, 7000)
+
+        # Stale shared token: refresh under the lock and publish it for the other workers
+        store.read.return_value = ("stale", time.time() + 30)
+        with patch.object(self.ebay_call, "TOKEN_STORE", store), \
+                patch.object(self.ebay_call, "_request_token", return_value=("new", 7200)) as mock_request:
+            self.assertEqual(self.ebay_call._fetch_token(), ("new", 7200))
+            mock_request.assert_called_once()
+        store.lock.assert_called_once()
+        self.assertEqual(store.write.call_args[0][0], "new")
+
     def test_search_ebay_basic_and_filters(self):
         # Ensure a token is present (bypass get_access_token)
         self.ebay_call.EBAY_ACCESS_TOKEN = "tok"
@@ -115,13 +165,16 @@ class TestEbayCallModule(unittest.TestCase):
         fake_resp.json.return_value = sample_api_result
         fake_resp.raise_for_status = lambda: None
 
-        with patch.object(self.ebay_call, "requests") as mock_requests:
-            mock_requests.get.return_value = fake_resp
+        with patch.object(self.ebay_call, "get_session") as mock_get_session:
+            mock_get_session.return_value.get.return_value = fake_resp
             res = self.ebay_call.search_ebay("widget", price_range="5..20", condition_filter="NEW|3000", delivery_country="US", delivery_postal_code="90210", guaranteed_delivery_days=2, max_delivery_cost=0, sort_by="price")
             self.assertEqual(res, sample_api_result)
-            mock_requests.get.assert_called_once()
+            mock_get_session.return_value.get.assert_called_once()
+            mock_get_session.assert_called_with("ebay")
+            # pooled session calls always carry a (connect, read) timeout
+            self.assertIsInstance(mock_get_session.return_value.get.call_args.kwargs.get("timeout"), tuple)
             # verify filter param contains price and deliveryCountry
-            called_params = mock_requests.get.call_args.kwargs.get("params", {})
+            called_params = mock_get_session.return_value.get.call_args.kwargs.get("params", {})
             self.assertIn("filter", called_params)
             self.assertIn("price:[5..20]", called_params["filter"])
             self.assertIn("deliveryCountry:US", called_params["filter"])
@@ -131,14 +184,14 @@ class TestEbayCallModule(unittest.TestCase):
         self.ebay_call.EBAY_ACCESS_TOKEN = "tok"
         self.ebay_call.TOKEN_EXPIRY_TIME = time.time() + 3600
 
-        # Patch requests.get to avoid network
+        # Patch the pooled session's get to avoid network
         fake_resp = MagicMock()
         fake_resp.status_code = 200
         fake_resp.json.return_value = {"itemSummaries": []}
         fake_resp.raise_for_status = lambda: None
 
-        with patch.object(self.ebay_call, "requests") as mock_requests, patch("builtins.print") as mock_print:
-            mock_requests.get.return_value = fake_resp
+        with patch.object(self.ebay_call, "get_session") as mock_get_session, patch("builtins.print") as mock_print:
+            mock_get_session.return_value.get.return_value = fake_resp
             # Call with guaranteed_delivery_days but no delivery location
             _ = self.ebay_call.search_ebay("widget", guaranteed_delivery_days=3)
             # search_ebay should print a warning about needing deliveryCountry and deliveryPostalCode
@@ -182,6 +235,26 @@ class TestEbayCallModule(unittest.TestCase):
         self.assertIn("img2", item["images"])
         self.assertEqual(item["price"], "USD 9.99")
 
+    def test_or_query_and_partition(self):
+        query = self.ebay_call.build_or_query(["lego set", "toy robot, large", "(kite)"])
+        self.assertEqual(query, "(lego set, toy robot large, kite)")
+
+        items = [
+            {"title": "Large Toy Robots"},
+            {"title": "LEGO City set 60200"},
+            {"title": "Lego robot"},  # only half of each term: dropped
+            {"title": "Wooden train set"},
+            {"title": "Garden hose"},
+            {"title": "LEGO set with toy robot"},  # covers both: the earlier term wins
+        ]
+        parts = self.ebay_call.partition_items(items, ["lego set", "toy robot"])
+        self.assertEqual([i["title"] for i in parts["lego set"]], ["LEGO City set 60200", "LEGO set with toy robot"])
+        self.assertEqual([i["title"] for i in parts["toy robot"]], ["Large Toy Robots"])
+        # The term with more words wins when both cover the title
+        parts = self.ebay_call.partition_items([{"title": "LEGO set 60200"}], ["lego", "lego set"])
+        self.assertEqual(parts, {"lego": [], "lego set": [{"title": "LEGO set 60200"}]})
+        self.assertEqual(self.ebay_call.partition_items(None, ["kite"]), {"kite": []})
+
     def test_run_search_success_and_writes_file(self):
         # Set token state
         self.ebay_call.EBAY_ACCESS_TOKEN = "tok"
@@ -194,8 +267,8 @@ class TestEbayCallModule(unittest.TestCase):
         fake_resp.raise_for_status = lambda: None
 
         m_open = mock_open()
-        with patch.object(self.ebay_call, "requests") as mock_requests, patch("builtins.open", m_open):
-            mock_requests.get.return_value = fake_resp
+        with patch.object(self.ebay_call, "get_session") as mock_get_session, patch("builtins.open", m_open):
+            mock_get_session.return_value.get.return_value = fake_resp
             out_json = self.ebay_call.run_search("widget", min_price=5, max_price=20, condition="NEW", output_file="out.json")
             # Ensure file was opened for writing
             m_open.assert_called_once_with("out.json", "w", encoding="utf-8")
@@ -203,6 +276,13 @@ class TestEbayCallModule(unittest.TestCase):
             # Expect formatted display JSON with found_items_count
             self.assertIn("found_items_count", parsed)
 
+    def test_missing_credentials_fail_the_token_request(self):
+        # Nothing is read at import; a config without credentials only fails the token request
+        with patch.object(self.ebay_call, "get_setting", return_value=None), \
+                patch.object(self.ebay_call, "get_session") as mock_get_session, patch("builtins.print"):
+            self.assertIsNone(self.ebay_call._request_token())
+            mock_get_session.assert_not_called()
+
     def test_run_search_token_failure(self):
         # Simulate get_access_token failing by patching the function used by run_search
         with patch.object(self.ebay_call, "get_access_token", return_value=False):
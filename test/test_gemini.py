@@ -0,0 +1,154 @@
+import unittest
+import os
+import sys
+import types
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Mock google.generativeai before importing the Gemini module
+if "google.generativeai" not in sys.modules:
+    google_mock = types.ModuleType("google")
+    genai_mock = types.ModuleType("google.generativeai")
+    google_mock.generativeai = genai_mock
+    sys.modules["google"] = google_mock
+    sys.modules["google.generativeai"] = genai_mock
+
+from Caching.result_cache import TTLCache
+from Gemini import gemini
+from Gemini.idea_store import GiftIdeaStore
+
+
+class TestGiftIdeaMemo(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.tmp_dir.name, "ideas.sqlite3")
+        self.patches = [
+            patch.object(gemini, "IDEA_CACHE", TTLCache(max_entries=16, ttl_seconds=60)),
+            patch.object(gemini, "IDEA_STORE", GiftIdeaStore(db_path, ttl_seconds=60)),
+            patch.object(gemini, "IDEA_CACHE_ENABLED", True),
+            patch.object(gemini, "IDEA_POOL_SIZE", 4),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_normalize_gift_name(self):
+        self.assertEqual(gemini.normalize_gift_name("  Power   Rangers! "), "power rangers")
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["a", "b", "c", "d"])
+    def test_llm_called_once_per_key(self, mock_generate):
+        first = gemini.get_similar_gift_ideas("Power Rangers", num_ideas=2)
+        second = gemini.get_similar_gift_ideas("power rangers", num_ideas=2)
+
+        mock_generate.assert_called_once_with("Power Rangers", 4, None)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 2)
+        self.assertTrue(set(first) <= {"a", "b", "c", "d"})
+        self.assertTrue(set(second) <= {"a", "b", "c", "d"})
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["a", "b", "c", "d"])
+    def test_disk_store_survives_memory_loss(self, mock_generate):
+        gemini.get_similar_gift_ideas("lego", num_ideas=2)
+        gemini.IDEA_CACHE.clear()  # e.g. a process restart
+
+        ideas = gemini.get_similar_gift_ideas("lego", num_ideas=2)
+        self.assertEqual(mock_generate.call_count, 1)
+        self.assertEqual(len(ideas), 2)
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["(no ideas found)"])
+    def test_failed_generation_not_cached(self, mock_generate):
+        gemini.get_similar_gift_ideas("???", num_ideas=2)
+        gemini.get_similar_gift_ideas("???", num_ideas=2)
+        self.assertEqual(mock_generate.call_count, 2)
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["x", "y"])
+    def test_use_cache_false_bypasses_memo(self, mock_generate):
+        gemini.get_similar_gift_ideas("kite", num_ideas=2, use_cache=False)
+        gemini.get_similar_gift_ideas("kite", num_ideas=2, use_cache=False)
+        self.assertEqual(mock_generate.call_count, 2)
+        mock_generate.assert_called_with("kite", 2, None)
+
+    def test_store_ttl(self):
+        store = gemini.IDEA_STORE
+        store.set("old", ["x"])
+        with patch("Gemini.idea_store.time.time", return_value=10 ** 12):
+            self.assertIsNone(store.get("old"))
+        ideas, created_at = store.get("old")
+        self.assertEqual(ideas, ["x"])
+        self.assertAlmostEqual(created_at, time.time(), delta=5)
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["a", "b", "c", "d"])
+    def test_memory_copy_keeps_the_stored_expiry(self, mock_generate):
+        # A row written 50s ago (TTL 60) lives 10 more seconds in memory, not another 60
+        with patch("Gemini.idea_store.time.time", return_value=time.time() - 50):
+            gemini.IDEA_STORE.set("lego|2", ["a", "b", "c", "d"])
+
+        with patch.object(gemini.IDEA_CACHE, "set", wraps=gemini.IDEA_CACHE.set) as cache_set:
+            gemini.get_similar_gift_ideas("lego", num_ideas=2)
+        mock_generate.assert_not_called()
+        (key, pool), kwargs = cache_set.call_args
+        self.assertEqual((key, pool), ("lego|2", ["a", "b", "c", "d"]))
+        self.assertAlmostEqual(kwargs["ttl_seconds"], 10, delta=2)
+
+    @patch("Gemini.gemini._generate_ideas", return_value=["a", "b", "c", "d"])
+    def test_row_with_no_ttl_left_is_not_kept_in_memory(self, mock_generate):
+        # Read just inside the TTL (60s), but none of it is left by the time it would be copied
+        stored = (["a", "b", "c", "d"], 1000.0)
+        with patch.object(gemini.IDEA_STORE, "get", return_value=stored), \
+                patch("Gemini.gemini.time.time", return_value=1060.0):
+            self.assertEqual(len(gemini.get_similar_gift_ideas("lego", num_ideas=2)), 2)
+        mock_generate.assert_not_called()
+        self.assertIsNone(gemini.IDEA_CACHE.get("lego|2"))
+
+
+class TestGeminiClient(unittest.TestCase):
+
+    def test_setup_happens_once_across_threads(self):
+        fake_genai = MagicMock()
+        fake_genai.GenerativeModel.return_value.generate_content.return_value.text = "yo-yo, kite"
+
+        with patch.object(gemini, "genai", fake_genai):
+            client = gemini.GeminiClient(api_key="key")
+            threads = [threading.Thread(target=client.generate, args=("prompt",)) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            self.assertEqual(client.generate("prompt"), "yo-yo, kite")
+            fake_genai.configure.assert_called_once_with(api_key="key")
+            fake_genai.GenerativeModel.assert_called_once_with("gemini-2.0-flash")
+            # One GenerationConfig per token limit, reused across calls
+            self.assertEqual(fake_genai.GenerationConfig.call_count, 1)
+
+    def test_generate_ideas_uses_shared_client(self):
+        fake_client = MagicMock()
+        fake_client.generate.return_value = "**Answer:** Yo-yo, Kite\n- Slinky"
+
+        with patch.object(gemini, "get_client", return_value=fake_client):
+            ideas = gemini._generate_ideas("top", 3)
+
+        self.assertEqual(ideas, ["Yo-yo", "Kite", "Slinky"])
+        fake_client.generate.assert_called_once()
+
+    def test_warm_up_reports_failure(self):
+        broken = MagicMock()
+        broken.warm_up.side_effect = KeyError("GEMINI_API_KEY")
+        with patch.object(gemini, "get_client", return_value=broken), patch("builtins.print"):
+            self.assertFalse(gemini.warm_up())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Transport import http_session
+
+
+class TestHttpSession(unittest.TestCase):
+
+    def tearDown(self):
+        http_session.close_sessions()
+
+    def test_one_session_per_vendor(self):
+        ebay = http_session.get_session("ebay")
+        self.assertIs(http_session.get_session("ebay"), ebay)
+        self.assertIsNot(http_session.get_session("amazon"), ebay)
+
+    def test_pool_size_from_settings(self):
+        def fake_int_setting(section, option, fallback):
+            return {"ebay_pool_maxsize": 32}.get(option, fallback)
+
+        with patch.object(http_session, "get_int_setting", side_effect=fake_int_setting):
+            session = http_session.get_session("ebay")
+
+        adapter = session.get_adapter("https://api.ebay.com")
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertEqual(adapter._pool_connections, http_session.DEFAULT_POOL_CONNECTIONS)
+        self.assertEqual(adapter.max_retries.total, 0)
+
+    def test_vendor_timeout_overrides_default(self):
+        def fake_float_setting(section, option, fallback):
+            return {"read_timeout": 12.0, "amazon_read_timeout": 20.0}.get(option, fallback)
+
+        with patch.object(http_session, "get_float_setting", side_effect=fake_float_setting):
+            self.assertEqual(http_session.get_timeout("amazon"), (http_session.DEFAULT_CONNECT_TIMEOUT, 20.0))
+            self.assertEqual(http_session.get_timeout("ebay"), (http_session.DEFAULT_CONNECT_TIMEOUT, 12.0))
+
+    def test_deadline_caps_timeout(self):
+        with patch.object(http_session.time, "monotonic", return_value=100.0):
+            self.assertEqual(http_session.get_timeout("ebay", deadline=101.5), (1.5, 1.5))
+            # A spent budget still gives requests a (tiny) positive timeout
+            self.assertEqual(http_session.get_timeout("ebay", deadline=99.0),
+                             (http_session.MIN_TIMEOUT, http_session.MIN_TIMEOUT))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Caching.result_cache import TTLCache
+from Monitoring import metrics
+from Monitoring.metrics import Registry, error_kind, observe_vendor
+
+
+class ReadTimeout(Exception):
+    """Stands in for requests.exceptions.ReadTimeout"""
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_counter_and_gauge_render(self):
+        registry = Registry()
+        requests_total = registry.counter("app_requests_total", "Requests", ("route", "status"))
+        in_flight = registry.gauge("app_in_flight", "In flight", ("route",))
+
+        requests_total.inc(route="/search", status=200)
+        requests_total.inc(route="/search", status=200)
+        in_flight.inc(route="/search")
+        in_flight.dec(route="/search")
+
+        text = registry.render()
+        self.assertIn("# TYPE app_requests_total counter", text)
+        self.assertIn('app_requests_total{route="/search",status="200"} 2', text)
+        self.assertIn('app_in_flight{route="/search"} 0', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram("app_latency_seconds", "Latency", ("vendor",), buckets=(0.1, 1.0))
+
+        latency.observe(0.05, vendor="ebay")
+        latency.observe(0.5, vendor="ebay")
+        latency.observe(5.0, vendor="ebay")
+
+        text = registry.render()
+        self.assertIn('app_latency_seconds_bucket{vendor="ebay",le="0.1"} 1', text)
+        self.assertIn('app_latency_seconds_bucket{vendor="ebay",le="1.0"} 2', text)
+        self.assertIn('app_latency_seconds_bucket{vendor="ebay",le="+Inf"} 3', text)
+        self.assertIn('app_latency_seconds_count{vendor="ebay"} 3', text)
+        self.assertEqual(latency.count(vendor="ebay"), 3)
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        counter = registry.counter("app_total", "Total", ("route",))
+        counter.inc(route='a"b')
+        self.assertIn('app_total{route="a\\"b"} 1', registry.render())
+
+    def test_missing_label_raises(self):
+        registry = Registry()
+        counter = registry.counter("app_total", "Total", ("route",))
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_broken_collector_does_not_break_scrape(self):
+        registry = Registry()
+        registry.counter("app_total", "Total")
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.add_collector(broken)
+        self.assertIn("# TYPE app_total counter", registry.render())
+
+
+class TestVendorMetrics(unittest.TestCase):
+
+    def test_error_kind(self):
+        self.assertEqual(error_kind(TimeoutError()), "timeout")
+        self.assertEqual(error_kind(ReadTimeout()), "timeout")
+        self.assertEqual(error_kind(ValueError()), "error")
+
+    def test_observe_vendor_counts_latency_and_failures(self):
+        latency_before = metrics.VENDOR_LATENCY.count(vendor="test_vendor")
+        errors_before = metrics.VENDOR_ERRORS.value(vendor="test_vendor", kind="error")
+        timeouts_before = metrics.VENDOR_ERRORS.value(vendor="test_vendor", kind="timeout")
+
+        with observe_vendor("test_vendor"):
+            pass
+        with self.assertRaises(ValueError):
+            with observe_vendor("test_vendor"):
+                raise ValueError("500 Server Error")
+        with self.assertRaises(ReadTimeout):
+            with observe_vendor("test_vendor"):
+                raise ReadTimeout()
+
+        self.assertEqual(metrics.VENDOR_LATENCY.count(vendor="test_vendor"), latency_before + 3)
+        self.assertEqual(metrics.VENDOR_ERRORS.value(vendor="test_vendor", kind="error"), errors_before + 1)
+        self.assertEqual(metrics.VENDOR_ERRORS.value(vendor="test_vendor", kind="timeout"), timeouts_before + 1)
+
+    def test_registered_cache_exports_hit_ratio(self):
+        cache = TTLCache(max_entries=10, ttl_seconds=60)
+        metrics.register_cache("test_cache", cache)
+        cache.set("lego", {"products": []})
+        cache.get("lego")
+        cache.get("airpods")
+
+        text = metrics.REGISTRY.render()
+        self.assertIn("# TYPE santas_cache_hits_total counter", text)
+        self.assertIn('santas_cache_hits_total{cache="test_cache"} 1', text)
+        self.assertIn('santas_cache_misses_total{cache="test_cache"} 1', text)
+        self.assertIn('santas_cache_hit_ratio{cache="test_cache"} 0.5', text)
+        self.assertIn('santas_cache_entries{cache="test_cache"} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
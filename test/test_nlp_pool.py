@@ -0,0 +1,101 @@
+import unittest
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from NLP import nlp_pool
+from NLP.nlp_pool import NLPPool, pool_from_config
+from NLP.simple_nlp import SimpleNLPExtractor
+
+QUERY = "toy for 5 year old nephew under $20"
+
+
+def _import_app_in_worker():
+    """Runs in a spawned process: import app the way a pool worker re-imports the main module."""
+    with patch("EbayAPI.ebay_call.warm_up_token") as warm_up_token, patch("builtins.print"):
+        import app
+        return warm_up_token.called, app.nlp_extractor is None, app.nlp_pool is None
+
+
+def _regex_extract(query):
+    extractor = SimpleNLPExtractor(cache_size=0)
+    extractor.use_spacy = False
+    return extractor.extract(query)
+
+
+class TestNLPPool(unittest.TestCase):
+
+    def setUp(self):
+        patch("builtins.print").start()
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        patch.stopall()
+
+    def _blocking_pool(self, **kwargs):
+        """A pool whose 'workers' are threads that hold every query until self.release is set."""
+        def slow_extract(query):
+            self.started.set()
+            self.release.wait(5)
+            return dict(_regex_extract(query), query="from the pool")
+
+        patch.object(nlp_pool, "_extract_in_worker", side_effect=slow_extract).start()
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        return NLPPool(1, extractor=SimpleNLPExtractor(cache_size=8), executor=executor, **kwargs)
+
+    def test_saturated_pool_falls_back_to_regex(self):
+        pool = self._blocking_pool(timeout=5, max_pending=1)
+        results = {}
+        waiting = threading.Thread(target=lambda: results.update(first=pool.extract("lego set")))
+        waiting.start()
+        self.assertTrue(self.started.wait(5))
+
+        # The only slot is taken, so this one doesn't queue behind it
+        self.assertEqual(pool.extract(QUERY), _regex_extract(QUERY))
+
+        self.release.set()
+        waiting.join(5)
+        self.assertEqual(results["first"]["query"], "from the pool")
+        self.assertEqual(pool.extract("LEGO set!")["query"], "from the pool")
+        self.assertEqual(pool.stats(), {"pool": 1, "cached": 1, "saturated": 1, "timeout": 0, "error": 0})
+
+    def test_slow_worker_times_out_to_regex(self):
+        pool = self._blocking_pool(timeout=0.05)
+
+        self.assertEqual(pool.extract(QUERY), _regex_extract(QUERY))
+        self.assertEqual(pool.stats()["timeout"], 1)
+        # Fallbacks aren't cached, so the next ask goes back to the pool
+        self.assertIsNone(pool.extractor.cached_result(QUERY))
+
+    def test_worker_processes_extract(self):
+        pool = NLPPool(1, timeout=60)
+        self.addCleanup(pool.shutdown)
+
+        self.assertTrue(pool.warm_up(timeout=60))
+        # No spaCy model in the test environment, so the worker's answer is the regex one
+        self.assertEqual(pool.extract(QUERY), _regex_extract(QUERY))
+        self.assertEqual(pool.stats()["pool"], 1)
+
+    def test_spawned_worker_skips_app_setup(self):
+        # A worker must not fetch its own eBay token (and keep refreshing it) or start a pool
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            self.assertEqual(executor.submit(_import_app_in_worker).result(timeout=120), (False, True, True))
+
+    def test_pool_is_off_by_default(self):
+        with patch.object(nlp_pool, "get_int_setting", side_effect=lambda s, o, fallback: fallback):
+            self.assertIsNone(pool_from_config())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Transport import rate_limit
+from Transport.rate_limit import (
+    PRIORITY_LOW, PRIORITY_MAIN, QuotaCounter, RateLimitedError, RateLimiter, TokenBucket
+)
+
+
+class FakeClock:
+    """time.monotonic / time.sleep stand-ins; sleeping just moves the clock forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patch.object(rate_limit.time, "monotonic", self.clock.monotonic).start()
+        patch.object(rate_limit.time, "sleep", self.clock.sleep).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2, burst=2)
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())  # empty and not allowed to wait
+
+        self.clock.now += 0.5  # one token back at 2/s
+        self.assertTrue(bucket.take())
+
+    def test_queues_briefly(self):
+        bucket = TokenBucket(rate=4, burst=1)
+        bucket.take()
+
+        self.assertTrue(bucket.take(max_wait=0.5))
+        self.assertEqual(self.clock.slept, [0.25])
+        # Waiters queue behind each other: the next one needs another 0.25s
+        self.assertFalse(bucket.take(max_wait=0.2))
+
+    def test_low_priority_is_shed_first(self):
+        limiter = RateLimiter("amazon", rate=1, burst=4, max_wait=0, low_priority_reserve=0.5)
+        limiter.acquire(PRIORITY_LOW)
+        limiter.acquire(PRIORITY_LOW)
+        # Two tokens left, both reserved for main searches
+        with self.assertRaises(RateLimitedError):
+            limiter.acquire(PRIORITY_LOW)
+        limiter.acquire(PRIORITY_MAIN)
+        limiter.acquire(PRIORITY_MAIN)
+
+    def test_quota_refusal_keeps_the_token(self):
+        limiter = RateLimiter("gemini", rate=1, burst=4, quota=2)
+        limiter.acquire()
+        limiter.acquire()
+        # Refused by the quota, so the bucket still has the two tokens the calls didn't use
+        for _ in range(2):
+            with self.assertRaises(RateLimitedError):
+                limiter.acquire()
+        self.assertEqual(limiter.bucket.available(), 2)
+
+    def test_unlimited_by_default(self):
+        limiter = RateLimiter("ebay")
+        for _ in range(100):
+            limiter.acquire()
+        self.assertIsNone(limiter.bucket)
+
+
+class TestQuota(unittest.TestCase):
+
+    def test_quota_exhausts_and_resets_next_period(self):
+        quota = QuotaCounter(2, "day")
+        with patch.object(rate_limit.time, "gmtime", return_value=(2025, 12, 1, 0, 0, 0, 0, 335, 0)):
+            self.assertTrue(quota.use())
+            self.assertTrue(quota.use())
+            self.assertFalse(quota.use())
+            self.assertEqual(quota.remaining(), 0)
+        with patch.object(rate_limit.time, "gmtime", return_value=(2025, 12, 2, 0, 0, 0, 1, 336, 0)):
+            self.assertEqual(quota.remaining(), 2)
+            self.assertTrue(quota.use())
+
+    def test_low_priority_keeps_quota_for_main(self):
+        limiter = RateLimiter("gemini", quota=4, low_priority_reserve=0.5)
+        limiter.acquire(PRIORITY_LOW)
+        limiter.acquire(PRIORITY_LOW)
+        with self.assertRaises(RateLimitedError):
+            limiter.acquire(PRIORITY_LOW)
+        limiter.acquire(PRIORITY_MAIN)
+        self.assertEqual(limiter.quota.remaining(), 1)
+
+
+class TestLimiterSettings(unittest.TestCase):
+
+    def tearDown(self):
+        rate_limit.reset()
+
+    def test_limiter_from_settings(self):
+        settings = {"amazon_rate": 5.0, "amazon_burst": 10.0, "amazon_quota": 1000, "max_wait_ms": 250}
+
+        def fake_setting(section, option, fallback):
+            self.assertEqual(section, "ratelimit")
+            return settings.get(option, fallback)
+
+        rate_limit.reset()
+        with patch.object(rate_limit, "get_float_setting", side_effect=fake_setting), \
+                patch.object(rate_limit, "get_int_setting", side_effect=fake_setting), \
+                patch.object(rate_limit, "get_setting", side_effect=fake_setting):
+            limiter = rate_limit.get_limiter("amazon")
+
+        self.assertIs(rate_limit.get_limiter("amazon"), limiter)
+        self.assertEqual((limiter.bucket.rate, limiter.bucket.burst), (5.0, 10.0))
+        self.assertEqual(limiter.quota.quota, 1000)
+        self.assertEqual(limiter.max_wait, 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
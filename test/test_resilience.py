@@ -0,0 +1,177 @@
+import unittest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Transport import resilience
+from Transport.rate_limit import PRIORITY_LOW, RateLimitedError, RateLimiter
+from Transport.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, call_with_retries
+
+
+class ReadTimeout(Exception):
+    """Stands in for requests.exceptions.ReadTimeout"""
+
+
+def _response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker("ebay", failure_threshold=2, reset_seconds=30)
+        breaker.record_failure()
+        breaker.before_call()  # still closed
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, resilience.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker("amazon", failure_threshold=1, reset_seconds=30)
+        with patch.object(resilience.time, "monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch.object(resilience.time, "monotonic", return_value=131.0):
+            self.assertEqual(breaker.state, resilience.HALF_OPEN)
+            breaker.before_call()  # the probe
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()  # everyone else still fails fast
+            breaker.record_success()
+        self.assertEqual(breaker.state, resilience.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("gemini", failure_threshold=3, reset_seconds=30)
+        with patch.object(resilience.time, "monotonic", return_value=100.0):
+            for _ in range(3):
+                breaker.record_failure()
+        with patch.object(resilience.time, "monotonic", return_value=131.0):
+            breaker.before_call()
+            breaker.record_failure()
+            self.assertEqual(breaker.state, resilience.OPEN)
+
+
+class TestRetryBudget(unittest.TestCase):
+
+    def test_retries_are_a_fraction_of_calls(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+
+class TestCallWithRetries(unittest.TestCase):
+
+    def setUp(self):
+        resilience.reset()
+        self.sleep = patch.object(resilience.time, "sleep").start()
+        patch("builtins.print").start()
+        # Unlimited unless a test says otherwise
+        self.limiter = RateLimiter("test")
+        patch.object(resilience, "get_limiter", return_value=self.limiter).start()
+
+    def tearDown(self):
+        patch.stopall()
+        resilience.reset()
+
+    def test_retries_5xx_then_succeeds(self):
+        send = MagicMock(side_effect=[_response(503), _response(200)])
+
+        response = call_with_retries("ebay", send)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(send.call_count, 2)
+        # Each attempt gets the vendor's (connect, read) timeout
+        self.assertIsInstance(send.call_args.args[0], tuple)
+
+    def test_429_honours_retry_after(self):
+        send = MagicMock(side_effect=[_response(429, {"Retry-After": "2"}), _response(200)])
+
+        call_with_retries("amazon", send)
+
+        self.sleep.assert_called_once_with(2.0)
+
+    def test_retry_after_too_long_gives_up(self):
+        send = MagicMock(return_value=_response(429, {"Retry-After": "120"}))
+
+        response = call_with_retries("amazon", send)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(send.call_count, 1)
+
+    def test_timeouts_are_retried_then_reraised(self):
+        send = MagicMock(side_effect=ReadTimeout("read timed out"))
+
+        with self.assertRaises(ReadTimeout):
+            call_with_retries("gemini", send)
+        self.assertEqual(send.call_count, 1 + resilience.DEFAULT_MAX_RETRIES)
+
+    def test_client_errors_are_not_retried(self):
+        send = MagicMock(side_effect=ValueError("bad params"))
+        with self.assertRaises(ValueError):
+            call_with_retries("ebay", send)
+        self.assertEqual(send.call_count, 1)
+
+        send = MagicMock(return_value=_response(404))
+        self.assertEqual(call_with_retries("ebay", send).status_code, 404)
+        self.assertEqual(send.call_count, 1)
+
+    def test_no_retry_past_the_deadline(self):
+        send = MagicMock(return_value=_response(503))
+        with patch.object(resilience.time, "monotonic", return_value=100.0):
+            call_with_retries("ebay", send, deadline=100.0001)
+        self.assertEqual(send.call_count, 1)
+
+    def test_repeated_failures_open_the_circuit(self):
+        send = MagicMock(return_value=_response(500))
+        for _ in range(resilience.DEFAULT_BREAKER_FAILURES):
+            call_with_retries("amazon", send)
+        calls = send.call_count
+
+        with self.assertRaises(CircuitOpenError):
+            call_with_retries("amazon", send)
+        self.assertEqual(send.call_count, calls)
+
+    def test_deadline_timeouts_leave_the_circuit_closed(self):
+        # Budgets smaller than the vendor timeout: the caller ran out of time, the vendor is fine
+        send = MagicMock(side_effect=ReadTimeout("read timed out"))
+        for _ in range(2 * resilience.DEFAULT_BREAKER_FAILURES):
+            with self.assertRaises(ReadTimeout):
+                call_with_retries("ebay", send, deadline=resilience.time.monotonic() + 0.001)
+        self.assertEqual(resilience.get_breaker("ebay").state, resilience.CLOSED)
+
+        # Timeouts at the vendor's own configured timeout still count
+        for _ in range(resilience.DEFAULT_BREAKER_FAILURES):
+            with self.assertRaises(ReadTimeout):
+                call_with_retries("ebay", send)
+        self.assertEqual(resilience.get_breaker("ebay").state, resilience.OPEN)
+
+    def test_rate_limited_call_is_shed_before_sending(self):
+        self.limiter.quota.quota = 2
+        send = MagicMock(return_value=_response(200))
+
+        call_with_retries("amazon", send, priority=PRIORITY_LOW)
+        with self.assertRaises(RateLimitedError):
+            call_with_retries("amazon", send, priority=PRIORITY_LOW)
+        self.assertEqual(send.call_count, 1)
+        # Shedding says nothing about the vendor's health
+        self.assertEqual(resilience.get_breaker("amazon").state, resilience.CLOSED)
+
+    def test_retry_after_http_date(self):
+        response = _response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        self.assertEqual(resilience.retry_after_seconds(response), 0.0)
+        self.assertIsNone(resilience.retry_after_seconds(_response(429)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Caching.result_cache import TTLCache, estimate_size
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(max_entries=4, ttl_seconds=60)
+        self.assertIsNone(cache.get("lego"))
+        cache.set("lego", {"products": [1, 2, 3]})
+        self.assertEqual(cache.get("lego"), {"products": [1, 2, 3]})
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(max_entries=4, ttl_seconds=10)
+        with patch("Caching.result_cache.time.monotonic", return_value=100.0):
+            cache.set("airpods", "cached")
+        with patch("Caching.result_cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("airpods"), "cached")
+        with patch("Caching.result_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("airpods"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction_by_entries(self):
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget(self):
+        cache = TTLCache(max_entries=100, ttl_seconds=60, max_bytes=25)
+        cache.set("a", "x" * 10)  # 12 bytes as JSON
+        cache.set("b", "y" * 10)
+        cache.set("c", "z" * 10)  # pushes out "a"
+
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 25)
+
+        # Values bigger than the whole budget are refused
+        self.assertFalse(cache.set("huge", "x" * 100))
+        self.assertIsNone(cache.get("huge"))
+
+    def test_estimate_size(self):
+        self.assertEqual(estimate_size("abc"), 5)
+        self.assertGreater(estimate_size({"products": [{"title": "Lego"}]}), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+import os
+import re
+import sys
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from NLP import simple_nlp
+from NLP.simple_nlp import SimpleNLPExtractor
+
+
+class FakeToken:
+    def __init__(self, text, pos, is_stop=False):
+        self.text = text
+        self.pos_ = pos
+        self.lemma_ = text.lower()
+        self.is_stop = is_stop
+
+
+class FakeSpan:
+    def __init__(self, text, label="", start_char=0):
+        self.text = text
+        self.label_ = label
+        self.start_char = start_char
+        self.end_char = start_char + len(text)
+
+
+class FakeDoc:
+    """Just the parts of a spaCy Doc that SimpleNLPExtractor reads."""
+
+    def __init__(self, tokens, ents=(), noun_chunks=(), parsed=True):
+        self._tokens = tokens
+        self.ents = list(ents)
+        self._noun_chunks = list(noun_chunks)
+        self._parsed = parsed
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+    def has_annotation(self, attr):
+        return self._parsed
+
+    @property
+    def noun_chunks(self):
+        if not self._parsed:
+            raise ValueError("[E029] noun_chunks requires the dependency parse")
+        return iter(self._noun_chunks)
+
+
+class FakeNLP:
+    """Stands in for the en_core_web_sm pipeline; counts how often it parses."""
+
+    def __init__(self, parsed=True):
+        self.calls = []
+        self.parsed = parsed
+        self.pipe_args = None
+
+    def pipe(self, texts, as_tuples=False, batch_size=None, n_process=1):
+        self.pipe_args = (as_tuples, batch_size, n_process)
+        for text, context in texts:
+            yield self(text), context
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return FakeDoc(
+            [FakeToken("lego", "PROPN"), FakeToken("star", "PROPN"), FakeToken("wars", "PROPN"),
+             FakeToken("set", "NOUN"), FakeToken("nephew", "NOUN")],
+            ents=[FakeSpan("10", "CARDINAL", text.find("10"))],
+            noun_chunks=[FakeSpan("a lego star wars set")],
+            parsed=self.parsed,
+        )
+
+
+class TestSimpleNLPExtractor(unittest.TestCase):
+
+    def setUp(self):
+        patch("builtins.print").start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_regex_fallback(self):
+        extractor = SimpleNLPExtractor()
+        extractor.use_spacy = False
+
+        result = extractor.extract("I need a gift for my 10 year old niece under $50")
+
+        self.assertEqual(result["max_price"], 50)
+        self.assertIsNone(result["min_price"])
+        self.assertEqual(result["metadata"]["age"], 10)
+        self.assertEqual(result["metadata"]["relationship"], "niece")
+        self.assertEqual(result["metadata"]["demographic"], "kids")
+
+    def test_query_is_parsed_once(self):
+        fake = FakeNLP()
+        with patch.object(simple_nlp, "get_nlp", return_value=fake):
+            extractor = SimpleNLPExtractor()
+            result = extractor.extract("a lego star wars set for my 10 year old nephew")
+
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(result["metadata"]["age"], 10)
+        self.assertEqual(result["query"], "lego star wars set")
+
+    def test_noun_chunks_skipped_without_parser(self):
+        # [nlp] PIPES without parser: no noun chunks, keywords still come from the tagger
+        with patch.object(simple_nlp, "get_nlp", return_value=FakeNLP(parsed=False)):
+            result = SimpleNLPExtractor().extract("a lego star wars set for my nephew")
+        self.assertEqual(result["query"], "lego star wars set")
+
+    def test_extract_many_matches_extract(self):
+        queries = [
+            "a lego star wars set for my 10 year old nephew",
+            "headphones for my boyfriend around $100",
+            "something for mom under 30 dollars",
+        ]
+        fake = FakeNLP()
+        with patch.object(simple_nlp, "get_nlp", return_value=fake):
+            extractor = SimpleNLPExtractor()
+            expected = [extractor.extract(q) for q in queries]
+            fake.calls.clear()
+
+            self.assertEqual(list(extractor.extract_many(iter(queries), batch_size=2, n_process=2)), expected)
+        self.assertEqual(fake.calls, queries)
+        self.assertEqual(fake.pipe_args, (True, 2, 2))
+
+        regex_only = SimpleNLPExtractor()
+        regex_only.use_spacy = False
+        self.assertEqual(list(regex_only.extract_many(queries)), [regex_only.extract(q) for q in queries])
+
+    def test_indexed_tables_match_per_keyword_search(self):
+        extractor = SimpleNLPExtractor()
+        queries = [
+            "records and rings for the grandmother",
+            "earrings and a watch",
+            "action figures for my son",
+            "toyss for a lego_set fan",
+            "sons, daughters and the grandson",
+            "teenager or teen? my kid's friend",
+            "books, novels and a kindle for aunt & uncle",
+            "no keywords here",
+        ]
+        for query in queries:
+            expected_categories = [
+                category for category, keywords in extractor.category_keywords.items()
+                if any(re.search(rf'\b{k}s?\b', query) for k in keywords)
+            ]
+            expected_rel = next((r for r in extractor.relationships if re.search(rf'\b{r}\b', query)), None)
+            self.assertEqual(extractor._identify_categories(query), expected_categories, query)
+            self.assertEqual(extractor._extract_relationship(query), expected_rel, query)
+
+        # Edited tables take effect once recompiled
+        extractor.category_keywords['garden'] = ['garden', 'plant pot']
+        extractor._compile_tables()
+        self.assertEqual(extractor._identify_categories("plant pots for the home"), ['home', 'garden'])
+
+    def test_repeat_queries_served_from_cache(self):
+        fake = FakeNLP()
+        with patch.object(simple_nlp, "get_nlp", return_value=fake):
+            extractor = SimpleNLPExtractor(cache_size=8)
+            first = extractor.extract("A lego star wars set for my 10 year old nephew!")
+            first["metadata"]["keywords"].clear()  # callers can't corrupt the cached copy
+            again = extractor.extract("  a LEGO star wars set, for my 10 year old nephew ")
+
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(again["metadata"]["keywords"], ["lego", "star", "wars", "set"])
+        self.assertEqual(again["metadata"]["original_query"], "  a LEGO star wars set, for my 10 year old nephew ")
+        stats = extractor.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cache_key_keeps_prices_and_ranges(self):
+        self.assertEqual(simple_nlp.normalize_query("Toy for my Nephew's  5th birthday?!"), "toy for my nephew s 5th birthday")
+        self.assertEqual(simple_nlp.normalize_query("$20-$50 gift for a 5 y.o. kid."), "$20-$50 gift for a 5 y.o kid")
+        self.assertNotEqual(simple_nlp.normalize_query("$20-$50"), simple_nlp.normalize_query("20 50"))
+
+        extractor = SimpleNLPExtractor(cache_size=0)
+        self.assertIsNone(extractor.cache)
+
+
+class TestPipelineLoading(unittest.TestCase):
+
+    def test_unneeded_pipes_are_disabled(self):
+        class Pipeline:
+            pipe_names = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "textcat"]
+
+            def select_pipes(self, disable):
+                self.disabled = disable
+
+        pipeline = Pipeline()
+        fake_spacy = type(sys)("spacy")
+        fake_spacy.load = lambda model: pipeline
+
+        settings = {"pipes": "tok2vec, tagger, attribute_ruler, lemmatizer, ner"}
+        with patch.dict(sys.modules, {"spacy": fake_spacy}), \
+                patch.object(simple_nlp, "get_setting", side_effect=lambda s, o, fallback: settings.get(o, fallback)), \
+                patch("builtins.print"):
+            self.assertIs(simple_nlp._load_pipeline(), pipeline)
+        self.assertEqual(pipeline.disabled, ["parser", "textcat"])
+
+
+if __name__ == "__main__":
+    unittest.main()
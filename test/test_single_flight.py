@@ -0,0 +1,94 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Caching.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def _run_concurrently(self, flights, key, fn, callers):
+        """Start callers threads on the same key while fn is blocked; returns their results."""
+        results = [None] * callers
+        errors = [None] * callers
+
+        def call(i):
+            try:
+                results[i] = flights.do(key, fn)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 2
+        while flights.stats()["shared"] < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return threads, results, errors
+
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(timeout=2)
+            return {"items": ["lego"]}
+
+        threads, results, errors = self._run_concurrently(flights, "lego", fetch, 5)
+        release.set()
+        for t in threads:
+            t.join(timeout=2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"items": ["lego"]}] * 5)
+        # Every caller gets its own copy
+        self.assertEqual(len({id(r) for r in results}), 5)
+        self.assertEqual(flights.stats(), {"leaders": 1, "shared": 4, "in_flight": 0})
+
+    def test_followers_get_the_leaders_exception(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(timeout=2)
+            raise ValueError("upstream down")
+
+        threads, results, errors = self._run_concurrently(flights, "lego", fetch, 3)
+        release.set()
+        for t in threads:
+            t.join(timeout=2)
+
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    def test_sequential_calls_run_again_unless_remembered(self):
+        flights = SingleFlight()
+        self.assertEqual(flights.do("k", lambda: 1), 1)
+        self.assertEqual(flights.do("k", lambda: 2), 2)
+
+        remembered = SingleFlight(remember=True)
+        first = remembered.do("k", lambda: ["a"])
+        first.append("mutated by the caller")
+        self.assertEqual(remembered.do("k", lambda: ["b"]), ["a"])
+
+    def test_failures_are_not_remembered(self):
+        flights = SingleFlight(remember=True)
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            flights.do("k", fail)
+        self.assertEqual(flights.do("k", lambda: "ok"), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
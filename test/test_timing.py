@@ -0,0 +1,44 @@
+import unittest
+import os
+import sys
+import time
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from Monitoring.timing import RequestTimer, span
+
+
+class TestRequestTimer(unittest.TestCase):
+
+    def test_span_records_duration(self):
+        timer = RequestTimer()
+        with timer.span("gemini"):
+            time.sleep(0.02)
+
+        spans = timer.as_list()
+        self.assertEqual([s["name"] for s in spans], ["gemini", "total"])
+        self.assertGreaterEqual(spans[0]["duration_ms"], 15)
+
+    def test_span_recorded_when_body_raises(self):
+        timer = RequestTimer()
+        with self.assertRaises(ValueError):
+            with timer.span("ebay_main"):
+                raise ValueError("boom")
+        self.assertEqual(timer.as_list()[0]["name"], "ebay_main")
+
+    def test_server_timing_header(self):
+        timer = RequestTimer()
+        timer.record("amazon similar 1", 12.345)
+        header = timer.server_timing_header()
+        self.assertTrue(header.startswith("amazon_similar_1;dur=12.35, total;dur="))
+
+    def test_span_without_timer_is_noop(self):
+        with span(None, "compare_main"):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+# Add project root to path for imports
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from EbayAPI.token_manager import TokenManager
+from EbayAPI.token_store import FileTokenStore
+
+
+class TestTokenManager(unittest.TestCase):
+
+    def setUp(self):
+        self.published = []
+        self.fetch_calls = 0
+        self.release = threading.Event()
+
+    def slow_fetch(self):
+        self.fetch_calls += 1
+        self.release.wait(timeout=2)
+        return "tok%d" % self.fetch_calls, 7200
+
+    def test_concurrent_callers_share_one_refresh(self):
+        manager = TokenManager(self.slow_fetch, lambda t, e: self.published.append(t), background=False)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.refresh_now())) for _ in range(10)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        self.release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.fetch_calls, 1)
+        self.assertEqual(results, [True] * 10)
+        self.assertEqual(self.published, ["tok1"])
+
+    def test_refresh_async_does_not_block(self):
+        manager = TokenManager(self.slow_fetch, lambda t, e: self.published.append(t), background=False)
+
+        start = time.time()
+        manager.refresh_async()
+        manager.refresh_async()  # already in flight, ignored
+        self.assertLess(time.time() - start, 0.5)
+
+        self.release.set()
+        self.assertTrue(manager.refresh_now())
+        self.assertEqual(self.fetch_calls, 1)
+
+    def test_failed_fetch_reports_false_and_keeps_old_token(self):
+        manager = TokenManager(lambda: None, lambda t, e: self.published.append(t), background=False)
+        self.assertFalse(manager.refresh_now())
+        self.assertEqual(self.published, [])
+
+    def test_next_refresh_is_scheduled_before_expiry(self):
+        refreshed = threading.Event()
+
+        def fetch():
+            if self.fetch_calls:
+                refreshed.set()
+            self.fetch_calls += 1
+            return "tok", 0.3  # expires almost immediately
+
+        manager = TokenManager(fetch, lambda t, e: None, refresh_margin=0.1, min_refresh_delay=0)
+        try:
+            self.assertTrue(manager.refresh_now())
+            # The timer fires at expiry - margin and refreshes with no caller involved
+            self.assertTrue(refreshed.wait(timeout=2))
+        finally:
+            manager.stop()
+
+    def test_margin_past_the_lifetime_does_not_refresh_nonstop(self):
+        lifetime = [7200]
+        manager = TokenManager(lambda: ("tok", lifetime[0]), lambda t, e: None, refresh_margin=7200)
+        with patch.object(manager, "_schedule") as schedule:
+            self.assertTrue(manager.refresh_now())
+            schedule.assert_called_once_with(3600)
+            self.assertEqual(manager.margin_for(7200), 3600)
+
+            # A token that is already nearly expired still waits out the floor
+            lifetime[0] = 1
+            schedule.reset_mock()
+            self.assertTrue(manager.refresh_now())
+            schedule.assert_called_once_with(manager.min_refresh_delay)
+
+
+class TestFileTokenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = FileTokenStore(os.path.join(self.tmp_dir.name, "ebay_token.json"), lock_timeout=0.3)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_write_roundtrip(self):
+        self.assertIsNone(self.store.read())
+        self.store.write("tok", 1234.5)
+        self.assertEqual(self.store.read(), ("tok", 1234.5))
+        self.assertEqual(os.stat(self.store.path).st_mode & 0o777, 0o600)
+
+    def test_lock_is_exclusive(self):
+        inside = threading.Event()
+        release = threading.Event()
+
+        def holder():
+            with self.store.lock():
+                inside.set()
+                release.wait(timeout=2)
+
+        t = threading.Thread(target=holder)
+        t.start()
+        self.assertTrue(inside.wait(timeout=2))
+        try:
+            with self.assertRaises(TimeoutError):
+                with self.store.lock():
+                    pass
+        finally:
+            release.set()
+            t.join()
+
+        # Free again once the holder is done
+        with self.store.lock():
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()